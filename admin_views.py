@@ -0,0 +1,201 @@
+# admin_views.py
+"""
+Дополнительные страницы Flask-Admin.
+"""
+from flask import (Response, flash, redirect, request, stream_with_context,
+                   url_for)
+from markupsafe import Markup
+from flask_admin import BaseView, expose
+from flask_admin.actions import action
+from flask_admin.contrib.sqla import ModelView
+from sqlalchemy import func, select
+
+from bulk_ops import (run_bulk, bulk_delete_recipes, bulk_add_tag,
+                      bulk_remove_tag, merge_ingredients)
+from export_data import iter_recipe_records, csv_chunks, jsonl_chunks
+from models import (db, Tag, Ingredient, Recipe, IngredientMergeCandidate,
+                    TagRecipeCount, RecipeFavoriteCount, RecipeCartCount)
+
+
+class ExportView(BaseView):
+    """Потоковая выгрузка каталога рецептов (см. export_data.py)."""
+
+    @expose('/')
+    def index(self):
+        return self.render('admin/export.html')
+
+    def _stream(self, chunks, mimetype, filename):
+        # stream_with_context держит контекст приложения (и сессию БД)
+        # открытым, пока ответ отдаётся клиенту
+        return Response(
+            stream_with_context(chunks(iter_recipe_records())),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename={filename}',
+                'Cache-Control': 'no-store',
+            },
+        )
+
+    @expose('/recipes.csv')
+    def recipes_csv(self):
+        return self._stream(csv_chunks, 'text/csv', 'recipes.csv')
+
+    @expose('/recipes.jsonl')
+    def recipes_jsonl(self):
+        return self._stream(jsonl_chunks, 'application/x-ndjson',
+                            'recipes.jsonl')
+
+
+# --------------------------
+# Массовые операции (см. bulk_ops.py)
+# --------------------------
+def _parse_ids(text: str):
+    return sorted({int(x) for x in text.replace(',', ' ').split()
+                   if x.isdigit()})
+
+
+def _flash_counts(counts: dict, dry_run: bool):
+    prefix = 'Пробный прогон' if dry_run else 'Готово'
+    details = ', '.join(f'{k}: {v}' for k, v in counts.items())
+    details = details or 'нет изменений'
+    flash(f'{prefix}: {details}', 'info' if dry_run else 'success')
+
+
+def _thumb_formatter(view, context, model, name):
+    if not (model.image_path or model.resource_url):
+        return ''
+    src = url_for('thumbs.recipe_thumb', recipe_id=model.id, size='small')
+    return Markup(f'<img src="{src}" loading="lazy" height="80">')
+
+
+class RecipeAdmin(ModelView):
+    """
+    Рецепты: удаление выбранных одним набором DELETE вместо
+    построчного каскада через ORM; в списке — миниатюры картинок.
+    """
+    column_formatters = {'image_path': _thumb_formatter}
+
+    @action('delete', 'Удалить',
+            'Удалить выбранные рецепты вместе со связями?')
+    def action_delete(self, ids):
+        counts = run_bulk(bulk_delete_recipes, _parse_ids(' '.join(ids)))
+        _flash_counts(counts, dry_run=False)
+
+    @action('delete_dry_run', 'Удалить (пробный прогон)')
+    def action_delete_dry_run(self, ids):
+        counts = run_bulk(bulk_delete_recipes, _parse_ids(' '.join(ids)),
+                          dry_run=True)
+        _flash_counts(counts, dry_run=True)
+
+    @action('tags', 'Добавить / убрать тег')
+    def action_tags(self, ids):
+        return redirect(url_for('bulk.index', recipe_ids=','.join(ids)))
+
+
+class IngredientAdmin(ModelView):
+
+    @action('merge', 'Объединить дубликаты')
+    def action_merge(self, ids):
+        return redirect(url_for('bulk.index', source_ids=','.join(ids)))
+
+
+class IngredientMergeCandidateAdmin(ModelView):
+    """Кандидаты на объединение из ingredient_dedup.py."""
+    can_create = False
+    can_edit = False
+    column_list = ('ingredient', 'candidate', 'similarity', 'dismissed')
+    column_default_sort = ('similarity', True)
+    column_filters = ('dismissed', 'similarity')
+
+    @action('merge', 'Объединить')
+    def action_merge(self, ids):
+        selected = _parse_ids(' '.join(ids))
+        rows = db.session.scalars(
+            select(IngredientMergeCandidate)
+            .where(IngredientMergeCandidate.id.in_(selected))
+        ).all()
+        source_ids = sorted({i for r in rows
+                             for i in (r.ingredient_id, r.candidate_id)})
+        return redirect(url_for(
+            'bulk.index', source_ids=','.join(map(str, source_ids))))
+
+    @action('dismiss', 'Не дубликаты')
+    def action_dismiss(self, ids):
+        table = IngredientMergeCandidate.__table__
+        count = db.session.execute(
+            table.update().where(table.c.id.in_(_parse_ids(' '.join(ids))))
+            .values(dismissed=True)
+        ).rowcount
+        db.session.commit()
+        flash(f'Отмечено как не дубликаты: {count}', 'success')
+
+
+class BulkOpsView(BaseView):
+    """Теги для набора рецептов и объединение ингредиентов."""
+
+    @expose('/', methods=('GET', 'POST'))
+    def index(self):
+        form = request.form if request.method == 'POST' else request.args
+        if request.method == 'POST':
+            dry_run = bool(form.get('dry_run'))
+            op = form.get('op')
+            try:
+                if op in ('add_tag', 'remove_tag'):
+                    operation = (bulk_add_tag if op == 'add_tag'
+                                 else bulk_remove_tag)
+                    counts = run_bulk(operation,
+                                      _parse_ids(form.get('recipe_ids', '')),
+                                      int(form['tag_id']), dry_run=dry_run)
+                elif op == 'merge':
+                    counts = run_bulk(merge_ingredients,
+                                      _parse_ids(form.get('source_ids', '')),
+                                      int(form['target_id']), dry_run=dry_run)
+                else:
+                    raise ValueError('неизвестная операция')
+            except (KeyError, ValueError) as e:
+                flash(f'Ошибка: {e}', 'error')
+            else:
+                _flash_counts(counts, dry_run)
+        source_ids = _parse_ids(form.get('source_ids', ''))
+        return self.render(
+            'admin/bulk.html',
+            form=form,
+            tags=db.session.scalars(select(Tag).order_by(Tag.name)).all(),
+            sources=db.session.scalars(
+                select(Ingredient).where(Ingredient.id.in_(source_ids))
+                .order_by(Ingredient.id)
+            ).all(),
+        )
+
+
+# --------------------------
+# Дашборд (читает только таблицы счётчиков, см. counters.py)
+# --------------------------
+class DashboardView(BaseView):
+    TOP = 20
+
+    def _top(self, counter, model, key):
+        return db.session.execute(
+            select(model, counter.count)
+            .join(model, model.id == key)
+            .where(counter.count > 0)
+            .order_by(counter.count.desc())
+            .limit(self.TOP)
+        ).all()
+
+    @expose('/')
+    def index(self):
+        return self.render(
+            'admin/dashboard.html',
+            tags=self._top(TagRecipeCount, Tag, TagRecipeCount.tag_id),
+            favorites=self._top(RecipeFavoriteCount, Recipe,
+                                RecipeFavoriteCount.recipe_id),
+            carts=self._top(RecipeCartCount, Recipe,
+                            RecipeCartCount.recipe_id),
+            total_favorites=db.session.scalar(
+                select(func.coalesce(func.sum(RecipeFavoriteCount.count), 0))
+            ),
+            total_carts=db.session.scalar(
+                select(func.coalesce(func.sum(RecipeCartCount.count), 0))
+            ),
+        )
@@ -1,33 +1,64 @@
 # app.py
 from flask import Flask
-from flask_admin import Admin
-from flask_admin.contrib.sqla import ModelView
+import counters
+from db_utils import enable_sqlite_wal
 from settings import Config
-from models import (db, User, Tag, Ingredient,
-                    Recipe, RecipeIngredient, TagInRecipe, Favorite)
+from models import db
 
 
-def create_app():
+def create_app(admin: bool = True):
+    """
+    Flask-приложение. admin=False — только доступ к БД (бот, CLI-скрипты):
+    без Flask-Admin и миниатюр, которые заметно замедляют импорт.
+    Схема БД здесь не создаётся — это делает init_db.py.
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
     db.init_app(app)
+    counters.register()
     
     with app.app_context():
-        db.create_all()
+        enable_sqlite_wal(db.engine)
+
+    if admin:
+        init_admin(app)
+    return app
+
+
+def init_admin(app):
+    from flask_admin import Admin
+    from flask_admin.contrib.sqla import ModelView
+    from admin_views import (ExportView, RecipeAdmin, IngredientAdmin,
+                             IngredientMergeCandidateAdmin, BulkOpsView,
+                             DashboardView)
+    from thumbnails import thumbs_bp
+    from models import (User, Tag, Ingredient,
+                        Recipe, RecipeIngredient, TagInRecipe, Favorite,
+                        IngredientMergeCandidate, Broadcast)
+
+    app.register_blueprint(thumbs_bp)
 
     # Инициализация Flask‑Admin внутри функции
     admin = Admin(app, name='Recipes Bot Admin', template_mode='bootstrap4')
-    for model in (User, Tag, Ingredient,
-                  Recipe, RecipeIngredient, TagInRecipe, Favorite):
+    for model in (User, Tag):
+        admin.add_view(ModelView(model, db.session))
+    admin.add_view(IngredientAdmin(Ingredient, db.session))
+    admin.add_view(RecipeAdmin(Recipe, db.session))
+    for model in (RecipeIngredient, TagInRecipe, Favorite):
         admin.add_view(ModelView(model, db.session))
+    admin.add_view(IngredientMergeCandidateAdmin(
+        IngredientMergeCandidate, db.session, name='Дубликаты ингредиентов'))
+    admin.add_view(ModelView(Broadcast, db.session, name='Рассылки'))
+    admin.add_view(DashboardView(name='Дашборд', endpoint='dashboard'))
+    admin.add_view(ExportView(name='Экспорт', endpoint='export'))
+    admin.add_view(BulkOpsView(name='Массовые операции', endpoint='bulk'))
 
     @app.route('/')
     def index():
         return 'Recipes Bot Admin Running'
 
-    return app
-
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # threaded: долгие выгрузки не блокируют остальные запросы админки
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
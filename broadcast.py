@@ -0,0 +1,453 @@
+# broadcast.py
+"""
+Рассылки о новых рецептах.
+
+Бот при создании рецепта только добавляет строку broadcast (status=new)
+и сразу отвечает пользователю. Воркер рассылок (отдельный процесс)
+строит список получателей одним INSERT ... SELECT: пользователи,
+добавлявшие в избранное рецепты автора, и подписчики тегов рецепта
+(/subscribe). Бот показывает id тегов сайта; в подписках и рассылках
+хранятся локальные id, перевод — через site_tag (см. sync.py). Дальше доставки (broadcast_delivery) забираются пачками
+и отправляются с ограничениями Telegram: общий token bucket
+(BROADCAST_RATE сообщений/с) и не чаще раза в секунду в один чат;
+RetryAfter приостанавливает всю отправку.
+
+Очередь хранится в БД, поэтому после перезапуска отправка
+продолжается с места остановки. Доставка помечается sending до
+отправки; если процесс упал, не узнав результата, при следующем
+запуске такие строки становятся unknown и повторно не отправляются —
+дубликатов не бывает (at-most-once).
+
+Запуск:
+    python broadcast.py run [--loop]   # отправить ожидающие рассылки
+    python broadcast.py status [id]    # прогресс, скорость, ошибки
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, func, literal, select, union
+
+from db_utils import upsert
+from models import (db, User, Recipe, Favorite, TagSubscription, Tag,
+                    SiteTag, Broadcast, BroadcastDelivery)
+
+# Не чаще одного сообщения в секунду в один чат
+PER_CHAT_INTERVAL = 1.0
+# Сколько раз подряд повторять после RetryAfter; дальше доставка
+# возвращается в очередь (pending) и будет отправлена следующим проходом
+MAX_ATTEMPTS = 3
+# Пауза (с), если Telegram недоступен (сообщение точно не ушло)
+CONNECT_ERROR_PAUSE = 5
+
+FINAL_STATUSES = ('sent', 'failed', 'unknown')
+
+
+def _utcnow():
+    # SQLite хранит DateTime без зоны — храним наивное UTC-время
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# --------------------------
+# Подписки и постановка в очередь (вызываются из бота)
+# --------------------------
+def get_or_create_user(telegram_id: int, username=None, first_name=None,
+                       last_name=None) -> int:
+    """id локального пользователя по telegram_id; профиль обновляется."""
+    upsert(User.__table__, [{
+        'telegram_id': telegram_id, 'username': username,
+        'first_name': first_name, 'last_name': last_name,
+    }], ['telegram_id'], ['username', 'first_name', 'last_name'])
+    return db.session.scalar(
+        select(User.id).where(User.telegram_id == telegram_id))
+
+
+def _local_tag_ids(site_ids):
+    """Локальные id тегов по id сайта; незеркалированные пропускаются."""
+    site_ids = [int(t) for t in site_ids]
+    if not site_ids:
+        return []
+    return list(db.session.scalars(
+        select(SiteTag.local_id).where(SiteTag.site_id.in_(site_ids))
+        .distinct().order_by(SiteTag.local_id)))
+
+
+def subscribe(profile: dict, site_tag_id: int):
+    """True — подписка создана, False — уже была, None — нет тега."""
+    local_ids = _local_tag_ids([site_tag_id])
+    if not local_ids:
+        return None
+    tag_id = local_ids[0]
+    user_id = get_or_create_user(**profile)
+    table = TagSubscription.__table__
+    exists = db.session.scalar(
+        select(table.c.id).where(table.c.user_id == user_id,
+                                 table.c.tag_id == tag_id))
+    if exists is None:
+        db.session.add(TagSubscription(user_id=user_id, tag_id=tag_id))
+    db.session.commit()
+    return exists is None
+
+
+def unsubscribe(telegram_id: int, site_tag_id: int) -> bool:
+    local_ids = _local_tag_ids([site_tag_id])
+    if not local_ids:
+        return False
+    table = TagSubscription.__table__
+    user_ids = select(User.id).where(User.telegram_id == telegram_id)
+    removed = db.session.execute(
+        table.delete().where(table.c.user_id.in_(user_ids),
+                             table.c.tag_id.in_(local_ids))
+    ).rowcount
+    db.session.commit()
+    return bool(removed)
+
+
+def subscriptions(telegram_id: int):
+    """[(id тега на сайте, название)] подписок пользователя."""
+    return db.session.execute(
+        select(func.min(SiteTag.site_id), Tag.name)
+        .join(SiteTag, SiteTag.local_id == Tag.id)
+        .join(TagSubscription, TagSubscription.tag_id == Tag.id)
+        .join(User, User.id == TagSubscription.user_id)
+        .where(User.telegram_id == telegram_id)
+        .group_by(Tag.id, Tag.name)
+        .order_by(Tag.name)
+    ).all()
+
+
+def enqueue_recipe(recipe_id: int, name: str, site_tag_ids,
+                   author: dict) -> int:
+    """
+    Ставит рассылку о новом рецепте (id рецепта и тегов — сайта);
+    получатели считаются воркером.
+    """
+    broadcast = Broadcast(
+        recipe_id=recipe_id,
+        author_id=get_or_create_user(**author),
+        tag_ids=_local_tag_ids(site_tag_ids),
+        text=f"Новый рецепт: {name}\nПодробнее: /recipe {recipe_id}",
+    )
+    db.session.add(broadcast)
+    db.session.commit()
+    return broadcast.id
+
+
+# --------------------------
+# Очередь доставок
+# --------------------------
+def build_recipients(broadcast: Broadcast) -> int:
+    """
+    Заполняет broadcast_delivery одним INSERT ... SELECT и переводит
+    рассылку в sending (в одной транзакции).
+
+    Получатели по избранному находятся только для рецептов с локальным
+    автором (Recipe.author_id): sync.py его не заполняет — авторы на
+    сайте не пользователи бота, — поэтому для рецептов, созданных через
+    бота, рассылка идёт подписчикам тегов.
+    """
+    sources = []
+    if broadcast.author_id is not None:
+        sources.append(
+            select(Favorite.user_id)
+            .join(Recipe, Recipe.id == Favorite.recipe_id)
+            .where(Recipe.author_id == broadcast.author_id))
+    if broadcast.tag_ids:
+        sources.append(
+            select(TagSubscription.user_id)
+            .where(TagSubscription.tag_id.in_(broadcast.tag_ids)))
+    total = 0
+    if sources:
+        recipients = union(*sources).subquery()
+        query = select(
+            literal(broadcast.id), User.id, User.telegram_id,
+            literal('pending'), literal(0),
+        ).where(User.id.in_(select(recipients.c.user_id)))
+        if broadcast.author_id is not None:
+            query = query.where(User.id != broadcast.author_id)
+        table = BroadcastDelivery.__table__
+        total = db.session.execute(table.insert().from_select(
+            ['broadcast_id', 'user_id', 'chat_id', 'status', 'attempts'],
+            query,
+        )).rowcount
+    broadcast.total = total
+    broadcast.status = 'sending'
+    broadcast.started_at = _utcnow()
+    db.session.commit()
+    return total
+
+
+def recover_interrupted() -> int:
+    """
+    Доставки, застрявшие в sending (процесс упал во время отправки),
+    помечаются unknown: сообщение могло уйти, повторять нельзя.
+    Вызывается при старте единственного воркера рассылок.
+    """
+    table = BroadcastDelivery.__table__
+    count = db.session.execute(
+        table.update().where(table.c.status == 'sending')
+        .values(status='unknown', error='interrupted')
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def refresh_counts(broadcast: Broadcast) -> Counter:
+    """Пересчитывает sent/failed/unknown рассылки по доставкам."""
+    table = BroadcastDelivery.__table__
+    counts = Counter(dict(db.session.execute(
+        select(table.c.status, func.count())
+        .where(table.c.broadcast_id == broadcast.id)
+        .group_by(table.c.status)
+    ).all()))
+    broadcast.sent = counts['sent']
+    broadcast.failed = counts['failed']
+    broadcast.unknown = counts['unknown']
+    return counts
+
+
+# --------------------------
+# Отправка
+# --------------------------
+class RateLimiter:
+    """Общий token bucket на бота + минимальный интервал на чат."""
+
+    def __init__(self, rate: float, per_chat: float = PER_CHAT_INTERVAL):
+        self.rate = rate
+        self.per_chat = per_chat
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._last_chat = {}
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Останавливает всю отправку (RetryAfter, недоступность API)."""
+        self.paused_until = max(self.paused_until,
+                                time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self, chat_id: int):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max(self.paused_until - now,
+                           self._last_chat.get(chat_id, 0) + self.per_chat
+                           - now)
+                if wait <= 0:
+                    self.tokens = min(
+                        self.rate,
+                        self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+            self._last_chat[chat_id] = now
+            if len(self._last_chat) > 10_000:
+                self._last_chat = {
+                    c: t for c, t in self._last_chat.items()
+                    if now - t < self.per_chat
+                }
+
+
+def _not_sent(error) -> bool:
+    """Ошибка соединения до отправки запроса — сообщение точно не ушло."""
+    import httpx
+
+    return isinstance(error.__cause__, (httpx.ConnectError,
+                                        httpx.ConnectTimeout,
+                                        httpx.PoolTimeout))
+
+
+async def send_one(bot, chat_id: int, text: str, limiter: RateLimiter):
+    """Отправляет сообщение; возвращает (статус доставки, ошибка)."""
+    from telegram.error import (BadRequest, Forbidden, NetworkError,
+                                RetryAfter, TelegramError)
+
+    for _ in range(MAX_ATTEMPTS):
+        await limiter.acquire(chat_id)
+        try:
+            await bot.send_message(chat_id, text)
+            return 'sent', None
+        except RetryAfter as e:
+            limiter.pause(e.retry_after)
+        except Forbidden:
+            # пользователь заблокировал бота
+            return 'failed', 'forbidden'
+        except BadRequest as e:
+            return 'failed', str(e)[:255]
+        except NetworkError as e:
+            if _not_sent(e):
+                limiter.pause(CONNECT_ERROR_PAUSE)
+                return 'pending', None
+            # таймаут ответа: сообщение могло быть доставлено
+            return 'unknown', str(e)[:255]
+        except TelegramError as e:
+            return 'failed', str(e)[:255]
+    # сообщение не ушло: RetryAfter — это не ошибка получателя
+    return 'pending', None
+
+
+def _save_results(results):
+    table = BroadcastDelivery.__table__
+    now = _utcnow()
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('delivery_id'))
+        .values(status=bindparam('new_status'),
+                error=bindparam('new_error'),
+                sent_at=bindparam('new_sent_at')),
+        [{'delivery_id': delivery_id, 'new_status': status,
+          'new_error': error,
+          'new_sent_at': now if status == 'sent' else None}
+         for delivery_id, (status, error) in results],
+    )
+
+
+async def run_broadcast(bot, broadcast: Broadcast, config,
+                        limiter: RateLimiter) -> Counter:
+    """Отправляет все ожидающие доставки рассылки пачками."""
+    table = BroadcastDelivery.__table__
+    semaphore = asyncio.Semaphore(config['BROADCAST_CONCURRENCY'])
+    started = time.monotonic()
+    processed = 0
+
+    async def deliver(row):
+        async with semaphore:
+            return row.id, await send_one(bot, row.chat_id, broadcast.text,
+                                          limiter)
+
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.chat_id)
+            .where(table.c.broadcast_id == broadcast.id,
+                   table.c.status == 'pending')
+            .order_by(table.c.id)
+            .limit(config['BROADCAST_BATCH'])
+        ).all()
+        if not rows:
+            break
+        # помечаем до отправки: после падения эти строки станут unknown
+        db.session.execute(
+            table.update().where(table.c.id.in_([r.id for r in rows]))
+            .values(status='sending', attempts=table.c.attempts + 1))
+        db.session.commit()
+
+        results = await asyncio.gather(*(deliver(row) for row in rows))
+        _save_results(results)
+        counts = refresh_counts(broadcast)
+        db.session.commit()
+
+        processed += sum(1 for _, (s, _) in results if s != 'pending')
+        elapsed = time.monotonic() - started
+        print(f"Рассылка #{broadcast.id}: "
+              f"{sum(counts[s] for s in FINAL_STATUSES)}/{broadcast.total}, "
+              f"{processed / elapsed if elapsed else 0:.1f} сообщ/с, "
+              f"ошибок {counts['failed']}, неизвестно {counts['unknown']}")
+
+    broadcast.status = 'done'
+    broadcast.finished_at = _utcnow()
+    counts = refresh_counts(broadcast)
+    db.session.commit()
+    return counts
+
+
+async def run(app, loop: bool):
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+
+    config = app.config
+    if not config['TELEGRAM_BOT_TOKEN']:
+        raise RuntimeError("TELEGRAM_BOT_TOKEN не задан в окружении")
+    request = HTTPXRequest(
+        connection_pool_size=config['BROADCAST_CONCURRENCY'])
+    limiter = RateLimiter(config['BROADCAST_RATE'])
+    async with Bot(config['TELEGRAM_BOT_TOKEN'], request=request) as bot:
+        with app.app_context():
+            recovered = recover_interrupted()
+            if recovered:
+                print(f"Прерванных доставок (помечены unknown): {recovered}")
+        while True:
+            with app.app_context():
+                queue = db.session.scalars(
+                    select(Broadcast)
+                    .where(Broadcast.status.in_(('new', 'sending')))
+                    .order_by(Broadcast.id)
+                ).all()
+                for broadcast in queue:
+                    if broadcast.status == 'new':
+                        build_recipients(broadcast)
+                    counts = await run_broadcast(bot, broadcast, config,
+                                                 limiter)
+                    print(format_stats(broadcast, counts))
+            if not loop:
+                break
+            await asyncio.sleep(config['BROADCAST_INTERVAL'])
+
+
+# --------------------------
+# Отчёт
+# --------------------------
+def format_stats(broadcast: Broadcast, counts: Counter = None) -> str:
+    done = broadcast.sent + broadcast.failed + broadcast.unknown
+    line = (f"#{broadcast.id} [{broadcast.status}] рецепт "
+            f"{broadcast.recipe_id}: отправлено {broadcast.sent}, "
+            f"ошибок {broadcast.failed}, неизвестно {broadcast.unknown}, "
+            f"осталось {max(broadcast.total - done, 0)} "
+            f"из {broadcast.total}")
+    if broadcast.started_at:
+        end = broadcast.finished_at or _utcnow()
+        seconds = (end - broadcast.started_at).total_seconds()
+        if seconds > 0:
+            line += f", {done / seconds:.1f} сообщ/с за {seconds:.0f} с"
+    return line
+
+
+def print_status(broadcast_id=None, limit: int = 20):
+    query = select(Broadcast).order_by(Broadcast.id.desc()).limit(limit)
+    if broadcast_id is not None:
+        query = select(Broadcast).where(Broadcast.id == broadcast_id)
+    broadcasts = db.session.scalars(query).all()
+    if not broadcasts:
+        print("Рассылок нет.")
+    for broadcast in broadcasts:
+        print(format_stats(broadcast))
+    if broadcast_id is not None and broadcasts:
+        table = BroadcastDelivery.__table__
+        errors = db.session.execute(
+            select(table.c.error, func.count())
+            .where(table.c.broadcast_id == broadcast_id,
+                   table.c.status.in_(('failed', 'unknown')))
+            .group_by(table.c.error)
+            .order_by(func.count().desc())
+        ).all()
+        for error, count in errors:
+            print(f"  {count:>7}  {error}")
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Рассылки о новых рецептах')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_cmd = commands.add_parser('run', help='отправить ожидающие рассылки')
+    run_cmd.add_argument('--loop', action='store_true',
+                         help='работать постоянно')
+    status_cmd = commands.add_parser('status', help='прогресс рассылок')
+    status_cmd.add_argument('id', type=int, nargs='?',
+                            help='рассылка (с разбором ошибок)')
+    args = parser.parse_args()
+
+    app = create_app(admin=False)
+    if args.command == 'run':
+        asyncio.run(run(app, args.loop))
+    else:
+        with app.app_context():
+            print_status(args.id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# bulk_ops.py
+"""
+Массовые операции для админки: каждая выполняется несколькими
+set-based SQL-запросами в одной транзакции, без загрузки строк в ORM.
+
+Пробный прогон (dry_run) выполняет те же запросы и откатывает
+транзакцию — возвращаемые счётчики в точности совпадают с тем, что
+сделал бы настоящий запуск.
+"""
+from sqlalchemy import and_, exists, func, literal, select
+
+from db_utils import chunked, delete_recipes, increment
+from models import (db, Recipe, RecipeIngredient, TagInRecipe, Ingredient,
+                    SiteIngredient, TagRecipeCount)
+
+CHUNK = 500
+
+
+def run_bulk(operation, *args, dry_run: bool = False) -> dict:
+    """
+    Выполняет operation(*args) -> {что: сколько строк} в одной
+    транзакции; при dry_run откатывает её.
+    """
+    try:
+        counts = operation(*args)
+    except Exception:
+        db.session.rollback()
+        raise
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return counts
+
+
+def _adjust_tag_counts(deltas: dict):
+    increment(db.session.connection(), TagRecipeCount.__table__,
+              'tag_id', deltas)
+
+
+def bulk_delete_recipes(recipe_ids):
+    """
+    Счётчики избранного и корзин удаляются вместе с рецептами,
+    счётчики тегов уменьшаются на число снятых связей.
+    """
+    link = TagInRecipe.__table__
+    deltas = {}
+    for ids in chunked(recipe_ids, CHUNK):
+        for tag_id, count in db.session.execute(
+            select(link.c.tag_id, func.count())
+            .where(link.c.recipe_id.in_(ids)).group_by(link.c.tag_id)
+        ):
+            deltas[tag_id] = deltas.get(tag_id, 0) - count
+    counts = delete_recipes(recipe_ids)
+    _adjust_tag_counts(deltas)
+    return counts
+
+
+def bulk_add_tag(recipe_ids, tag_id: int):
+    """INSERT ... SELECT только для рецептов, у которых тега ещё нет."""
+    link = TagInRecipe.__table__
+    added = 0
+    for ids in chunked(recipe_ids, CHUNK):
+        missing = ~exists().where(and_(link.c.tag_id == tag_id,
+                                       link.c.recipe_id == Recipe.id))
+        stmt = link.insert().from_select(
+            ['tag_id', 'recipe_id'],
+            select(literal(tag_id), Recipe.id)
+            .where(Recipe.id.in_(ids), missing),
+        )
+        added += db.session.execute(stmt).rowcount
+    _adjust_tag_counts({tag_id: added})
+    return {'tag_in_recipe (добавлено)': added}
+
+
+def bulk_remove_tag(recipe_ids, tag_id: int):
+    link = TagInRecipe.__table__
+    removed = 0
+    for ids in chunked(recipe_ids, CHUNK):
+        removed += db.session.execute(
+            link.delete().where(link.c.tag_id == tag_id,
+                                link.c.recipe_id.in_(ids))
+        ).rowcount
+    _adjust_tag_counts({tag_id: -removed})
+    return {'tag_in_recipe (удалено)': removed}
+
+
+def merge_ingredients(source_ids, target_id: int):
+    """
+    Объединяет ингредиенты source_ids в target_id (единицы измерения
+    должны совпадать):
+    1. если в рецепте уже есть target — количество source прибавляется
+       к нему, строки source удаляются;
+    2. иначе одна строка source (с минимальным id) получает суммарное
+       количество, остальные удаляются, и она перенаправляется на target;
+    3. связи с сайтом (site_ingredient) перенаправляются на target и
+       помечаются merged — следующая синхронизация не вернёт source;
+    4. прочие ссылки на source удаляются, сами source — тоже.
+    """
+    ri = RecipeIngredient.__table__
+    ingredient_table = Ingredient.__table__
+    sources = [i for i in source_ids if i != target_id]
+    if not sources:
+        return {}
+    units = dict(db.session.execute(
+        select(ingredient_table.c.id, ingredient_table.c.measurement_unit)
+        .where(ingredient_table.c.id.in_([target_id, *sources]))
+    ).all())
+    if target_id not in units:
+        raise ValueError(f'нет ингредиента {target_id}')
+    if len(set(units.values())) > 1:
+        raise ValueError('разные единицы измерения: '
+                         + ', '.join(sorted(set(units.values()))))
+
+    src = ri.alias('src')
+    is_source = src.c.ingredient_id.in_(sources)
+    same_recipe = src.c.recipe_id == ri.c.recipe_id
+    source_sum = (select(func.sum(src.c.amount))
+                  .where(same_recipe, is_source).scalar_subquery())
+    has_target = exists().where(same_recipe,
+                                src.c.ingredient_id == target_id)
+    counts = {}
+
+    counts['recipe_ingredient (сложено)'] = db.session.execute(
+        ri.update()
+        .where(ri.c.ingredient_id == target_id,
+               exists().where(same_recipe, is_source))
+        .values(amount=ri.c.amount + source_sum)
+    ).rowcount
+    removed = db.session.execute(
+        ri.delete().where(ri.c.ingredient_id.in_(sources), has_target)
+    ).rowcount
+
+    # ingredient_id меняется последним запросом: SQLite вычисляет
+    # коррелированные подзапросы построчно, и уже перенаправленная
+    # строка выпала бы из src
+    keeper_id = (select(func.min(src.c.id))
+                 .where(same_recipe, is_source).scalar_subquery())
+    db.session.execute(
+        ri.update()
+        .where(ri.c.ingredient_id.in_(sources), ri.c.id == keeper_id)
+        .values(amount=source_sum)
+    )
+    removed += db.session.execute(
+        ri.delete().where(ri.c.ingredient_id.in_(sources),
+                          ri.c.id != keeper_id)
+    ).rowcount
+    counts['recipe_ingredient (перенаправлено)'] = db.session.execute(
+        ri.update().where(ri.c.ingredient_id.in_(sources))
+        .values(ingredient_id=target_id)
+    ).rowcount
+    counts['recipe_ingredient (удалено)'] = removed
+
+    site_links = SiteIngredient.__table__
+    counts['site_ingredient (перенаправлено)'] = db.session.execute(
+        site_links.update().where(site_links.c.local_id.in_(sources))
+        .values(local_id=target_id, merged=True)
+    ).rowcount
+
+    for table in db.metadata.sorted_tables:
+        if table is ri or table is site_links:
+            continue
+        for fk in table.foreign_keys:
+            if fk.column.table is ingredient_table:
+                # у таблицы может быть несколько ссылок на ingredient
+                counts[table.name] = counts.get(table.name, 0) + (
+                    db.session.execute(
+                        table.delete().where(fk.parent.in_(sources))
+                    ).rowcount
+                )
+    counts['ingredient'] = db.session.execute(
+        ingredient_table.delete().where(ingredient_table.c.id.in_(sources))
+    ).rowcount
+    return counts
@@ -0,0 +1,118 @@
+# counters.py
+"""
+Денормализованные счётчики для админки: рецептов на тег, избранного
+и корзин на рецепт.
+
+Счётчики обновляются в той же транзакции, что и сами строки:
+обработчик after_flush собирает вставки, удаления и смену ключа у
+TagInRecipe / Favorite / ShoppingCart и применяет приращения одним
+upsert'ом на таблицу. Пакетные операции мимо ORM сами применяют
+приращения (bulk_ops) или вызывают reconcile(), который пересобирает
+таблицы запросом GROUP BY (sync, import_data).
+
+Запуск (полная пересборка):
+    python counters.py
+"""
+from collections import Counter
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from db_utils import increment
+from models import (db, TagInRecipe, Favorite, ShoppingCart,
+                    TagRecipeCount, RecipeFavoriteCount, RecipeCartCount)
+
+# модель-источник -> (таблица счётчика, колонка-ключ)
+COUNTED = {
+    TagInRecipe: (TagRecipeCount.__table__, 'tag_id'),
+    Favorite: (RecipeFavoriteCount.__table__, 'recipe_id'),
+    ShoppingCart: (RecipeCartCount.__table__, 'recipe_id'),
+}
+
+
+def _collect_deltas(session):
+    deltas = {model: Counter() for model in COUNTED}
+    for obj in session.new:
+        if type(obj) in COUNTED:
+            key = COUNTED[type(obj)][1]
+            deltas[type(obj)][getattr(obj, key)] += 1
+    for obj in session.deleted:
+        if type(obj) in COUNTED:
+            key = COUNTED[type(obj)][1]
+            history = inspect(obj).attrs[key].history
+            # для удаляемого объекта берём исходное значение ключа
+            old = (history.deleted or history.unchanged
+                   or [getattr(obj, key)])[0]
+            deltas[type(obj)][old] -= 1
+    for obj in session.dirty:
+        if type(obj) in COUNTED:
+            key = COUNTED[type(obj)][1]
+            history = inspect(obj).attrs[key].history
+            if history.has_changes():
+                for old in history.deleted:
+                    deltas[type(obj)][old] -= 1
+                for new in history.added:
+                    deltas[type(obj)][new] += 1
+    return deltas
+
+
+def _after_flush(session, flush_context):
+    deltas = _collect_deltas(session)
+    if not any(deltas.values()):
+        return
+    connection = session.connection()
+    for model, counts in deltas.items():
+        table, key = COUNTED[model]
+        increment(connection, table, key, counts)
+
+
+def _key_set(target, value, oldvalue, initiator):
+    """Пустой слушатель: нужен только ради active_history."""
+
+
+def register():
+    """Подключает обработчик к сессиям (повторный вызов безопасен)."""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+    for model, (_, key) in COUNTED.items():
+        attribute = getattr(model, key)
+        # active_history: при смене ключа у объекта после commit (атрибуты
+        # истекли) старое значение загружается, иначе его нет в history
+        if not event.contains(attribute, 'set', _key_set):
+            event.listen(attribute, 'set', _key_set, active_history=True)
+
+
+def reconcile(models=None) -> dict:
+    """
+    Пересобирает счётчики моделей models (по умолчанию — все) из
+    исходных таблиц. Коммит остаётся за вызывающим кодом.
+    Возвращает {таблица счётчика: строк}.
+    """
+    result = {}
+    for model in models or COUNTED:
+        table, key = COUNTED[model]
+        source = model.__table__
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(
+            [key, 'count'],
+            select(source.c[key], func.count())
+            .group_by(source.c[key]),
+        ))
+        result[table.name] = db.session.scalar(
+            select(func.count()).select_from(table))
+    return result
+
+
+def main():
+    from app import create_app
+
+    app = create_app(admin=False)
+    with app.app_context():
+        result = reconcile()
+        db.session.commit()
+    print('Счётчики пересобраны: '
+          + ', '.join(f'{k}: {v}' for k, v in result.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# db_utils.py
+"""
+Вспомогательные функции для пакетной работы с БД.
+"""
+from sqlalchemy import event
+
+from models import db, Recipe
+
+
+def _insert_for_dialect():
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def upsert(table, rows, index_elements, update_columns=None):
+    """
+    Пакетный INSERT ... ON CONFLICT по уникальному ключу index_elements.
+    Если update_columns пуст — конфликтующие строки пропускаются
+    (DO NOTHING), иначе перечисленные колонки перезаписываются.
+    Дубликаты ключа внутри пачки схлопываются (побеждает последняя
+    строка): PostgreSQL не даёт обновить одну строку дважды за запрос.
+    Коммит остаётся за вызывающим кодом.
+    """
+    rows = list({
+        tuple(row[c] for c in index_elements): row for row in rows
+    }.values())
+    if not rows:
+        return
+    stmt = _insert_for_dialect()(table)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={c: stmt.excluded[c] for c in update_columns},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    db.session.execute(stmt, rows)
+
+
+def increment(connection, table, key_column: str, deltas: dict):
+    """
+    Прибавляет deltas {ключ: приращение} к колонке count таблицы
+    счётчиков одним INSERT ... ON CONFLICT DO UPDATE.
+    """
+    rows = [{key_column: k, 'count': d} for k, d in deltas.items() if d]
+    if not rows:
+        return
+    stmt = _insert_for_dialect()(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key_column],
+        set_={'count': table.c.count + stmt.excluded['count']},
+    )
+    connection.execute(stmt, rows)
+
+
+def chunked(items, size):
+    """Делит последовательность на списки длиной не больше size."""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def delete_recipes(recipe_ids) -> dict:
+    """
+    Удаляет рецепты и всё, что на них ссылается, набором DELETE ... IN
+    (без загрузки объектов в сессию). Зависимые таблицы берутся из
+    метаданных, поэтому новые модели со ссылкой на recipe учитываются
+    автоматически. Возвращает {имя таблицы: затронуто строк}.
+    """
+    recipe_table = Recipe.__table__
+    counts = {}
+    for ids in chunked(recipe_ids, 500):
+        for table in reversed(db.metadata.sorted_tables):
+            for fk in table.foreign_keys:
+                if fk.column.table is not recipe_table:
+                    continue
+                if fk.ondelete == 'SET NULL':
+                    stmt = (table.update().where(fk.parent.in_(ids))
+                            .values({fk.parent.name: None}))
+                else:
+                    stmt = table.delete().where(fk.parent.in_(ids))
+                counts[table.name] = (counts.get(table.name, 0)
+                                      + db.session.execute(stmt).rowcount)
+        counts[recipe_table.name] = counts.get(recipe_table.name, 0) + (
+            db.session.execute(
+                recipe_table.delete().where(recipe_table.c.id.in_(ids))
+            ).rowcount
+        )
+    return counts
+
+
+def enable_sqlite_wal(engine):
+    """
+    Включает WAL для SQLite: длинные чтения (экспорт, пересчёты)
+    не блокируют запись, а запись не блокирует чтение.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_wal(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.close()
@@ -0,0 +1,258 @@
+# dispatcher.py
+"""
+Бот на нескольких процессах: диспетчер получает обновления Telegram
+(long polling) и раздаёт их N процессам-воркерам по хэшу id
+пользователя (или чата). Все обновления одного пользователя попадают
+в один воркер, поэтому состояние ConversationHandler и user_data
+остаются локальными для процесса, а CPU-работа хендлеров (base64
+фото, клавиатуры, разбор JSON) распределяется по ядрам.
+
+Каждый воркер — обычное Application из tgbot без своего Updater:
+обновления копятся в очереди шарда в процессе диспетчера, и поток-
+подавальщик передаёт их воркеру через multiprocessing.Pipe. Общей
+с воркером multiprocessing.Queue нет намеренно: её межпроцессная
+блокировка, захваченная убитым воркером, не освобождается, и шард
+молча перестал бы получать обновления. Воркер раз в секунду обновляет
+heartbeat; диспетчер перезапускает воркер (с новым Pipe), если процесс
+завершился или его цикл событий не отвечает дольше
+WORKER_HEARTBEAT_TIMEOUT. Очередь шарда при перезапуске сохраняется,
+теряются только обновления, уже переданные упавшему процессу (как и
+при перезапуске обычного бота, теряются незавершённые диалоги).
+
+Запуск:
+    python dispatcher.py [--workers 4]
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+# «or»: в docker-compose незаданная переменная приходит пустой строкой
+BOT_WORKERS = int(os.getenv("BOT_WORKERS") or os.cpu_count() or 1)
+# Воркер без heartbeat дольше этого (с) считается зависшим
+WORKER_HEARTBEAT_TIMEOUT = int(os.getenv("WORKER_HEARTBEAT_TIMEOUT") or 60)
+# Как часто (с) проверять воркеры
+HEALTH_CHECK_INTERVAL = 5
+# Таймаут long polling getUpdates (с)
+POLL_TIMEOUT = 30
+# Пауза после сетевой ошибки getUpdates (с), удваивается до максимума
+POLL_RETRY_MIN = 1
+POLL_RETRY_MAX = 30
+# Сколько обновлений может ждать в очереди одного шарда
+QUEUE_SIZE = 1000
+
+# spawn: воркер не наследует цикл событий и соединения диспетчера
+ctx = mp.get_context("spawn")
+
+
+def shard_for(update, workers: int) -> int:
+    """Номер воркера для обновления: по пользователю, иначе по чату."""
+    if update.effective_user:
+        key = update.effective_user.id
+    elif update.effective_chat:
+        key = update.effective_chat.id
+    else:
+        return 0
+    return abs(key) % workers
+
+
+# --------------------------
+# Воркер
+# --------------------------
+def _recv(conn, timeout: float):
+    try:
+        if not conn.poll(timeout):
+            return ...
+        return conn.recv()
+    except EOFError:
+        # диспетчер закрыл свой конец
+        return None
+
+
+async def _worker_loop(index: int, conn, heartbeat):
+    from telegram import Update
+    from tgbot.application import build_application
+    from tgbot.config import load_config
+
+    load_config()
+    app = build_application(updater=False)
+    loop = asyncio.get_running_loop()
+    async with app:
+        await app.start()
+        print(f"Воркер {index} запущен (pid {os.getpid()})")
+        while True:
+            heartbeat.value = time.time()
+            data = await loop.run_in_executor(None, _recv, conn, 1.0)
+            if data is None:
+                break
+            if data is ...:
+                continue
+            await app.update_queue.put(Update.de_json(data, app.bot))
+        await app.stop()
+
+
+def worker_main(index: int, conn, heartbeat):
+    try:
+        asyncio.run(_worker_loop(index, conn, heartbeat))
+    except KeyboardInterrupt:
+        pass
+
+
+class Worker:
+    """Процесс-воркер шарда; очередь переживает перезапуски процесса."""
+
+    def __init__(self, index: int):
+        self.index = index
+        # очередь в процессе диспетчера: её блокировку воркер не держит
+        self.updates = queue.Queue(QUEUE_SIZE)
+        # без блокировки: запись double атомарна, а блокировку мог бы
+        # унести с собой убитый процесс
+        self.heartbeat = ctx.Value("d", 0.0, lock=False)
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        self._feeder = threading.Thread(
+            target=self._feed, name=f"bot-feeder-{index}", daemon=True)
+
+    def start(self):
+        self.heartbeat.value = time.time()
+        conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=worker_main,
+            args=(self.index, child_conn, self.heartbeat),
+            name=f"bot-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        # свой экземпляр закрываем: после смерти воркера send() в
+        # conn получит BrokenPipeError, а не зависнет
+        child_conn.close()
+        self.conn = conn
+        if not self._feeder.is_alive():
+            self._feeder.start()
+
+    def _feed(self):
+        """Передаёт обновления из очереди шарда текущему процессу."""
+        while True:
+            data = self.updates.get()
+            while True:
+                try:
+                    self.conn.send(data)
+                    break
+                except OSError:
+                    # воркер упал — ждём перезапуска с новым Pipe
+                    time.sleep(1)
+            if data is None:
+                return
+
+    def problem(self):
+        """Причина перезапуска или None, если воркер жив."""
+        if not self.process.is_alive():
+            return f"процесс завершился (код {self.process.exitcode})"
+        silence = time.time() - self.heartbeat.value
+        if silence > WORKER_HEARTBEAT_TIMEOUT:
+            return f"нет heartbeat {silence:.0f} с"
+        return None
+
+    def restart(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+        self.restarts += 1
+        self.start()
+
+    def stop(self, timeout: float = 10):
+        if self.process.is_alive():
+            self.updates.put(None)
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+# --------------------------
+# Диспетчер
+# --------------------------
+async def supervise(workers):
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        for worker in workers:
+            problem = worker.problem()
+            if problem:
+                print(f"Воркер {worker.index}: {problem}, перезапуск "
+                      f"#{worker.restarts + 1}")
+                worker.restart()
+
+
+async def dispatch(workers, token: str):
+    from telegram import Bot, Update
+    from telegram.error import NetworkError, RetryAfter
+
+    async with Bot(token) as tg:
+        offset = None
+        retry = POLL_RETRY_MIN
+        while True:
+            try:
+                updates = await tg.get_updates(
+                    offset=offset, timeout=POLL_TIMEOUT,
+                    allowed_updates=Update.ALL_TYPES,
+                    read_timeout=POLL_TIMEOUT + 10,
+                )
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except NetworkError as e:
+                # в том числе TimedOut: временная ошибка, как в run_polling
+                print(f"getUpdates: {e}, повтор через {retry} с")
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, POLL_RETRY_MAX)
+                continue
+            retry = POLL_RETRY_MIN
+            for update in updates:
+                offset = update.update_id + 1
+                worker = workers[shard_for(update, len(workers))]
+                # put() блокирует только при переполнении очереди шарда
+                await asyncio.to_thread(worker.updates.put, update.to_dict())
+
+
+async def run(workers, token: str):
+    supervisor = asyncio.create_task(supervise(workers))
+    try:
+        await dispatch(workers, token)
+    finally:
+        supervisor.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Бот на нескольких процессах с шардированием по id")
+    parser.add_argument("--workers", type=int, default=BOT_WORKERS,
+                        help="число процессов-воркеров")
+    args = parser.parse_args()
+    if args.workers < 1:
+        raise RuntimeError("Нужен хотя бы один воркер")
+    from tgbot.config import load_config
+    config = load_config()
+
+    workers = [Worker(i) for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    print(f"Диспетчер запущен, воркеров: {len(workers)}")
+    try:
+        asyncio.run(run(workers, config.token))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()
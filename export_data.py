@@ -0,0 +1,85 @@
+# export_data.py
+"""
+Потоковый экспорт рецептов в CSV / JSONL.
+
+Рецепты читаются курсором пачками по CHUNK_SIZE (yield_per), ингредиенты
+и теги подгружаются заранее одним SELECT ... IN на пачку (selectinload),
+а вывод отдаётся кусками — память не зависит от размера каталога.
+Формат записей совпадает с форматом recipes в import_data.py.
+"""
+import csv
+import io
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from models import db, Recipe, RecipeIngredient, TagInRecipe
+
+CHUNK_SIZE = 1000
+FIELDS = ('id', 'name', 'description', 'cooking_time', 'image_path',
+          'resource_url', 'ingredients', 'tags')
+
+
+def iter_recipe_records(chunk_size: int = CHUNK_SIZE):
+    stmt = (
+        select(Recipe)
+        .options(
+            selectinload(Recipe.recipe_ingredients)
+            .joinedload(RecipeIngredient.ingredient),
+            selectinload(Recipe.tag_links).joinedload(TagInRecipe.tag),
+        )
+        .order_by(Recipe.id)
+        .execution_options(yield_per=chunk_size, stream_results=True)
+    )
+    for recipe in db.session.scalars(stmt):
+        yield {
+            'id': recipe.id,
+            'name': recipe.name,
+            'description': recipe.description,
+            'cooking_time': recipe.cooking_time,
+            'image_path': recipe.image_path,
+            'resource_url': recipe.resource_url,
+            'ingredients': [
+                {'name': ri.ingredient.name,
+                 'measurement_unit': ri.ingredient.measurement_unit,
+                 'amount': ri.amount}
+                for ri in recipe.recipe_ingredients
+            ],
+            'tags': [link.tag.slug for link in recipe.tag_links],
+        }
+
+
+def _batched(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(records, batch_size: int = 200):
+    """Куски CSV; вложенные списки записываются как JSON."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(FIELDS)
+    for batch in _batched(records, batch_size):
+        for r in batch:
+            writer.writerow([
+                json.dumps(r[f], ensure_ascii=False)
+                if f in ('ingredients', 'tags') else r[f]
+                for f in FIELDS
+            ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.getvalue():
+        yield buf.getvalue()
+
+
+def jsonl_chunks(records, batch_size: int = 200):
+    for batch in _batched(records, batch_size):
+        yield ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in batch)
@@ -0,0 +1,104 @@
+# file_cache.py
+"""
+Кэш file_id Telegram для картинок рецептов.
+
+После первой отправки картинки (по URL или загрузкой) Telegram
+возвращает file_id, по которому её можно отправлять повторно без
+скачивания и загрузки. Кэш хранит пары (рецепт, хэш картинки) ->
+file_id; при смене картинки меняется хэш, и старая запись просто
+вытесняется. Размер ограничен FILE_ID_CACHE_SIZE, вытесняются давно
+не использованные записи (LRU по last_used_at). last_used_at при
+попадании обновляется не чаще раза в TOUCH_INTERVAL: get_file_id
+вызывается на цикле событий бота при каждом показе карточки, и
+запись в SQLite на каждый показ конкурировала бы с воркерами
+синхронизации и рассылок за блокировку БД.
+
+Бот передаёт id рецепта на сайте; в кэше хранится id локальной копии
+(sync.py), чтобы записи удалялись вместе с рецептом. Пока копии нет,
+запись хранится без рецепта — по одному хэшу картинки.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, TelegramFileCache, SiteRecipe
+
+# Как часто обновлять last_used_at записи при попаданиях
+TOUCH_INTERVAL = timedelta(hours=1)
+
+
+def _utcnow():
+    # SQLite хранит DateTime без зоны — храним наивное UTC-время
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def image_key(source: str) -> str:
+    """Хэш URL или пути картинки рецепта."""
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def _local_recipe_id(site_id: Optional[int]) -> Optional[int]:
+    if site_id is None:
+        return None
+    return db.session.scalar(
+        select(SiteRecipe.local_id).where(SiteRecipe.site_id == site_id)
+    )
+
+
+def _lookup(recipe_id: Optional[int], image_hash: str):
+    recipe_cond = (TelegramFileCache.recipe_id.is_(None) if recipe_id is None
+                   else TelegramFileCache.recipe_id == recipe_id)
+    return db.session.scalar(
+        select(TelegramFileCache)
+        .where(recipe_cond, TelegramFileCache.image_hash == image_hash)
+    )
+
+
+def get_file_id(recipe_id: Optional[int], image_hash: str) -> Optional[str]:
+    """file_id из кэша; попадание обновляет устаревший last_used_at."""
+    entry = _lookup(_local_recipe_id(recipe_id), image_hash)
+    if entry is None:
+        return None
+    now = _utcnow()
+    touched = entry.last_used_at
+    if touched is None or touched < now - TOUCH_INTERVAL:
+        entry.last_used_at = now
+        db.session.commit()
+    return entry.file_id
+
+
+def remember(recipe_id: Optional[int], image_hash: str, file_id: str,
+             file_unique_id: Optional[str] = None):
+    recipe_id = _local_recipe_id(recipe_id)
+    entry = _lookup(recipe_id, image_hash)
+    if entry is None:
+        entry = TelegramFileCache(recipe_id=recipe_id, image_hash=image_hash)
+        db.session.add(entry)
+    entry.file_id = file_id
+    entry.file_unique_id = file_unique_id
+    entry.last_used_at = _utcnow()
+    db.session.flush()
+    evict(current_app.config['FILE_ID_CACHE_SIZE'])
+    db.session.commit()
+
+
+def forget(recipe_id: Optional[int], image_hash: str):
+    """Удаляет запись (например, если Telegram отверг file_id)."""
+    entry = _lookup(_local_recipe_id(recipe_id), image_hash)
+    if entry is not None:
+        db.session.delete(entry)
+        db.session.commit()
+
+
+def evict(max_entries: int) -> int:
+    """Оставляет max_entries самых свежих записей."""
+    table = TelegramFileCache.__table__
+    stale = (select(table.c.id)
+             .order_by(table.c.last_used_at.desc())
+             .offset(max_entries))
+    return db.session.execute(
+        table.delete().where(table.c.id.in_(stale))
+    ).rowcount
@@ -0,0 +1,320 @@
+# import_data.py
+"""
+Потоковый импорт справочников и рецептов из CSV / JSONL.
+
+Файл читается построчно и обрабатывается пачками: каждая пачка
+валидируется, записывается пакетными INSERT ... ON CONFLICT и
+коммитится, так что память не зависит от размера файла, а повторный
+импорт того же файла идемпотентен.
+
+Форматы (колонки CSV = ключи JSONL):
+    ingredients: name, measurement_unit
+    tags:        name, slug
+    recipes:     id, name, description, cooking_time,
+                 [image_path], [resource_url],
+                 ingredients — [{"name", "measurement_unit", "amount"}],
+                 tags — ["slug", ...]
+    В CSV поля ingredients и tags рецептов записываются как JSON.
+    id рецепта — локальный; строки с id рецептов, зеркалированных с
+    сайта (sync.py), отклоняются: их содержимое принадлежит сайту.
+
+Запуск:
+    python import_data.py ingredients ingredients.csv
+    python import_data.py recipes recipes.jsonl --chunk 2000
+"""
+import argparse
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from counters import reconcile
+from db_utils import upsert, chunked
+from models import (db, Tag, Ingredient, Recipe, RecipeIngredient,
+                    TagInRecipe, SiteRecipe)
+
+# Сколько первых ошибок валидации показывать
+MAX_SHOWN_ERRORS = 20
+
+
+# --------------------------
+# Чтение файлов
+# --------------------------
+def read_records(path: Path):
+    """Генератор (номер строки, dict) для .csv и .jsonl/.ndjson."""
+    suffix = path.suffix.lower()
+    with path.open(encoding='utf-8-sig', newline='') as f:
+        if suffix == '.csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif suffix in ('.jsonl', '.ndjson'):
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_num, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_num, {'__error__': f'некорректный JSON: {e}'}
+        else:
+            raise RuntimeError(f'Неизвестный формат файла: {path.name}')
+
+
+# --------------------------
+# Валидация
+# --------------------------
+def _text(record, key, max_len, required=True):
+    value = record.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f'{key}: обязательное поле')
+    if len(value) > max_len:
+        raise ValueError(f'{key}: длиннее {max_len} символов')
+    return value or None
+
+
+def _positive_int(record, key):
+    try:
+        value = int(record.get(key))
+    except (TypeError, ValueError):
+        raise ValueError(f'{key}: ожидается целое число')
+    if value < 1:
+        raise ValueError(f'{key}: должно быть ≥ 1')
+    return value
+
+
+def _json_list(record, key):
+    value = record.get(key) or []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            raise ValueError(f'{key}: ожидается JSON-список')
+    if not isinstance(value, list):
+        raise ValueError(f'{key}: ожидается список')
+    return value
+
+
+def validate_ingredient(record):
+    return {'name': _text(record, 'name', 100),
+            'measurement_unit': _text(record, 'measurement_unit', 50)}
+
+
+def validate_tag(record):
+    return {'name': _text(record, 'name', 50),
+            'slug': _text(record, 'slug', 50)}
+
+
+def validate_recipe(record):
+    ingredients = []
+    for item in _json_list(record, 'ingredients'):
+        if not isinstance(item, dict):
+            raise ValueError('ingredients: ожидаются объекты')
+        ingredients.append({
+            'name': _text(item, 'name', 100),
+            'measurement_unit': _text(item, 'measurement_unit', 50),
+            'amount': _positive_int(item, 'amount'),
+        })
+    return {
+        'id': _positive_int(record, 'id'),
+        'name': _text(record, 'name', 255),
+        'description': _text(record, 'description', 100_000),
+        'cooking_time': _positive_int(record, 'cooking_time'),
+        'image_path': _text(record, 'image_path', 255, required=False),
+        'resource_url': _text(record, 'resource_url', 1000, required=False),
+        'ingredients': ingredients,
+        'tags': [str(s).strip() for s in _json_list(record, 'tags')],
+    }
+
+
+# --------------------------
+# Запись пачек
+# --------------------------
+def write_ingredients(valid, errors):
+    upsert(Ingredient.__table__, [row for _, row in valid],
+           ['name', 'measurement_unit'])
+    return len(valid)
+
+
+def write_tags(valid, errors):
+    """
+    Теги upsert'ятся по slug; строка, чьё название уже занято тегом с
+    другим slug (в БД или выше в пачке), отклоняется.
+    """
+    names = {row['name'] for _, row in valid}
+    owners = {}
+    for part in chunked(names, 500):
+        owners.update(db.session.execute(
+            select(Tag.name, Tag.slug).where(Tag.name.in_(part))).all())
+    rows = []
+    for line_num, row in valid:
+        slug = owners.setdefault(row['name'], row['slug'])
+        if slug != row['slug']:
+            errors.append((line_num,
+                           f"name: «{row['name']}» уже у тега {slug}"))
+            continue
+        rows.append(row)
+    upsert(Tag.__table__, rows, ['slug'], ['name'])
+    return len(rows)
+
+
+def _ingredient_ids(pairs):
+    ids = {}
+    for part in chunked(pairs, 500):
+        stmt = select(Ingredient.name, Ingredient.measurement_unit,
+                      Ingredient.id).where(
+            tuple_(Ingredient.name, Ingredient.measurement_unit).in_(part)
+        )
+        for name, unit, ing_id in db.session.execute(stmt):
+            ids[(name, unit)] = ing_id
+    return ids
+
+
+def _tag_ids(slugs):
+    ids = {}
+    for part in chunked(slugs, 500):
+        stmt = select(Tag.slug, Tag.id).where(Tag.slug.in_(part))
+        ids.update(db.session.execute(stmt).all())
+    return ids
+
+
+def write_recipes(valid, errors):
+    """
+    Недостающие ингредиенты создаются, теги должны существовать заранее
+    (строки с неизвестными тегами отклоняются). Связи рецепта заменяются
+    целиком, как в sync.apply_recipes.
+    """
+    mirrored = set()
+    for part in chunked({r['id'] for _, r in valid}, 500):
+        mirrored.update(db.session.scalars(
+            select(SiteRecipe.local_id).where(SiteRecipe.local_id.in_(part))))
+
+    pairs = {(i['name'], i['measurement_unit'])
+             for _, r in valid for i in r['ingredients']}
+    upsert(Ingredient.__table__,
+           [{'name': n, 'measurement_unit': u} for n, u in pairs],
+           ['name', 'measurement_unit'])
+    ingredient_ids = _ingredient_ids(pairs)
+    tag_ids = _tag_ids({s for _, r in valid for s in r['tags']})
+
+    recipes, links_ing, links_tag = [], [], []
+    for line_num, r in valid:
+        if r['id'] in mirrored:
+            errors.append((line_num, f"id: {r['id']} — рецепт с сайта "
+                                     f"(обновляется синхронизацией)"))
+            continue
+        unknown = [s for s in r['tags'] if s not in tag_ids]
+        if unknown:
+            errors.append((line_num, f"tags: неизвестные теги {unknown}"))
+            continue
+        recipes.append({k: r[k] for k in (
+            'id', 'name', 'description', 'cooking_time',
+            'image_path', 'resource_url')})
+        for i in r['ingredients']:
+            links_ing.append({
+                'recipe_id': r['id'],
+                'ingredient_id': ingredient_ids[(i['name'],
+                                                 i['measurement_unit'])],
+                'amount': i['amount'],
+            })
+        links_tag.extend({'recipe_id': r['id'], 'tag_id': tag_ids[s]}
+                         for s in r['tags'])
+
+    for row in recipes:
+        if row['resource_url'] is None:
+            # иначе upsert затрёт значение по умолчанию
+            row['resource_url'] = Recipe.resource_url.default.arg
+    upsert(Recipe.__table__, recipes, ['id'],
+           ['name', 'description', 'cooking_time', 'image_path',
+            'resource_url'])
+    ids = [row['id'] for row in recipes]
+    db.session.execute(RecipeIngredient.__table__.delete()
+                       .where(RecipeIngredient.recipe_id.in_(ids)))
+    db.session.execute(TagInRecipe.__table__.delete()
+                       .where(TagInRecipe.recipe_id.in_(ids)))
+    upsert(RecipeIngredient.__table__, links_ing,
+           ['recipe_id', 'ingredient_id'], ['amount'])
+    upsert(TagInRecipe.__table__, links_tag, ['tag_id', 'recipe_id'])
+    return len(recipes)
+
+
+IMPORTERS = {
+    'ingredients': (validate_ingredient, write_ingredients),
+    'tags': (validate_tag, write_tags),
+    'recipes': (validate_recipe, write_recipes),
+}
+
+
+def import_file(kind: str, path: Path, chunk_size: int) -> dict:
+    validate, write = IMPORTERS[kind]
+    records = read_records(path)
+    stats = {'rows': 0, 'imported': 0, 'errors': 0}
+    started = time.monotonic()
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        valid, errors = [], []
+        for line_num, record in chunk:
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError('ожидается объект')
+                if '__error__' in record:
+                    raise ValueError(record['__error__'])
+                valid.append((line_num, validate(record)))
+            except ValueError as e:
+                errors.append((line_num, str(e)))
+        try:
+            imported = write(valid, errors) if valid else 0
+            db.session.commit()
+        except IntegrityError as e:
+            # ограничение БД, которое не проверяет валидация: пачка
+            # откатывается целиком, импорт продолжается
+            db.session.rollback()
+            imported = 0
+            errors = [(line_num, f'пачка отклонена: {e.orig}')
+                      for line_num, _ in chunk]
+
+        for line_num, message in errors:
+            if stats['errors'] < MAX_SHOWN_ERRORS:
+                print(f"  строка {line_num}: {message}")
+            stats['errors'] += 1
+        stats['rows'] += len(chunk)
+        stats['imported'] += imported
+        elapsed = time.monotonic() - started
+        print(f"{kind}: {stats['rows']} строк, импортировано "
+              f"{stats['imported']}, ошибок {stats['errors']} "
+              f"({stats['rows'] / elapsed:.0f} строк/с)")
+    if kind == 'recipes':
+        # связи с тегами добавлялись мимо ORM — пересобираем их счётчики
+        reconcile([TagInRecipe])
+        db.session.commit()
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Импорт CSV / JSONL')
+    parser.add_argument('kind', choices=sorted(IMPORTERS))
+    parser.add_argument('path', type=Path)
+    parser.add_argument('--chunk', type=int, default=5000,
+                        help='строк в одной транзакции')
+    args = parser.parse_args()
+
+    app = create_app(admin=False)
+    with app.app_context():
+        stats = import_file(args.kind, args.path, args.chunk)
+    rate = stats['rows'] / stats['seconds'] if stats['seconds'] else 0
+    print(f"Готово: {stats['imported']} из {stats['rows']} строк за "
+          f"{stats['seconds']} с ({rate:.0f} строк/с), "
+          f"ошибок {stats['errors']}")
+
+
+if __name__ == '__main__':
+    main()
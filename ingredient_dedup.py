@@ -0,0 +1,191 @@
+# ingredient_dedup.py
+"""
+Поиск почти-дубликатов ингредиентов («Картофель», «картошка»,
+«Картофель молодой») через MinHash + LSH по символьным 3-граммам.
+
+Каждое название превращается в множество 3-грамм; к нему добавляются
+основы слов (первые STEM_LENGTH букв, с весом STEM_WEIGHT): у
+«картофель» и «картошка» мало общих 3-грамм (Жаккар 0.31), но общая
+основа «карто» (0.44). Множество превращается в
+MinHash-сигнатуру из BANDS × ROWS значений. Сигнатура режется на
+полосы; ингредиенты с одинаковой полосой (и одинаковой единицей
+измерения) становятся кандидатами. Сравниваются только кандидаты,
+поэтому время растёт почти линейно, а не квадратично. Кандидаты
+проверяются точным коэффициентом Жаккара и записываются в
+ingredient_merge_candidate для проверки в админке.
+
+При BANDS=25, ROWS=2 пара с Жаккаром 0.4 попадает в кандидаты с
+вероятностью ~99%, 0.3 — ~91%, 0.1 — ~22% (лишние кандидаты
+отсеиваются точным Жаккаром).
+
+Запуск:
+    python ingredient_dedup.py [--threshold 0.4]
+"""
+import argparse
+import re
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import select
+
+from db_utils import upsert
+from models import db, Ingredient, IngredientMergeCandidate
+
+SHINGLE_SIZE = 3
+STEM_LENGTH = 5
+STEM_WEIGHT = 3
+BANDS = 25
+ROWS = 2
+# Простое число Мерсенна 2^31 - 1: (a * h + b) помещается в uint64
+PRIME = (1 << 31) - 1
+# Слишком большие корзины (частые 3-граммы) ограничиваем, чтобы
+# число пар не росло квадратично
+MAX_BUCKET = 200
+# Сколько шинглов хэшируем за один блок
+BLOCK_SHINGLES = 200_000
+
+NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize(name: str) -> str:
+    name = name.lower().replace('ё', 'е')
+    return ' '.join(NON_WORD_RE.sub(' ', name).split())
+
+
+def shingles(name: str) -> set:
+    words = normalize(name)
+    text = f' {words} '
+    if len(text) <= SHINGLE_SIZE:
+        result = {text}
+    else:
+        result = {text[i:i + SHINGLE_SIZE]
+                  for i in range(len(text) - SHINGLE_SIZE + 1)}
+    # '#' не встречается в нормализованном тексте — с 3-граммами
+    # основы не пересекаются
+    for word in words.split():
+        result.update(f'#{word[:STEM_LENGTH]}{k}'
+                      for k in range(STEM_WEIGHT))
+    return result
+
+
+def minhash_signatures(shingle_sets, num_perm: int, seed: int = 1):
+    """
+    Сигнатуры (n × num_perm) для списка множеств шинглов. Все шинглы
+    хэшируются одним массивом, минимум по группам — np.minimum.reduceat.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode('utf-8')) & PRIME
+         for group in shingle_sets for s in group),
+        dtype=np.uint64,
+    )
+    sizes = np.fromiter((len(g) for g in shingle_sets), dtype=np.int64,
+                        count=len(shingle_sets))
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+    # блоками по группам, чтобы матрица шинглов × перестановок
+    # не занимала гигабайты
+    start = 0
+    while start < len(shingle_sets):
+        end = start
+        total = 0
+        while end < len(shingle_sets) and total < BLOCK_SHINGLES:
+            total += sizes[end]
+            end += 1
+        lo = offsets[start]
+        hi = offsets[end - 1] + sizes[end - 1]
+        permuted = (np.outer(hashes[lo:hi], a) + b) % PRIME
+        signatures[start:end] = np.minimum.reduceat(
+            permuted, offsets[start:end] - lo, axis=0)
+        start = end
+    return signatures
+
+
+def lsh_candidates(signatures, groups, bands: int, rows: int):
+    """Пары индексов (i < j) с совпадающей полосой в одной группе."""
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        part = signatures[:, band * rows:(band + 1) * rows]
+        for i, row in enumerate(part):
+            buckets[(groups[i], row.tobytes())].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            members = members[:MAX_BUCKET]
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def jaccard(x: set, y: set) -> float:
+    return len(x & y) / len(x | y) if x or y else 0.0
+
+
+def find_duplicates(rows, threshold: float, bands: int = BANDS,
+                    rows_per_band: int = ROWS):
+    """
+    rows: [(id, name, measurement_unit)] ->
+    [(id_a, id_b, similarity)] с similarity >= threshold.
+    """
+    if len(rows) < 2:
+        return []
+    sets = [shingles(name) for _, name, _ in rows]
+    units = [normalize(unit) for _, _, unit in rows]
+    signatures = minhash_signatures(sets, bands * rows_per_band)
+    result = []
+    for i, j in lsh_candidates(signatures, units, bands, rows_per_band):
+        score = jaccard(sets[i], sets[j])
+        if score >= threshold:
+            a, b = sorted((rows[i][0], rows[j][0]))
+            result.append((a, b, round(score, 4)))
+    return result
+
+
+def run(threshold: float) -> dict:
+    """
+    Пересчитывает кандидатов. Отклонённые в админке пары (dismissed)
+    сохраняются и повторно не предлагаются.
+    """
+    started = time.monotonic()
+    rows = db.session.execute(
+        select(Ingredient.id, Ingredient.name, Ingredient.measurement_unit)
+    ).all()
+    found = find_duplicates(rows, threshold)
+    table = IngredientMergeCandidate.__table__
+    db.session.execute(table.delete().where(table.c.dismissed.is_(False)))
+    upsert(table, [
+        {'ingredient_id': a, 'candidate_id': b, 'similarity': score,
+         'dismissed': False}
+        for a, b, score in found
+    ], ['ingredient_id', 'candidate_id'])
+    db.session.commit()
+    return {'ingredients': len(rows), 'candidates': len(found),
+            'seconds': round(time.monotonic() - started, 2)}
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(
+        description='Поиск почти-дубликатов ингредиентов')
+    parser.add_argument('--threshold', type=float, default=0.4,
+                        help='минимальный коэффициент Жаккара 3-грамм и основ')
+    args = parser.parse_args()
+
+    app = create_app(admin=False)
+    with app.app_context():
+        stats = run(args.threshold)
+    print(f"Ингредиентов {stats['ingredients']}, кандидатов на "
+          f"объединение {stats['candidates']} за {stats['seconds']} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,21 @@
+# init_db.py
+"""
+Создание схемы БД и пересчёт счётчиков. Запускать при установке и после
+обновлений (новые таблицы): create_app() схему не создаёт.
+"""
 from app import create_app
+from counters import reconcile
 from models import db
 
-app = create_app()
-app.app_context().push()
-db.create_all()
-print("База данных успешно инициализирована.")
+
+def main():
+    app = create_app(admin=False)
+    with app.app_context():
+        db.create_all()
+        reconcile()
+        db.session.commit()
+    print("База данных успешно инициализирована.")
+
+
+if __name__ == "__main__":
+    main()
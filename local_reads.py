@@ -0,0 +1,136 @@
+# local_reads.py
+"""
+Чтение каталога из локального зеркала сайта (его наполняет sync.py).
+
+local_get() отвечает в том же формате, что и API сайта (DRF-пагинация
+{'count', 'next', 'previous', 'results'}), поэтому хендлеры бота
+используют ответ без изменений.
+"""
+import re
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import selectinload
+
+from models import (db, Tag, Ingredient, Recipe, RecipeIngredient,
+                    TagInRecipe, SiteTag, SiteIngredient, SiteRecipe)
+
+RECIPE_DETAIL_RE = re.compile(r'^recipes/(\d+)/?$')
+
+
+def _page(stmt, page: int, page_size: int):
+    count = db.session.scalar(
+        select(func.count()).select_from(stmt.order_by(None).subquery())
+    )
+    rows = db.session.execute(
+        stmt.limit(page_size).offset((page - 1) * page_size)
+    ).all()
+    return {
+        'count': count,
+        'next': f'?page={page + 1}' if page * page_size < count else None,
+        'previous': f'?page={page - 1}' if page > 1 else None,
+        'results': rows,
+    }
+
+
+def _site_ids(link, local_ids):
+    """{локальный id: id на сайте} для строк-копий сайта."""
+    if not local_ids:
+        return {}
+    stmt = select(link.local_id, func.min(link.site_id)).where(
+        link.local_id.in_(local_ids)).group_by(link.local_id)
+    return dict(db.session.execute(stmt).all())
+
+
+def _tag_json(site_id, tag):
+    return {'id': site_id, 'name': tag.name, 'slug': tag.slug}
+
+
+def _recipes_json(rows):
+    """Рецепты (site_id, Recipe) в формате API, с id на сайте."""
+    recipes = [recipe for _, recipe in rows]
+    tag_ids = _site_ids(SiteTag, {link.tag_id for r in recipes
+                                  for link in r.tag_links})
+    ingredient_ids = _site_ids(
+        SiteIngredient,
+        {ri.ingredient_id for r in recipes for ri in r.recipe_ingredients})
+    return [{
+        'id': site_id,
+        'name': recipe.name,
+        'text': recipe.description,
+        'cooking_time': recipe.cooking_time,
+        'image': recipe.image_path,
+        'tags': [_tag_json(tag_ids.get(link.tag_id), link.tag)
+                 for link in recipe.tag_links],
+        'ingredients': [
+            {'id': ingredient_ids.get(ri.ingredient_id),
+             'name': ri.ingredient.name,
+             'measurement_unit': ri.ingredient.measurement_unit,
+             'amount': ri.amount}
+            for ri in recipe.recipe_ingredients
+        ],
+    } for site_id, recipe in rows]
+
+
+def _recipes_query():
+    return select(SiteRecipe.site_id, Recipe).join(
+        Recipe, Recipe.id == SiteRecipe.local_id
+    ).options(
+        selectinload(Recipe.recipe_ingredients)
+        .joinedload(RecipeIngredient.ingredient),
+        selectinload(Recipe.tag_links).joinedload(TagInRecipe.tag),
+    )
+
+
+def local_get(path: str, params: dict, page_size: int = 10):
+    """
+    (status, data) как у api_get, либо None, если путь локально
+    не обслуживается. Отдаются только копии строк сайта с их id на
+    сайте: id строк, заведённых локально, сайт не примет.
+    """
+    path = path.lstrip('/')
+    page = max(int(params.get('page', 1)), 1)
+
+    if path == 'ingredients/':
+        stmt = (select(SiteIngredient.site_id, Ingredient)
+                .join(Ingredient, Ingredient.id == SiteIngredient.local_id)
+                .order_by(Ingredient.name, SiteIngredient.site_id))
+        name = params.get('name')
+        if name:
+            # LIKE в SQLite регистронезависим только для ASCII
+            stmt = stmt.where(or_(
+                Ingredient.name.like(f'{name.lower()}%'),
+                Ingredient.name.like(f'{name.upper()}%'),
+            ))
+        data = _page(stmt, page, page_size)
+        data['results'] = [
+            {'id': site_id, 'name': i.name,
+             'measurement_unit': i.measurement_unit}
+            for site_id, i in data['results']
+        ]
+        return 200, data
+
+    if path == 'tags/':
+        stmt = (select(SiteTag.site_id, Tag)
+                .join(Tag, Tag.id == SiteTag.local_id)
+                .order_by(Tag.name, SiteTag.site_id))
+        data = _page(stmt, page, page_size)
+        data['results'] = [_tag_json(*row) for row in data['results']]
+        return 200, data
+
+    if path == 'recipes/':
+        stmt = _recipes_query().order_by(SiteRecipe.site_id.desc())
+        data = _page(stmt, page, page_size)
+        data['results'] = _recipes_json(data['results'])
+        return 200, data
+
+    match = RECIPE_DETAIL_RE.match(path)
+    if match:
+        row = db.session.execute(
+            _recipes_query()
+            .where(SiteRecipe.site_id == int(match.group(1)))
+        ).first()
+        if row is None:
+            return 404, {'detail': 'Страница не найдена.'}
+        return 200, _recipes_json([row])[0]
+
+    return None
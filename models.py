@@ -207,3 +207,336 @@ class ShoppingCart(db.Model):
 
     def __str__(self):
         return f"{self.user} добавил «{self.recipe}» в корзину"
+
+
+class RecipeSimilarity(db.Model):
+    """Предвычисленные top-K похожих рецептов (см. recommendations.py)."""
+    __tablename__ = 'recipe_similarity'
+
+    recipe_id = db.Column(
+        db.Integer,
+        db.ForeignKey('recipe.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    rank = db.Column(db.Integer, primary_key=True)
+    similar_recipe_id = db.Column(
+        db.Integer,
+        db.ForeignKey('recipe.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    score = db.Column(db.Float, nullable=False)
+
+    recipe = db.relationship('Recipe', foreign_keys=[recipe_id])
+    similar_recipe = db.relationship(
+        'Recipe', foreign_keys=[similar_recipe_id]
+    )
+
+
+class UserRecommendation(db.Model):
+    """Предвычисленные рекомендации «для вас» на основе избранного."""
+    __tablename__ = 'user_recommendation'
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    rank = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(
+        db.Integer,
+        db.ForeignKey('recipe.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    score = db.Column(db.Float, nullable=False)
+
+    user = db.relationship('User')
+    recipe = db.relationship('Recipe')
+
+
+class SyncState(db.Model):
+    """Курсор и статистика зеркалирования сайта (см. sync.py)."""
+    __tablename__ = 'sync_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    cursor = db.Column(db.String(64))
+    last_run_at = db.Column(db.DateTime)
+    last_full_at = db.Column(db.DateTime)
+    items = db.Column(db.Integer, default=0)
+    deleted = db.Column(db.Integer, default=0)
+    seconds = db.Column(db.Float, default=0)
+    lag_seconds = db.Column(db.Float)
+
+    def __str__(self):
+        return f"{self.name}: {self.cursor or '-'}"
+
+
+class SiteTag(db.Model):
+    """
+    Тег сайта -> локальный тег (sync.py). id на сайте и в локальной БД
+    независимы: локальные строки заводятся и в админке, и импортом.
+    """
+    __tablename__ = 'site_tag'
+
+    site_id = db.Column(db.Integer, primary_key=True)
+    local_id = db.Column(
+        db.Integer,
+        db.ForeignKey('tag.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+
+
+class SiteIngredient(db.Model):
+    """Ингредиент сайта -> локальный ингредиент (sync.py)."""
+    __tablename__ = 'site_ingredient'
+
+    site_id = db.Column(db.Integer, primary_key=True)
+    local_id = db.Column(
+        db.Integer,
+        db.ForeignKey('ingredient.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+    # связь перенаправлена объединением ингредиентов (bulk_ops.py):
+    # синхронизация не переименовывает локальную строку
+    merged = db.Column(db.Boolean, default=False, nullable=False)
+
+
+class SiteRecipe(db.Model):
+    """Рецепт сайта -> локальный рецепт (sync.py)."""
+    __tablename__ = 'site_recipe'
+
+    site_id = db.Column(db.Integer, primary_key=True)
+    local_id = db.Column(
+        db.Integer,
+        db.ForeignKey('recipe.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+
+
+class IngredientMergeCandidate(db.Model):
+    """Пара похожих ингредиентов для ручной проверки (ingredient_dedup.py)."""
+    __tablename__ = 'ingredient_merge_candidate'
+
+    id = db.Column(db.Integer, primary_key=True)
+    ingredient_id = db.Column(
+        db.Integer,
+        db.ForeignKey('ingredient.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    candidate_id = db.Column(
+        db.Integer,
+        db.ForeignKey('ingredient.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    similarity = db.Column(db.Float, nullable=False)
+    dismissed = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    ingredient = db.relationship('Ingredient', foreign_keys=[ingredient_id])
+    candidate = db.relationship('Ingredient', foreign_keys=[candidate_id])
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'ingredient_id', 'candidate_id',
+            name='uq_ingredient_merge_candidate'
+        ),
+    )
+
+    def __str__(self):
+        return f"{self.ingredient} ≈ {self.candidate}"
+
+
+class TagRecipeCount(db.Model):
+    """Число рецептов с тегом (поддерживается counters.py)."""
+    __tablename__ = 'tag_recipe_count'
+
+    tag_id = db.Column(
+        db.Integer,
+        db.ForeignKey('tag.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    count = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+    tag = db.relationship('Tag')
+
+
+class RecipeFavoriteCount(db.Model):
+    """Сколько раз рецепт добавлен в избранное (counters.py)."""
+    __tablename__ = 'recipe_favorite_count'
+
+    recipe_id = db.Column(
+        db.Integer,
+        db.ForeignKey('recipe.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    count = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+    recipe = db.relationship('Recipe')
+
+
+class RecipeCartCount(db.Model):
+    """Сколько раз рецепт добавлен в корзину (counters.py)."""
+    __tablename__ = 'recipe_cart_count'
+
+    recipe_id = db.Column(
+        db.Integer,
+        db.ForeignKey('recipe.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    count = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+    recipe = db.relationship('Recipe')
+
+
+class TelegramFileCache(db.Model):
+    """
+    file_id Telegram для картинок рецептов (см. file_cache.py).
+    image_hash — sha256 URL/пути картинки рецепта, для загрузок
+    пользователей без рецепта — file_unique_id Telegram.
+    """
+    __tablename__ = 'telegram_file_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(
+        db.Integer,
+        db.ForeignKey('recipe.id', ondelete='CASCADE')
+    )
+    image_hash = db.Column(db.String(64), nullable=False)
+    file_id = db.Column(db.String(255), nullable=False)
+    file_unique_id = db.Column(db.String(64))
+    created_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc)
+    )
+    last_used_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        index=True
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'recipe_id', 'image_hash',
+            name='uq_telegram_file_cache'
+        ),
+    )
+
+
+class ThumbnailSource(db.Model):
+    """
+    Хэш содержимого картинки рецепта по её URL или пути (thumbnails.py):
+    после перезапуска админки исходники не скачиваются заново.
+    """
+    __tablename__ = 'thumbnail_source'
+
+    source_hash = db.Column(db.String(64), primary_key=True)
+    digest = db.Column(db.String(64), nullable=False)
+    checked_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class TagSubscription(db.Model):
+    """Подписка пользователя на новые рецепты с тегом (broadcast.py)."""
+    __tablename__ = 'tag_subscription'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    tag_id = db.Column(
+        db.Integer,
+        db.ForeignKey('tag.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    created_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    user = db.relationship('User')
+    tag = db.relationship('Tag')
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'user_id', 'tag_id',
+            name='uq_tag_subscription'
+        ),
+    )
+
+
+class Broadcast(db.Model):
+    """
+    Рассылка о новом рецепте. recipe_id — id рецепта на сайте: локальная
+    копия может появиться позже (sync.py), поэтому без внешнего ключа.
+    """
+    __tablename__ = 'broadcast'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer)
+    author_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='SET NULL')
+    )
+    tag_ids = db.Column(db.JSON, default=list)
+    text = db.Column(db.Text, nullable=False)
+    # new -> sending -> done
+    status = db.Column(db.String(10), nullable=False, default='new',
+                       index=True)
+    total = db.Column(db.Integer, default=0)
+    sent = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    unknown = db.Column(db.Integer, default=0)
+    created_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc)
+    )
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    author = db.relationship('User')
+
+    def __str__(self):
+        return f"#{self.id} ({self.status})"
+
+
+class BroadcastDelivery(db.Model):
+    """
+    Доставка рассылки одному пользователю. Статусы: pending -> sending
+    -> sent / failed; unknown — отправка могла пройти (обрыв сети или
+    перезапуск во время отправки), повторно такие не отправляются.
+    """
+    __tablename__ = 'broadcast_delivery'
+
+    id = db.Column(db.Integer, primary_key=True)
+    broadcast_id = db.Column(
+        db.Integer,
+        db.ForeignKey('broadcast.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    chat_id = db.Column(db.BigInteger, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(255))
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'broadcast_id', 'user_id',
+            name='uq_broadcast_delivery'
+        ),
+        db.Index('ix_broadcast_delivery_status', 'broadcast_id', 'status'),
+    )
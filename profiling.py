@@ -0,0 +1,256 @@
+# profiling.py
+"""
+Профилирование хендлеров бота (включается переменными окружения).
+
+install(app) оборачивает callback'и всех хендлеров Application, в том
+числе внутри ConversationHandler. Для каждого обновления меряются:
+    wall — полное время хендлера;
+    cpu  — процессорное время потока (включает и другие задачи цикла
+           событий, пока хендлер ждал, — при последовательной обработке
+           обновлений это немного);
+    api  — суммарное время ожидания запросов к сайту (api_request
+           сообщает о них через record_call).
+Доля PROFILE_SAMPLE_RATE обновлений профилируется cProfile целиком
+(файл .prof со стеками), а все обновления дольше PROFILE_SLOW_MS
+записываются с разбивкой по времени (JSON). Файлы пишутся в
+PROFILE_DIR; там хранятся последние PROFILE_MAX_FILES замеров, более
+старые удаляются (лимит на каталог, общий для всех процессов бота).
+Каталог чистится при первой записи процесса и затем раз в PRUNE_EVERY
+записей, так что лимит может быть превышен не больше чем на столько.
+Ошибка записи не влияет на результат хендлера — она только печатается.
+
+Сводка по записанным профилям:
+    python profiling.py summarize [--dir instance/profiles] [--top 15]
+"""
+import argparse
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+# «or»: в docker-compose незаданная переменная приходит пустой строкой
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE") or 0)
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS") or 0)
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR") or "instance/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES") or 2000)
+# Раз во сколько записей удалять старые замеры из PROFILE_DIR
+PRUNE_EVERY = 50
+
+# Замер текущего обновления (None — обновление не отслеживается)
+_current = contextvars.ContextVar("profile_record", default=None)
+# cProfile не поддерживает вложенные/параллельные профили
+_profiler_busy = False
+# Записей с последней чистки каталога (первая запись процесса — чистит)
+_unpruned = PRUNE_EVERY
+
+
+def enabled() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_MS > 0
+
+
+def record_call(kind: str, name: str, seconds: float):
+    """Учитывает ожидание внешнего вызова (kind: api, ...) в замере."""
+    record = _current.get()
+    if record is not None:
+        record["calls"].append(
+            {"kind": kind, "name": name, "ms": round(seconds * 1000, 2)})
+
+
+# --------------------------
+# Обёртка хендлеров
+# --------------------------
+def _handler_name(callback) -> str:
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+def _prune(directory: Path, keep: int):
+    """Удаляет самые старые замеры (JSON и его .prof), оставляя keep."""
+    # имена начинаются с времени записи — сортировка по имени хронологична
+    records = sorted(directory.glob("*.json"), key=lambda p: p.name)
+    for path in records[:max(len(records) - keep, 0)]:
+        # файл мог удалить другой процесс-воркер
+        path.unlink(missing_ok=True)
+        path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def _save(record: dict, profiler=None):
+    global _unpruned
+    stem = (f"{time.strftime('%Y%m%d-%H%M%S')}_{record['handler']}_"
+            f"{record['update_id']}")
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        if profiler is not None:
+            profiler.dump_stats(PROFILE_DIR / f"{stem}.prof")
+            record["prof"] = f"{stem}.prof"
+        (PROFILE_DIR / f"{stem}.json").write_text(
+            json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        _unpruned += 1
+        if _unpruned >= PRUNE_EVERY:
+            _unpruned = 0
+            _prune(PROFILE_DIR, PROFILE_MAX_FILES)
+    except OSError as e:
+        # профилирование не должно подменять результат хендлера
+        print(f"Профиль {stem} не записан: {e}")
+
+
+def profiled(callback):
+    """Оборачивает async callback хендлера замером времени."""
+    name = _handler_name(callback)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        global _profiler_busy
+        record = {"handler": name,
+                  "update_id": getattr(update, "update_id", None),
+                  "calls": []}
+        token = _current.set(record)
+        profiler = None
+        if not _profiler_busy and random.random() < PROFILE_SAMPLE_RATE:
+            _profiler_busy = True
+            profiler = cProfile.Profile()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return await callback(update, context)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profiler_busy = False
+            _current.reset(token)
+            record["wall_ms"] = round((time.perf_counter() - wall) * 1000, 2)
+            record["cpu_ms"] = round((time.thread_time() - cpu) * 1000, 2)
+            record["api_ms"] = round(
+                sum(c["ms"] for c in record["calls"] if c["kind"] == "api"),
+                2)
+            record["ts"] = time.time()
+            slow = PROFILE_SLOW_MS and record["wall_ms"] >= PROFILE_SLOW_MS
+            if profiler is not None or slow:
+                record["sampled"] = profiler is not None
+                _save(record, profiler)
+
+    return wrapper
+
+
+def _iter_handlers(handlers):
+    from telegram.ext import ConversationHandler
+
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            yield from _iter_handlers(handler.entry_points)
+            for state_handlers in handler.states.values():
+                yield from _iter_handlers(state_handlers)
+            yield from _iter_handlers(handler.fallbacks)
+        else:
+            yield handler
+
+
+def wrap_callbacks(app, decorator) -> int:
+    """
+    Заменяет callback каждого хендлера app (вызывать после add_handler)
+    на decorator(callback). Возвращает число обёрнутых хендлеров.
+    """
+    seen = set()
+    for group in app.handlers.values():
+        for handler in _iter_handlers(group):
+            # один хендлер может стоять в нескольких местах диалога
+            if id(handler) in seen:
+                continue
+            seen.add(id(handler))
+            handler.callback = decorator(handler.callback)
+    return len(seen)
+
+
+def install(app) -> bool:
+    """
+    Включает профилирование хендлеров app. Ничего не делает, если
+    профилирование не включено.
+    """
+    if not enabled():
+        return False
+    wrap_callbacks(app, profiled)
+    return True
+
+
+# --------------------------
+# Сводка
+# --------------------------
+def _percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(directory: Path, top: int):
+    import pstats
+
+    records = []
+    for path in directory.glob("*.json"):
+        try:
+            records.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    if not records:
+        print(f"В {directory} нет профилей.")
+        return
+
+    by_handler = {}
+    for record in records:
+        by_handler.setdefault(record["handler"], []).append(record)
+    print(f"{'хендлер':<32}{'n':>6}{'p50 мс':>10}{'p95 мс':>10}"
+          f"{'max мс':>10}{'cpu %':>8}{'api %':>8}")
+    ranking = sorted(by_handler.items(),
+                     key=lambda item: -sum(r["wall_ms"] for r in item[1]))
+    for name, items in ranking:
+        walls = [r["wall_ms"] for r in items]
+        total = sum(walls) or 1
+        cpu = sum(r["cpu_ms"] for r in items) / total * 100
+        api = sum(r["api_ms"] for r in items) / total * 100
+        print(f"{name[:31]:<32}{len(items):>6}"
+              f"{_percentile(walls, 0.5):>10.1f}"
+              f"{_percentile(walls, 0.95):>10.1f}{max(walls):>10.1f}"
+              f"{cpu:>8.0f}{api:>8.0f}")
+
+    calls = {}
+    for record in records:
+        for call in record["calls"]:
+            calls.setdefault(call["name"], []).append(call["ms"])
+    if calls:
+        print("\nВнешние вызовы (API сайта, Telegram):")
+        for name, times in sorted(calls.items(),
+                                  key=lambda item: -sum(item[1]))[:top]:
+            print(f"  {name:<40}{len(times):>6} × "
+                  f"p95 {_percentile(times, 0.95):.1f} мс")
+
+    for name, items in ranking:
+        profiles = [str(directory / r["prof"]) for r in items
+                    if r.get("prof") and (directory / r["prof"]).exists()]
+        if not profiles:
+            continue
+        print(f"\n=== {name}: {len(profiles)} профилей ===")
+        stats = pstats.Stats(*profiles).strip_dirs()
+        # собственное время функций и кто их вызывал (стеки)
+        stats.sort_stats("tottime").print_stats(top)
+        stats.print_callers(min(top, 5))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Профили хендлеров бота")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser(
+        "summarize", help="самые медленные хендлеры и стеки")
+    summary.add_argument("--dir", type=Path, default=PROFILE_DIR,
+                         help="каталог с профилями")
+    summary.add_argument("--top", type=int, default=15,
+                         help="сколько строк выводить")
+    args = parser.parse_args()
+    summarize(args.dir, args.top)
+
+
+if __name__ == "__main__":
+    main()
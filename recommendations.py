@@ -0,0 +1,269 @@
+# recommendations.py
+"""
+Рекомендации рецептов: «похожие рецепты» и «рекомендовано для вас».
+
+Рецепт описывается двумя разреженными матрицами: рецепт×ингредиент и
+рецепт×тег. Похожесть двух рецептов — взвешенная сумма косинусных
+близостей по ингредиентам и по тегам. Для каждого рецепта считаются
+top-K соседей (блоками строк, чтобы не держать в памяти всю матрицу
+N×N), для каждого пользователя — смесь соседей его избранных рецептов.
+Результаты пишутся в таблицы recipe_similarity и user_recommendation,
+откуда бот читает их одним запросом по первичному ключу.
+
+Запуск (фоновое обновление):
+    python recommendations.py          # один пересчёт
+    python recommendations.py --loop   # каждые RECOMMENDATIONS_INTERVAL с
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from models import (db, User, Recipe, RecipeIngredient, TagInRecipe,
+                    Favorite, RecipeSimilarity, UserRecommendation,
+                    SiteRecipe)
+
+# Вклад ингредиентов и тегов в итоговую похожесть (сумма = 1)
+INGREDIENT_WEIGHT = 0.7
+TAG_WEIGHT = 0.3
+# Сколько ячеек плотного блока сходства считаем за раз (~80 МБ float32)
+MAX_BLOCK_CELLS = 20_000_000
+# Размер пачки при записи результатов
+INSERT_CHUNK = 5000
+
+
+# --------------------------
+# Построение матриц
+# --------------------------
+def _normalized_incidence(pairs, row_index: dict, n_rows: int):
+    """
+    Бинарная матрица «рецепт × признак» из пар (recipe_id, feature_id)
+    с L2-нормированными строками.
+    """
+    pairs = [(r, c) for r, c in pairs if r in row_index]
+    col_index = {c: i for i, c in enumerate(sorted({c for _, c in pairs}))}
+    rows = np.fromiter((row_index[r] for r, _ in pairs),
+                       dtype=np.int64, count=len(pairs))
+    cols = np.fromiter((col_index[c] for _, c in pairs),
+                       dtype=np.int64, count=len(pairs))
+    data = np.ones(len(pairs), dtype=np.float32)
+    m = sparse.csr_matrix((data, (rows, cols)),
+                          shape=(n_rows, max(len(col_index), 1)))
+    m.data[:] = 1.0  # дубликаты пар не должны увеличивать вес
+    norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(m).tocsr()
+
+
+def build_feature_matrix(recipe_ids, ingredient_pairs, tag_pairs):
+    """
+    Общая матрица признаков X, для которой X·Xᵀ =
+    INGREDIENT_WEIGHT·cos(ингредиенты) + TAG_WEIGHT·cos(теги).
+    """
+    row_index = {rid: i for i, rid in enumerate(recipe_ids)}
+    n = len(recipe_ids)
+    ing = _normalized_incidence(ingredient_pairs, row_index, n)
+    tags = _normalized_incidence(tag_pairs, row_index, n)
+    return sparse.hstack([
+        ing * np.float32(np.sqrt(INGREDIENT_WEIGHT)),
+        tags * np.float32(np.sqrt(TAG_WEIGHT)),
+    ]).tocsr().astype(np.float32)
+
+
+def top_k_neighbors(features, k: int):
+    """
+    Для каждой строки возвращает (индексы, оценки) k ближайших соседей.
+    Отсутствующие соседи помечаются индексом -1.
+    """
+    n = features.shape[0]
+    k = min(k, max(n - 1, 0))
+    idx = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return idx, scores
+    features_t = features.T.tocsc()
+    block = max(1, min(n, MAX_BLOCK_CELLS // n))
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        sim = features[start:end].dot(features_t).toarray()
+        # рецепт не должен рекомендовать сам себя
+        sim[np.arange(end - start), np.arange(start, end)] = -1.0
+        part = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(sim, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        part = np.take_along_axis(part, order, axis=1)
+        part_scores = np.take_along_axis(part_scores, order, axis=1)
+        part[part_scores <= 0] = -1
+        idx[start:end] = part
+        scores[start:end] = np.maximum(part_scores, 0)
+    return idx, scores
+
+
+def blend_user_scores(favorite_pairs, user_ids, recipe_index: dict,
+                      nbr_idx, nbr_scores, top_n: int):
+    """
+    Рекомендации «для вас»: сумма похожестей соседей всех избранных
+    рецептов пользователя (F · S, где S — разреженная матрица top-K).
+    Возвращает {user_id: [(recipe_pos, score), ...]}.
+    """
+    n = nbr_idx.shape[0]
+    mask = nbr_idx >= 0
+    sim = sparse.csr_matrix(
+        (nbr_scores[mask], (np.nonzero(mask)[0], nbr_idx[mask])),
+        shape=(n, n),
+    )
+    user_index = {uid: i for i, uid in enumerate(user_ids)}
+    pairs = [(user_index[u], recipe_index[r]) for u, r in favorite_pairs
+             if u in user_index and r in recipe_index]
+    if not pairs:
+        return {}
+    rows, cols = zip(*pairs)
+    fav = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (rows, cols)),
+        shape=(len(user_ids), n),
+    )
+    fav.data[:] = 1.0
+    blended = fav.dot(sim).tocsr()
+    result = {}
+    for u, uid in enumerate(user_ids):
+        lo, hi = blended.indptr[u], blended.indptr[u + 1]
+        cols, vals = blended.indices[lo:hi], blended.data[lo:hi]
+        # уже избранное не рекомендуем
+        seen = fav.indices[fav.indptr[u]:fav.indptr[u + 1]]
+        keep = ~np.isin(cols, seen) & (vals > 0)
+        cols, vals = cols[keep], vals[keep]
+        if not len(cols):
+            continue
+        best = np.argsort(-vals)[:top_n]
+        result[uid] = [(int(cols[i]), float(vals[i])) for i in best]
+    return result
+
+
+# --------------------------
+# Пересчёт и запись
+# --------------------------
+def _bulk_insert(table, rows):
+    for i in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(table.insert(), rows[i:i + INSERT_CHUNK])
+
+
+def refresh(top_k: int = 20) -> dict:
+    """
+    Полный пересчёт таблиц рекомендаций в одной транзакции.
+    Читатели видят старые данные до коммита.
+    """
+    started = time.monotonic()
+    session = db.session
+    recipe_ids = list(session.scalars(select(Recipe.id).order_by(Recipe.id)))
+    ingredient_pairs = session.execute(
+        select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id)
+    ).all()
+    tag_pairs = session.execute(
+        select(TagInRecipe.recipe_id, TagInRecipe.tag_id)
+    ).all()
+    favorite_pairs = session.execute(
+        select(Favorite.user_id, Favorite.recipe_id)
+    ).all()
+    user_ids = sorted({u for u, _ in favorite_pairs})
+
+    features = build_feature_matrix(recipe_ids, ingredient_pairs, tag_pairs)
+    nbr_idx, nbr_scores = top_k_neighbors(features, top_k)
+    recipe_index = {rid: i for i, rid in enumerate(recipe_ids)}
+    per_user = blend_user_scores(favorite_pairs, user_ids, recipe_index,
+                                 nbr_idx, nbr_scores, top_k)
+
+    similarity_rows = [
+        {'recipe_id': recipe_ids[i], 'rank': rank,
+         'similar_recipe_id': recipe_ids[j], 'score': float(score)}
+        for i in range(len(recipe_ids))
+        for rank, (j, score) in enumerate(zip(nbr_idx[i], nbr_scores[i]))
+        if j >= 0
+    ]
+    user_rows = [
+        {'user_id': uid, 'rank': rank,
+         'recipe_id': recipe_ids[pos], 'score': score}
+        for uid, recs in per_user.items()
+        for rank, (pos, score) in enumerate(recs)
+    ]
+
+    session.execute(RecipeSimilarity.__table__.delete())
+    session.execute(UserRecommendation.__table__.delete())
+    _bulk_insert(RecipeSimilarity.__table__, similarity_rows)
+    _bulk_insert(UserRecommendation.__table__, user_rows)
+    session.commit()
+    return {
+        'recipes': len(recipe_ids),
+        'users': len(user_ids),
+        'similar_rows': len(similarity_rows),
+        'user_rows': len(user_rows),
+        'seconds': round(time.monotonic() - started, 2),
+    }
+
+
+# --------------------------
+# Чтение (для бота)
+# --------------------------
+def similar_recipes(recipe_id: int, limit: int = 5):
+    """
+    [(id, name, score), ...] — похожие рецепты по убыванию оценки.
+    id — на сайте (бот работает с ними); рецепты, которых нет на сайте,
+    не предлагаются.
+    """
+    source = aliased(SiteRecipe)
+    stmt = (
+        select(SiteRecipe.site_id.label('id'), Recipe.name,
+               RecipeSimilarity.score)
+        .join(source, source.local_id == RecipeSimilarity.recipe_id)
+        .join(Recipe, Recipe.id == RecipeSimilarity.similar_recipe_id)
+        .join(SiteRecipe, SiteRecipe.local_id == Recipe.id)
+        .where(source.site_id == recipe_id)
+        .order_by(RecipeSimilarity.rank)
+        .limit(limit)
+    )
+    return db.session.execute(stmt).all()
+
+
+def recommendations_for(telegram_id: int, limit: int = 5):
+    """[(id на сайте, name, score), ...] — рекомендации пользователю."""
+    stmt = (
+        select(SiteRecipe.site_id.label('id'), Recipe.name,
+               UserRecommendation.score)
+        .join(Recipe, Recipe.id == UserRecommendation.recipe_id)
+        .join(SiteRecipe, SiteRecipe.local_id == Recipe.id)
+        .join(User, User.id == UserRecommendation.user_id)
+        .where(User.telegram_id == telegram_id)
+        .order_by(UserRecommendation.rank)
+        .limit(limit)
+    )
+    return db.session.execute(stmt).all()
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Пересчёт рекомендаций')
+    parser.add_argument('--loop', action='store_true',
+                        help='повторять каждые RECOMMENDATIONS_INTERVAL с')
+    args = parser.parse_args()
+
+    app = create_app(admin=False)
+    top_k = app.config['RECOMMENDATIONS_TOP_K']
+    while True:
+        with app.app_context():
+            stats = refresh(top_k)
+        print(
+            f"Рекомендации обновлены: рецептов {stats['recipes']}, "
+            f"пользователей {stats['users']}, "
+            f"строк {stats['similar_rows']}/{stats['user_rows']} "
+            f"за {stats['seconds']} с"
+        )
+        if not args.loop:
+            break
+        time.sleep(app.config['RECOMMENDATIONS_INTERVAL'])
+
+
+if __name__ == '__main__':
+    main()
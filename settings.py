@@ -23,3 +23,42 @@ class Config:
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', 5000))
+
+    # «or»: в docker-compose незаданная переменная приходит пустой строкой
+    # Рекомендации (recommendations.py)
+    RECOMMENDATIONS_TOP_K = int(os.getenv('RECOMMENDATIONS_TOP_K') or 20)
+    RECOMMENDATIONS_INTERVAL = int(
+        os.getenv('RECOMMENDATIONS_INTERVAL') or 3600
+    )
+
+    # Зеркалирование сайта (sync.py)
+    SITE_API_BASE = (os.getenv('SITE_API_BASE') or '').rstrip('/') + '/'
+    SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE') or 100)
+    SYNC_INTERVAL = int(os.getenv('SYNC_INTERVAL') or 60)
+    # Полный проход (удаления, справочники) раз в N секунд
+    SYNC_FULL_INTERVAL = int(os.getenv('SYNC_FULL_INTERVAL') or 3600)
+
+    # Кэш file_id Telegram для картинок (file_cache.py)
+    FILE_ID_CACHE_SIZE = int(os.getenv('FILE_ID_CACHE_SIZE', 50000))
+
+    # Миниатюры картинок рецептов (thumbnails.py)
+    THUMBNAIL_DIR = os.getenv(
+        'THUMBNAIL_DIR', os.path.join(BASE_DIR, 'instance', 'thumbs')
+    )
+    # Каталог для относительных Recipe.image_path
+    THUMBNAIL_MEDIA_ROOT = os.getenv(
+        'THUMBNAIL_MEDIA_ROOT', os.path.join(BASE_DIR, 'instance', 'media')
+    )
+    THUMBNAIL_MAX_BYTES = int(
+        os.getenv('THUMBNAIL_MAX_BYTES', 500 * 1024 * 1024)
+    )
+    THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+    THUMBNAIL_TIMEOUT = int(os.getenv('THUMBNAIL_TIMEOUT', 10))
+
+    # Рассылки о новых рецептах (broadcast.py)
+    # Глобальный лимит, сообщений/с (у Telegram ~30/с на бота, часть
+    # оставляем интерактивным хендлерам)
+    BROADCAST_RATE = float(os.getenv('BROADCAST_RATE') or 25)
+    BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY') or 20)
+    BROADCAST_BATCH = int(os.getenv('BROADCAST_BATCH') or 500)
+    BROADCAST_INTERVAL = int(os.getenv('BROADCAST_INTERVAL') or 5)
@@ -0,0 +1,403 @@
+# sync.py
+"""
+Зеркалирование рецептов, ингредиентов и тегов с сайта в локальную БД.
+
+Инкрементальный проход забирает рецепты, изменённые после курсора
+(updated_at последнего применённого рецепта), и применяет каждую
+страницу одной транзакцией: пакетная запись рецептов и справочников,
+замена связей recipe_ingredient / tag_in_recipe. Полный проход
+(раз в SYNC_FULL_INTERVAL) дополнительно обновляет справочники целиком
+и удаляет копии рецептов, которых больше нет на сайте.
+
+id на сайте и в локальной БД независимы: соответствие хранится в
+таблицах site_tag / site_ingredient / site_recipe. Строки, заведённые
+в админке или импортом, синхронизация не удаляет; совпадающие с сайтом
+по имени (ингредиент — имя и единица) становятся копиями строк сайта.
+Бот (local_reads.py) видит только копии строк сайта и их id на сайте.
+
+Запуск:
+    python sync.py          # один полный проход
+    python sync.py --loop   # инкрементально каждые SYNC_INTERVAL с
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+from sqlalchemy import bindparam, literal, select, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from counters import reconcile
+from db_utils import upsert, chunked, delete_recipes
+from models import (db, Tag, Ingredient, Recipe, RecipeIngredient,
+                    TagInRecipe, SyncState, SiteTag, SiteIngredient,
+                    SiteRecipe)
+
+STATE_NAME = 'recipes'
+# Отметка о том, что строки старого зеркала связаны с сайтом
+LINKS_STATE_NAME = 'site_links'
+
+
+def _utcnow():
+    # SQLite хранит DateTime без зоны — храним наивное UTC-время
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_dt(value):
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+# --------------------------
+# Чтение с сайта
+# --------------------------
+async def fetch_pages(http, base: str, path: str, params: dict,
+                      page_size: int):
+    """
+    Асинхронный генератор страниц DRF-пагинации; для ответа без
+    пагинации (список) отдаёт одну страницу.
+    """
+    page = 1
+    while True:
+        query = {k: v for k, v in params.items() if v is not None}
+        query.update(page=page, limit=page_size)
+        async with http.get(base + path, params=query, timeout=30) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"{path}: HTTP {resp.status}")
+            data = await resp.json()
+        if isinstance(data, list):
+            yield data
+            return
+        yield data.get('results', [])
+        if not data.get('next'):
+            return
+        page += 1
+
+
+# --------------------------
+# Применение к локальной БД
+# --------------------------
+def _tag_row(item):
+    return {'id': item['id'], 'name': item['name'],
+            'slug': item.get('slug') or f"tag-{item['id']}"}
+
+
+def _ingredient_row(item):
+    return {'id': item['id'], 'name': item['name'],
+            'measurement_unit': item.get('measurement_unit', '')}
+
+
+def _key_filter(table, key, values):
+    columns = [table.c[c] for c in key]
+    if len(columns) == 1:
+        return columns[0].in_([v[0] for v in values])
+    return tuple_(*columns).in_(values)
+
+
+def mirror_rows(model, link, rows, natural_keys=()) -> dict:
+    """
+    Применяет строки сайта (ключ 'id' — id на сайте) к таблице model и
+    возвращает {id на сайте: локальный id}.
+
+    Строка сайта находится по таблице связей link, новая — по
+    естественному ключу (natural_keys, уникальные колонки): строка,
+    заведённая в админке или импортом, не конфликтует с сайтом, а
+    становится его копией. Если сайт переименовал строку в имя, занятое
+    другой локальной строкой, локальное имя не меняется. Строки, в
+    которые связи перенаправлены объединением (колонка merged), тоже не
+    обновляются: несколько строк сайта ведут в одну локальную.
+    """
+    rows = {row['id']: row for row in rows}
+    if not rows:
+        return {}
+    table, links = model.__table__, link.__table__
+    merged_column = links.c.get('merged', literal(False))
+    mapping, merged, dangling = {}, set(), []
+    for part in chunked(rows, 500):
+        stmt = (select(links.c.site_id, table.c.id, merged_column)
+                .outerjoin(table, table.c.id == links.c.local_id)
+                .where(links.c.site_id.in_(part)))
+        for site_id, local_id, is_merged in db.session.execute(stmt):
+            if local_id is None:
+                # локальную строку удалили мимо каскада (ORM в SQLite)
+                dangling.append(site_id)
+            else:
+                mapping[site_id] = local_id
+                if is_merged:
+                    merged.add(site_id)
+    if dangling:
+        db.session.execute(links.delete()
+                           .where(links.c.site_id.in_(dangling)))
+
+    owners = {}
+    for key in natural_keys:
+        values = {tuple(r[c] for c in key) for r in rows.values()}
+        for part in chunked(values, 500):
+            stmt = (select(table.c.id, *(table.c[c] for c in key))
+                    .where(_key_filter(table, key, part)))
+            for local_id, *value in db.session.execute(stmt):
+                owners[key, tuple(value)] = local_id
+
+    updates, new_links, new_rows = [], [], []
+    for site_id, row in rows.items():
+        values = {c: v for c, v in row.items() if c != 'id'}
+        taken = {owners.get((key, tuple(row[c] for c in key)))
+                 for key in natural_keys} - {None}
+        local_id = mapping.get(site_id)
+        if local_id is None and taken:
+            local_id = mapping[site_id] = min(taken)
+            new_links.append({'site_id': site_id, 'local_id': local_id})
+        if local_id is None:
+            new_rows.append((site_id, values))
+        elif taken <= {local_id} and site_id not in merged:
+            updates.append({'_id': local_id,
+                            **{f'_{c}': v for c, v in values.items()}})
+
+    if updates:
+        columns = [c[1:] for c in updates[0] if c != '_id']
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('_id'))
+            .values({c: bindparam(f'_{c}') for c in columns}),
+            updates,
+        )
+    if new_rows:
+        ids = db.session.scalars(
+            table.insert().returning(table.c.id,
+                                     sort_by_parameter_order=True),
+            [values for _, values in new_rows],
+        ).all()
+        for (site_id, _), local_id in zip(new_rows, ids):
+            mapping[site_id] = local_id
+            new_links.append({'site_id': site_id, 'local_id': local_id})
+    if new_links:
+        db.session.execute(links.insert(), new_links)
+    return mapping
+
+
+def apply_tags(items):
+    return mirror_rows(Tag, SiteTag, [_tag_row(t) for t in items],
+                       [('name',), ('slug',)])
+
+
+def apply_ingredients(items):
+    return mirror_rows(Ingredient, SiteIngredient,
+                       [_ingredient_row(i) for i in items],
+                       [('name', 'measurement_unit')])
+
+
+def apply_recipes(items, now):
+    """
+    Применяет страницу рецептов. Вложенные ингредиенты и теги тоже
+    применяются, связи рецептов заменяются целиком.
+    """
+    recipes = [{
+        'id': item['id'],
+        'name': item['name'],
+        'description': item.get('text') or item.get('description') or '',
+        'cooking_time': item['cooking_time'],
+        'image_path': item.get('image'),
+        'updated_at': _parse_dt(item.get('updated_at')) or now,
+    } for item in items]
+    tag_ids = apply_tags(t for item in items for t in item.get('tags', []))
+    ingredient_ids = apply_ingredients(
+        i for item in items for i in item.get('ingredients', []))
+    recipe_ids = mirror_rows(Recipe, SiteRecipe, recipes)
+
+    links_ing, links_tag = [], []
+    for item in items:
+        recipe_id = recipe_ids[item['id']]
+        links_ing.extend({'recipe_id': recipe_id,
+                          'ingredient_id': ingredient_ids[ing['id']],
+                          'amount': ing.get('amount', 0)}
+                         for ing in item.get('ingredients', []))
+        links_tag.extend({'recipe_id': recipe_id,
+                          'tag_id': tag_ids[tag['id']]}
+                         for tag in item.get('tags', []))
+
+    ids = list(recipe_ids.values())
+    db.session.execute(RecipeIngredient.__table__.delete()
+                       .where(RecipeIngredient.recipe_id.in_(ids)))
+    db.session.execute(TagInRecipe.__table__.delete()
+                       .where(TagInRecipe.recipe_id.in_(ids)))
+    upsert(RecipeIngredient.__table__, links_ing,
+           ['recipe_id', 'ingredient_id'], ['amount'])
+    upsert(TagInRecipe.__table__, links_tag, ['tag_id', 'recipe_id'])
+
+
+def _apply_page(apply, page, stats, *args) -> bool:
+    """
+    Применяет страницу (коммит — за вызывающим кодом). Страница,
+    нарушающая ограничения локальной БД, откатывается и пропускается,
+    а не останавливает синхронизацию.
+    """
+    try:
+        apply(page, *args)
+        db.session.flush()
+    except IntegrityError as e:
+        db.session.rollback()
+        stats['failed'] += len(page)
+        print(f"Страница пропущена: {e.orig}")
+        return False
+    return True
+
+
+def _link_legacy_mirror(state):
+    """
+    Зеркало, заполненное до таблиц site_*, хранило строки сайта под их
+    id на сайте: один раз связываем такие строки один к одному.
+    """
+    if db.session.get(SyncState, LINKS_STATE_NAME) is not None:
+        return
+    if state.last_run_at is not None:
+        for model, link in ((Tag, SiteTag), (Ingredient, SiteIngredient),
+                            (Recipe, SiteRecipe)):
+            db.session.execute(link.__table__.insert().from_select(
+                ['site_id', 'local_id'], select(model.id, model.id)))
+    db.session.add(SyncState(name=LINKS_STATE_NAME))
+    db.session.commit()
+
+
+def get_state() -> SyncState:
+    state = db.session.get(SyncState, STATE_NAME)
+    if state is None:
+        state = SyncState(name=STATE_NAME)
+        db.session.add(state)
+        db.session.commit()
+    _link_legacy_mirror(state)
+    return state
+
+
+async def sync_cycle(http, config, full: bool) -> dict:
+    """
+    Один проход синхронизации. Каждая страница — отдельная транзакция,
+    курсор сохраняется вместе с ней, так что прерванный проход
+    продолжится с последней применённой страницы.
+    """
+    base = config['SITE_API_BASE']
+    page_size = config['SYNC_PAGE_SIZE']
+    started = time.monotonic()
+    state = get_state()
+    stats = {'items': 0, 'deleted': 0, 'failed': 0, 'lag_seconds': None}
+
+    if full:
+        async for page in fetch_pages(http, base, 'tags/', {}, page_size):
+            _apply_page(apply_tags, page, stats)
+            db.session.commit()
+        async for page in fetch_pages(http, base, 'ingredients/', {},
+                                      page_size):
+            _apply_page(apply_ingredients, page, stats)
+            db.session.commit()
+
+    params = {'ordering': 'updated_at'}
+    cursor = None if full else state.cursor
+    if cursor:
+        params['updated_after'] = cursor
+    cursor_dt = _parse_dt(cursor)
+    seen_ids = set()
+    async for page in fetch_pages(http, base, 'recipes/', params,
+                                  page_size):
+        seen_ids.update(item['id'] for item in page)
+        if cursor_dt:
+            # сайт может не поддерживать фильтр — отсекаем сами
+            page = [i for i in page
+                    if (_parse_dt(i.get('updated_at')) or _utcnow())
+                    > cursor_dt]
+        if not page:
+            continue
+        now = _utcnow()
+        if not _apply_page(apply_recipes, page, stats, now):
+            # курсор не двигаем; рецепты страницы повторит полный проход
+            continue
+        for item in page:
+            updated = _parse_dt(item.get('updated_at'))
+            if updated is None:
+                continue
+            lag = (now - updated).total_seconds()
+            stats['lag_seconds'] = max(stats['lag_seconds'] or 0, lag)
+            if state.cursor is None or updated > _parse_dt(state.cursor):
+                state.cursor = updated.isoformat()
+        stats['items'] += len(page)
+        db.session.commit()
+
+    if full:
+        # удаляются только копии рецептов сайта, локальные не трогаем
+        mirrored = dict(db.session.execute(
+            select(SiteRecipe.site_id, SiteRecipe.local_id)).all())
+        stats['deleted'] = delete_recipes(sorted(
+            local_id for site_id, local_id in mirrored.items()
+            if site_id not in seen_ids)).get('recipe', 0)
+        state.last_full_at = _utcnow()
+
+    if stats['items'] or stats['deleted']:
+        # связи с тегами менялись мимо ORM — пересобираем их счётчики
+        reconcile([TagInRecipe])
+
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    state.last_run_at = _utcnow()
+    state.items = stats['items']
+    state.deleted = stats['deleted']
+    state.seconds = stats['seconds']
+    state.lag_seconds = stats['lag_seconds']
+    db.session.commit()
+    return stats
+
+
+def format_stats(stats: dict, full: bool) -> str:
+    rate = stats['items'] / stats['seconds'] if stats['seconds'] else 0
+    lag = stats['lag_seconds']
+    return (
+        f"Синхронизация ({'полная' if full else 'инкрементальная'}): "
+        f"рецептов {stats['items']}, удалено {stats['deleted']}, "
+        f"пропущено {stats['failed']}, "
+        f"{stats['seconds']} с ({rate:.1f} рец/с), "
+        f"задержка {'-' if lag is None else f'{lag:.0f} с'}"
+    )
+
+
+async def run(app, loop: bool):
+    config = app.config
+    if config['SITE_API_BASE'] == '/':
+        raise RuntimeError("SITE_API_BASE не задан в окружении")
+    async with aiohttp.ClientSession() as http:
+        while True:
+            with app.app_context():
+                state = get_state()
+                full = (
+                    not loop
+                    or state.last_full_at is None
+                    or (_utcnow() - state.last_full_at).total_seconds()
+                    >= config['SYNC_FULL_INTERVAL']
+                )
+                try:
+                    stats = await sync_cycle(http, config, full)
+                except (aiohttp.ClientError, asyncio.TimeoutError,
+                        RuntimeError, SQLAlchemyError) as e:
+                    db.session.rollback()
+                    print(f"Ошибка синхронизации: {e}")
+                else:
+                    print(format_stats(stats, full))
+            if not loop:
+                break
+            await asyncio.sleep(config['SYNC_INTERVAL'])
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Зеркалирование сайта')
+    parser.add_argument('--loop', action='store_true',
+                        help='работать постоянно (инкрементально)')
+    args = parser.parse_args()
+    asyncio.run(run(create_app(admin=False), args.loop))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+# tests/conftest.py
+"""
+Общие фикстуры: Flask-приложение на временной SQLite с созданной схемой.
+"""
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    pytest.importorskip("flask_sqlalchemy")
+    from settings import Config
+
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI",
+                        f"sqlite:///{tmp_path / 'test.db'}")
+    from app import create_app
+    from models import db
+
+    app = create_app(admin=False)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def session(app):
+    from models import db
+
+    return db.session
@@ -0,0 +1,149 @@
+# tests/test_broadcast.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+pytest.importorskip("telegram")
+
+from sqlalchemy import select  # noqa: E402
+from telegram.error import Forbidden, RetryAfter  # noqa: E402
+
+from broadcast import (RateLimiter, build_recipients, enqueue_recipe,  # noqa: E402
+                       recover_interrupted, run_broadcast, send_one,
+                       subscribe, subscriptions, unsubscribe)
+from models import (Broadcast, BroadcastDelivery, Favorite, Recipe,  # noqa: E402
+                    SiteTag, Tag, TagSubscription, User)
+
+CONFIG = {"BROADCAST_CONCURRENCY": 4, "BROADCAST_BATCH": 2}
+
+
+class FakeBot:
+    """send_message: ошибки по chat_id по очереди, затем успех."""
+
+    def __init__(self, **errors):
+        self.errors = {int(chat[1:]): list(e) for chat, e in errors.items()}
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        errors = self.errors.get(chat_id)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(chat_id)
+
+
+def limiter():
+    return RateLimiter(rate=1000, per_chat=0)
+
+
+@pytest.fixture
+def tags(session):
+    """Тег админки (локальный id 1) и теги сайта 1 и 2 с другими id."""
+    local = Tag(name="Local", slug="local")
+    session.add(local)
+    session.flush()
+    soup = Tag(name="Супы", slug="soup")
+    breakfast = Tag(name="Завтрак", slug="breakfast")
+    session.add_all([soup, breakfast])
+    session.flush()
+    session.add_all([SiteTag(site_id=1, local_id=soup.id),
+                     SiteTag(site_id=2, local_id=breakfast.id)])
+    session.commit()
+    assert local.id == 1 and soup.id != 1
+    return local, soup
+
+
+@pytest.fixture
+def broadcast(session, tags):
+    """Автор 1; 2 — избранное и подписка, 3 — подписка; автор подписан."""
+    local, tag = tags
+    users = [User(telegram_id=100 + i) for i in range(5)]
+    session.add_all(users)
+    session.flush()
+    recipe = Recipe(name="старый", description="-", cooking_time=5,
+                    author_id=users[1].id)
+    session.add(recipe)
+    session.flush()
+    session.add_all([
+        Favorite(user_id=users[2].id, recipe_id=recipe.id),
+        *(TagSubscription(user_id=users[i].id, tag_id=tag.id)
+          for i in (1, 2, 3)),
+        # подписчик локального тега с тем же id, что у тега сайта
+        TagSubscription(user_id=users[4].id, tag_id=local.id),
+    ])
+    session.commit()
+    # бот передаёт id тегов сайта
+    broadcast_id = enqueue_recipe(7, "борщ", [1],
+                                  {"telegram_id": users[1].telegram_id})
+    return session.get(Broadcast, broadcast_id)
+
+
+def delivery_statuses(session):
+    return dict(session.execute(
+        select(BroadcastDelivery.chat_id, BroadcastDelivery.status)).all())
+
+
+def test_subscriptions_use_site_tag_ids(session, tags):
+    profile = {"telegram_id": 500}
+    assert subscribe(profile, 1) is True
+    assert subscribe(profile, 1) is False
+    assert subscribe(profile, 99) is None
+
+    assert subscriptions(500) == [(1, "Супы")]
+    assert unsubscribe(500, 1) is True
+    assert subscriptions(500) == []
+
+
+def test_recipients_exclude_author_without_duplicates(session, broadcast):
+    assert broadcast.tag_ids == [session.get(SiteTag, 1).local_id]
+    assert build_recipients(broadcast) == 2
+    assert broadcast.status == "sending"
+    assert delivery_statuses(session) == {102: "pending", 103: "pending"}
+
+
+def test_run_broadcast_records_results(session, broadcast):
+    build_recipients(broadcast)
+    bot = FakeBot(c103=[Forbidden("blocked")])
+
+    counts = asyncio.run(run_broadcast(bot, broadcast, CONFIG, limiter()))
+
+    assert bot.sent == [102]
+    assert counts["sent"] == 1 and counts["failed"] == 1
+    assert broadcast.status == "done" and broadcast.sent == 1
+    assert delivery_statuses(session) == {102: "sent", 103: "failed"}
+
+
+def test_retry_after_returns_delivery_to_queue(session, broadcast):
+    bot = FakeBot(c5=[RetryAfter(0)] * 3)
+    assert asyncio.run(send_one(bot, 5, "-", limiter())) == ("pending", None)
+
+    build_recipients(broadcast)
+    bot = FakeBot(c102=[RetryAfter(0)] * 3)
+    asyncio.run(run_broadcast(bot, broadcast, CONFIG, limiter()))
+
+    assert delivery_statuses(session) == {102: "sent", 103: "sent"}
+    assert session.scalar(select(BroadcastDelivery.attempts).where(
+        BroadcastDelivery.chat_id == 102)) == 2
+
+
+def test_interrupted_deliveries_become_unknown(session, broadcast):
+    build_recipients(broadcast)
+    session.execute(BroadcastDelivery.__table__.update()
+                    .where(BroadcastDelivery.chat_id == 102)
+                    .values(status="sending"))
+    session.commit()
+
+    assert recover_interrupted() == 1
+    assert delivery_statuses(session) == {102: "unknown", 103: "pending"}
+
+
+def test_rate_limiter_spaces_messages_to_one_chat():
+    async def timings():
+        limit = RateLimiter(rate=1000, per_chat=0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for chat in (1, 2, 1):
+            await limit.acquire(chat)
+        return loop.time() - started
+
+    assert asyncio.run(timings()) >= 0.05
@@ -0,0 +1,140 @@
+# tests/test_bulk_ops.py
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from sqlalchemy import select  # noqa: E402
+
+from bulk_ops import (run_bulk, merge_ingredients, bulk_add_tag,  # noqa: E402
+                      bulk_remove_tag, bulk_delete_recipes)
+from counters import reconcile  # noqa: E402
+from models import (Ingredient, IngredientMergeCandidate, Recipe,  # noqa: E402
+                    RecipeIngredient, SiteIngredient, Tag, TagInRecipe,
+                    TagRecipeCount)
+
+
+@pytest.fixture
+def catalog(session):
+    """Картофель (цель), картошка и картофан (варианты), мука в штуках."""
+    ings = {name: Ingredient(name=name, measurement_unit=unit)
+            for name, unit in (("картофель", "г"), ("картошка", "г"),
+                               ("картофан", "г"), ("мука", "шт"))}
+    recipes = [Recipe(name=f"r{i}", description="-", cooking_time=5)
+               for i in range(3)]
+    session.add_all([*ings.values(), *recipes])
+    session.flush()
+    # r0: оба варианта без цели; r1: цель и вариант; r2: только мука
+    for recipe, items in zip(recipes, (
+            [("картошка", 100), ("картофан", 50)],
+            [("картофель", 10), ("картошка", 5)],
+            [("мука", 1)])):
+        for name, amount in items:
+            session.add(RecipeIngredient(recipe_id=recipe.id,
+                                         ingredient_id=ings[name].id,
+                                         amount=amount))
+    session.add(IngredientMergeCandidate(
+        ingredient_id=ings["картошка"].id, candidate_id=ings["картофан"].id,
+        similarity=0.5))
+    session.commit()
+    return ings, recipes
+
+
+def recipe_ingredients(session, recipe):
+    return sorted(session.execute(
+        select(Ingredient.name, RecipeIngredient.amount)
+        .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+        .where(RecipeIngredient.recipe_id == recipe.id)
+    ).all())
+
+
+def test_merge_several_sources_into_one_recipe(session, catalog):
+    ings, recipes = catalog
+    args = ([ings["картошка"].id, ings["картофан"].id],
+            ings["картофель"].id)
+
+    dry = run_bulk(merge_ingredients, *args, dry_run=True)
+    assert len(session.scalars(select(Ingredient)).all()) == 4
+    counts = run_bulk(merge_ingredients, *args)
+
+    assert dry == counts
+    assert counts == {
+        "recipe_ingredient (сложено)": 1,
+        "recipe_ingredient (перенаправлено)": 1,
+        "recipe_ingredient (удалено)": 2,
+        "ingredient_merge_candidate": 1,
+        "site_ingredient (перенаправлено)": 0,
+        "ingredient": 2,
+    }
+    assert recipe_ingredients(session, recipes[0]) == [("картофель", 150)]
+    assert recipe_ingredients(session, recipes[1]) == [("картофель", 15)]
+
+
+def test_merge_keeps_site_links(session, catalog):
+    apply_ingredients = pytest.importorskip("sync").apply_ingredients
+    ings, _ = catalog
+    session.add_all([SiteIngredient(site_id=40,
+                                    local_id=ings["картофель"].id),
+                     SiteIngredient(site_id=41,
+                                    local_id=ings["картошка"].id)])
+    session.commit()
+    site = [{"id": 40, "name": "картофель", "measurement_unit": "г"},
+            {"id": 41, "name": "картошка", "measurement_unit": "г"}]
+
+    counts = run_bulk(merge_ingredients, [ings["картошка"].id],
+                      ings["картофель"].id)
+    assert counts["site_ingredient (перенаправлено)"] == 1
+    mapping = apply_ingredients(site)
+    session.commit()
+
+    # синхронизация не возвращает картошку и не переименовывает цель
+    assert mapping == {40: ings["картофель"].id, 41: ings["картофель"].id}
+    assert sorted(session.scalars(select(Ingredient.name))) == [
+        "картофан", "картофель", "мука"]
+
+
+def test_merge_counts_every_reference_to_sources(session, catalog):
+    ings, _ = catalog
+    session.add(IngredientMergeCandidate(
+        ingredient_id=ings["картофель"].id,
+        candidate_id=ings["картошка"].id, similarity=0.4))
+    session.add(IngredientMergeCandidate(
+        ingredient_id=ings["картофан"].id,
+        candidate_id=ings["картофель"].id, similarity=0.3))
+    session.commit()
+
+    counts = run_bulk(merge_ingredients,
+                      [ings["картошка"].id, ings["картофан"].id],
+                      ings["картофель"].id, dry_run=True)
+
+    # ссылки по ingredient_id и по candidate_id
+    assert counts["ingredient_merge_candidate"] == 3
+
+
+def test_merge_rejects_mixed_units(session, catalog):
+    ings, recipes = catalog
+    with pytest.raises(ValueError, match="единицы"):
+        run_bulk(merge_ingredients, [ings["мука"].id], ings["картофель"].id)
+    assert recipe_ingredients(session, recipes[2]) == [("мука", 1)]
+
+
+def test_tag_operations_keep_counters(session, catalog):
+    _, recipes = catalog
+    tag = Tag(name="Гарниры", slug="side")
+    session.add(tag)
+    session.flush()
+    session.add(TagInRecipe(tag_id=tag.id, recipe_id=recipes[0].id))
+    session.commit()
+    ids = [r.id for r in recipes]
+
+    assert run_bulk(bulk_add_tag, ids, tag.id) == {
+        "tag_in_recipe (добавлено)": 2}
+    assert session.get(TagRecipeCount, tag.id).count == 3
+    assert run_bulk(bulk_remove_tag, ids[:1], tag.id) == {
+        "tag_in_recipe (удалено)": 1}
+    counts = run_bulk(bulk_delete_recipes, ids[1:2])
+
+    assert counts["recipe"] == 1 and counts["tag_in_recipe"] == 1
+    assert session.get(TagRecipeCount, tag.id).count == 1
+    expected = session.get(TagRecipeCount, tag.id).count
+    reconcile([TagInRecipe])
+    assert session.get(TagRecipeCount, tag.id).count == expected
@@ -0,0 +1,76 @@
+# tests/test_counters.py
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from sqlalchemy import select  # noqa: E402
+
+from counters import reconcile  # noqa: E402
+from models import (User, Tag, Recipe, TagInRecipe, Favorite,  # noqa: E402
+                    ShoppingCart, TagRecipeCount, RecipeFavoriteCount,
+                    RecipeCartCount)
+
+
+@pytest.fixture
+def objects(session):
+    users = [User(telegram_id=i) for i in (1, 2)]
+    tags = [Tag(name=n, slug=n) for n in ("soup", "salad")]
+    recipes = [Recipe(name=f"r{i}", description="-", cooking_time=5)
+               for i in range(2)]
+    session.add_all([*users, *tags, *recipes])
+    session.commit()
+    return users, tags, recipes
+
+
+def counts(session, model, key):
+    return dict(session.execute(select(key, model.count)).all())
+
+
+def test_insert_delete_and_key_change(session, objects):
+    users, tags, recipes = objects
+    links = [TagInRecipe(tag_id=tags[0].id, recipe_id=r.id) for r in recipes]
+    favorites = [Favorite(user_id=u.id, recipe_id=recipes[0].id)
+                 for u in users]
+    session.add_all([*links, *favorites,
+                     ShoppingCart(user_id=users[0].id,
+                                  recipe_id=recipes[1].id)])
+    session.commit()
+    assert counts(session, TagRecipeCount, TagRecipeCount.tag_id) == {
+        tags[0].id: 2}
+    assert counts(session, RecipeFavoriteCount,
+                  RecipeFavoriteCount.recipe_id) == {recipes[0].id: 2}
+    assert counts(session, RecipeCartCount,
+                  RecipeCartCount.recipe_id) == {recipes[1].id: 1}
+
+    # смена ключа: -1 старому тегу, +1 новому
+    links[0].tag_id = tags[1].id
+    session.delete(favorites[1])
+    session.commit()
+
+    assert counts(session, TagRecipeCount, TagRecipeCount.tag_id) == {
+        tags[0].id: 1, tags[1].id: 1}
+    assert counts(session, RecipeFavoriteCount,
+                  RecipeFavoriteCount.recipe_id) == {recipes[0].id: 1}
+
+
+def test_rollback_discards_deltas(session, objects):
+    users, _, recipes = objects
+    session.add(Favorite(user_id=users[0].id, recipe_id=recipes[0].id))
+    session.flush()
+    session.rollback()
+    assert counts(session, RecipeFavoriteCount,
+                  RecipeFavoriteCount.recipe_id) == {}
+
+
+def test_reconcile_rebuilds_from_sources(session, objects):
+    users, tags, recipes = objects
+    # вставка мимо ORM: обработчик after_flush её не видит
+    session.execute(TagInRecipe.__table__.insert(), [
+        {"tag_id": tags[1].id, "recipe_id": r.id} for r in recipes])
+    session.commit()
+    assert counts(session, TagRecipeCount, TagRecipeCount.tag_id) == {}
+
+    assert reconcile([TagInRecipe]) == {"tag_recipe_count": 1}
+    session.commit()
+    assert counts(session, TagRecipeCount, TagRecipeCount.tag_id) == {
+        tags[1].id: 2}
@@ -0,0 +1,92 @@
+# tests/test_dispatcher.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from telegram.error import NetworkError, TimedOut  # noqa: E402
+
+import dispatcher  # noqa: E402
+from dispatcher import Worker, ctx, shard_for  # noqa: E402
+
+
+def update(user=None, chat=None):
+    return SimpleNamespace(
+        effective_user=user and SimpleNamespace(id=user),
+        effective_chat=chat and SimpleNamespace(id=chat))
+
+
+def test_shard_for_user_then_chat():
+    assert shard_for(update(user=7, chat=100), 4) == 3
+    assert shard_for(update(chat=-1001), 4) == 1
+    assert shard_for(update(), 4) == 0
+
+
+def test_feeder_resends_to_restarted_worker():
+    worker = Worker(0)
+    dead, dead_child = ctx.Pipe()
+    dead_child.close()  # воркер умер, не прочитав обновление
+    worker.conn = dead
+    worker._feeder.start()
+    worker.updates.put({"update_id": 1})
+
+    alive, alive_child = ctx.Pipe()
+    worker.conn = alive  # перезапуск с новым Pipe
+    assert alive_child.poll(5)
+    assert alive_child.recv() == {"update_id": 1}
+
+    worker.updates.put(None)
+    worker._feeder.join(5)
+    assert alive_child.recv() is None
+
+
+class FakeBot:
+    def __init__(self, *results):
+        self.results = list(results)
+
+    def __call__(self, token):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get_updates(self, **kwargs):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        if result is None:
+            raise asyncio.CancelledError
+        return result
+
+
+def test_dispatch_keeps_polling_after_network_errors(monkeypatch):
+    import telegram
+
+    message = telegram.Update.de_json(
+        {"update_id": 5, "message": {
+            "message_id": 1, "date": 0, "text": "hi",
+            "chat": {"id": 3, "type": "private"},
+            "from": {"id": 3, "is_bot": False, "first_name": "u"}}},
+        None)
+    monkeypatch.setattr(telegram, "Bot", FakeBot(
+        TimedOut(), NetworkError("connection reset"), [message], None))
+    pauses = []
+
+    async def sleep(seconds):
+        pauses.append(seconds)
+
+    monkeypatch.setattr(dispatcher.asyncio, "sleep", sleep)
+    shards = [[], []]
+    workers = [SimpleNamespace(updates=SimpleNamespace(put=shard.append))
+               for shard in shards]
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(dispatcher.dispatch(workers, "token"))
+
+    assert pauses == [1, 2]
+    assert [u["update_id"] for u in shards[1]] == [5] and not shards[0]
@@ -0,0 +1,102 @@
+# tests/test_export_data.py
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from sqlalchemy import delete  # noqa: E402
+
+from export_data import (csv_chunks, iter_recipe_records,  # noqa: E402
+                         jsonl_chunks)
+from import_data import import_file  # noqa: E402
+from models import (Ingredient, Recipe, RecipeIngredient, Tag,  # noqa: E402
+                    TagInRecipe)
+
+
+@pytest.fixture
+def catalog(session):
+    soup, hot = Tag(name="Супы", slug="soup"), Tag(name="Горячее", slug="hot")
+    salt = Ingredient(name="соль", measurement_unit="г")
+    beet = Ingredient(name="свёкла, \"молодая\"", measurement_unit="шт")
+    session.add_all([soup, hot, salt, beet])
+    session.flush()
+    for i in range(5):
+        recipe = Recipe(id=10 + i, name=f"суп {i}",
+                        description="строка 1\nстрока 2, с запятой",
+                        cooking_time=5 + i,
+                        image_path=f"r{i}.jpg" if i % 2 else None)
+        session.add(recipe)
+        session.flush()
+        session.add(RecipeIngredient(recipe_id=recipe.id,
+                                     ingredient_id=salt.id, amount=i + 1))
+        session.add(TagInRecipe(recipe_id=recipe.id, tag_id=soup.id))
+        if i % 2:
+            session.add(RecipeIngredient(recipe_id=recipe.id,
+                                         ingredient_id=beet.id, amount=2))
+            session.add(TagInRecipe(recipe_id=recipe.id, tag_id=hot.id))
+    session.commit()
+
+
+def export(chunks):
+    return "".join(chunks(iter_recipe_records(chunk_size=2), batch_size=2))
+
+
+def clear_recipes(session):
+    for model in (RecipeIngredient, TagInRecipe, Recipe, Ingredient):
+        session.execute(delete(model))
+    session.commit()
+
+
+def normalized(records):
+    return [{**r, "ingredients": sorted(r["ingredients"], key=str),
+             "tags": sorted(r["tags"])} for r in records]
+
+
+@pytest.mark.parametrize("suffix, chunks", [("csv", csv_chunks),
+                                            ("jsonl", jsonl_chunks)])
+def test_export_round_trips_through_import(session, catalog, tmp_path,
+                                           suffix, chunks):
+    before = normalized(iter_recipe_records())
+    path = tmp_path / f"recipes.{suffix}"
+    path.write_text(export(chunks), encoding="utf-8")
+    clear_recipes(session)
+
+    stats = import_file("recipes", path, chunk_size=2)
+
+    assert stats["imported"] == 5 and stats["errors"] == 0
+    assert normalized(iter_recipe_records()) == before
+
+
+def test_export_view_streams_with_context(app, catalog, monkeypatch):
+    pytest.importorskip("flask_admin")
+    import admin_views
+    from app import init_admin
+
+    monkeypatch.setattr(admin_views, "iter_recipe_records",
+                        functools.partial(iter_recipe_records, chunk_size=2))
+    init_admin(app)
+    client = app.test_client()
+
+    def download(path):
+        response = client.get(path, buffered=False)
+        assert response.is_streamed
+        # тело читается после выхода из view: контекст приложения и
+        # сессию БД держит stream_with_context
+        body = b"".join(response.iter_encoded()).decode("utf-8")
+        return response.headers, body
+
+    # в другом потоке нет контекста приложения фикстуры
+    with ThreadPoolExecutor(1) as pool:
+        headers, body = pool.submit(download,
+                                    "/admin/export/recipes.jsonl").result()
+        _, csv_body = pool.submit(download,
+                                  "/admin/export/recipes.csv").result()
+
+    assert headers["Content-Disposition"] == (
+        "attachment; filename=recipes.jsonl")
+    records = [json.loads(line) for line in body.splitlines()]
+    assert [r["id"] for r in records] == [10, 11, 12, 13, 14]
+    assert csv_body.splitlines()[0].split(",")[:2] == ["id", "name"]
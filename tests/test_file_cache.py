@@ -0,0 +1,76 @@
+# tests/test_file_cache.py
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from sqlalchemy import select  # noqa: E402
+
+from file_cache import (_utcnow, evict, forget, get_file_id,  # noqa: E402
+                        image_key, remember)
+from models import Recipe, SiteRecipe, TelegramFileCache  # noqa: E402
+
+KEY = image_key("http://site/media/borsch.jpg")
+
+
+@pytest.fixture
+def mirrored(session):
+    """Рецепт сайта 900 с локальным id, отличным от 900."""
+    recipe = Recipe(name="борщ", description="-", cooking_time=5)
+    session.add(recipe)
+    session.flush()
+    session.add(SiteRecipe(site_id=900, local_id=recipe.id))
+    session.commit()
+    return recipe
+
+
+def entries(session):
+    return session.execute(select(TelegramFileCache.recipe_id,
+                                  TelegramFileCache.file_id)).all()
+
+
+def test_entries_are_keyed_by_local_recipe(session, mirrored):
+    remember(900, KEY, "file-1", "u1")
+    remember(901, KEY, "file-2")  # рецепт ещё не зеркалирован
+
+    assert set(entries(session)) == {(mirrored.id, "file-1"),
+                                     (None, "file-2")}
+    assert get_file_id(900, KEY) == "file-1"
+    assert get_file_id(901, KEY) == "file-2"
+
+    forget(900, KEY)
+    assert get_file_id(900, KEY) is None
+
+
+def test_hit_touches_only_stale_entries(session, mirrored):
+    remember(900, KEY, "file-1")
+    entry = session.scalar(select(TelegramFileCache))
+    fresh = entry.last_used_at
+
+    assert get_file_id(900, KEY) == "file-1"
+    assert entry.last_used_at == fresh
+
+    stale = _utcnow() - timedelta(days=1)
+    entry.last_used_at = stale
+    session.commit()
+    get_file_id(900, KEY)
+    assert entry.last_used_at > stale + timedelta(hours=23)
+
+
+def test_evict_keeps_recently_used(app, session):
+    for i in range(3):
+        remember(None, f"hash{i}", f"file-{i}")
+    rows = session.scalars(select(TelegramFileCache)
+                           .order_by(TelegramFileCache.id)).all()
+    for age, entry in enumerate(reversed(rows)):
+        entry.last_used_at = _utcnow() - timedelta(hours=age)
+    session.commit()
+
+    assert evict(2) == 1
+    session.commit()
+    assert sorted(f for _, f in entries(session)) == ["file-1", "file-2"]
+
+    app.config["FILE_ID_CACHE_SIZE"] = 1
+    remember(None, "hash3", "file-3")
+    assert [f for _, f in entries(session)] == ["file-3"]
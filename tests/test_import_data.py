@@ -0,0 +1,150 @@
+# tests/test_import_data.py
+import json
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from sqlalchemy.exc import IntegrityError  # noqa: E402
+
+import import_data  # noqa: E402
+from import_data import import_file, validate_recipe  # noqa: E402
+from models import (Ingredient, Recipe, RecipeIngredient, SiteRecipe,  # noqa: E402
+                    Tag, TagInRecipe, TagRecipeCount)
+
+
+def write_jsonl(path, records):
+    path.write_text("\n".join(
+        r if isinstance(r, str) else json.dumps(r, ensure_ascii=False)
+        for r in records) + "\n", encoding="utf-8")
+    return path
+
+
+def count(session, model):
+    return session.scalar(select(func.count()).select_from(model))
+
+
+def test_csv_ingredients_validation_and_idempotency(session, tmp_path):
+    path = tmp_path / "ingredients.csv"
+    path.write_text("name,measurement_unit\n"
+                    "соль,г\n"
+                    "мука,г\n"
+                    ",г\n"
+                    f"{'x' * 101},г\n", encoding="utf-8")
+
+    stats = import_file("ingredients", path, chunk_size=2)
+    assert stats == {**stats, "rows": 4, "imported": 2, "errors": 2}
+
+    import_file("ingredients", path, chunk_size=2)
+    assert count(session, Ingredient) == 2
+
+
+def test_validate_recipe_errors():
+    base = {"id": 1, "name": "суп", "description": "-", "cooking_time": 10}
+    assert validate_recipe(base)["ingredients"] == []
+    with pytest.raises(ValueError, match="cooking_time"):
+        validate_recipe({**base, "cooking_time": 0})
+    with pytest.raises(ValueError, match="ingredients"):
+        validate_recipe({**base, "ingredients": "не json"})
+    with pytest.raises(ValueError, match="amount"):
+        validate_recipe({**base, "ingredients": [
+            {"name": "соль", "measurement_unit": "г", "amount": "много"}]})
+
+
+def test_recipes_create_ingredients_and_reject_unknown_tags(session,
+                                                            tmp_path):
+    session.add(Tag(name="Супы", slug="soup"))
+    session.commit()
+    recipe = {"id": 10, "name": "суп", "description": "-",
+              "cooking_time": 30, "tags": ["soup"],
+              "ingredients": [{"name": "соль", "measurement_unit": "г",
+                               "amount": 5}]}
+    path = write_jsonl(tmp_path / "recipes.jsonl", [
+        recipe,
+        {**recipe, "id": 11, "tags": ["unknown"]},
+        "{не json",
+    ])
+
+    stats = import_file("recipes", path, chunk_size=10)
+
+    assert stats["imported"] == 1 and stats["errors"] == 2
+    assert session.get(Recipe, 10).resource_url is not None
+    assert session.get(Recipe, 11) is None
+    assert count(session, RecipeIngredient) == 1
+    assert session.scalar(select(TagRecipeCount.count)) == 1
+
+    # повторный импорт обновляет, а не дублирует
+    write_jsonl(path, [{**recipe, "name": "борщ",
+                        "ingredients": [{**recipe["ingredients"][0],
+                                         "amount": 7}]}])
+    import_file("recipes", path, chunk_size=10)
+    assert session.get(Recipe, 10).name == "борщ"
+    assert session.scalar(select(RecipeIngredient.amount)) == 7
+    assert session.scalar(select(TagRecipeCount.count)) == 1
+
+    # связи, убранные из файла, удаляются
+    write_jsonl(path, [{**recipe, "tags": [], "ingredients": [
+        {"name": "перец", "measurement_unit": "г", "amount": 1}]}])
+    import_file("recipes", path, chunk_size=10)
+    assert count(session, TagInRecipe) == 0
+    assert not session.scalar(select(TagRecipeCount.count))
+    assert session.scalars(select(Ingredient.name).join(
+        RecipeIngredient)).all() == ["перец"]
+
+
+def test_mirrored_recipes_are_not_overwritten(session, tmp_path):
+    mirrored = Recipe(name="с сайта", description="-", cooking_time=5)
+    session.add(mirrored)
+    session.flush()
+    session.add(SiteRecipe(site_id=900, local_id=mirrored.id))
+    session.commit()
+    path = write_jsonl(tmp_path / "recipes.jsonl", [
+        {"id": mirrored.id, "name": "imported", "description": "-",
+         "cooking_time": 5}])
+
+    stats = import_file("recipes", path, chunk_size=10)
+
+    assert stats["imported"] == 0 and stats["errors"] == 1
+    assert session.get(Recipe, mirrored.id).name == "с сайта"
+
+
+def test_non_object_records_are_row_errors(session, tmp_path):
+    path = write_jsonl(tmp_path / "tags.jsonl", [
+        "42", "[1, 2]", {"name": "Супы", "slug": "soup"}])
+
+    stats = import_file("tags", path, chunk_size=10)
+
+    assert stats["imported"] == 1 and stats["errors"] == 2
+
+
+def test_tag_name_clash_is_reported(session, tmp_path):
+    session.add(Tag(name="Супы", slug="soup"))
+    session.commit()
+    path = write_jsonl(tmp_path / "tags.jsonl", [
+        {"name": "Супы", "slug": "soups"},
+        {"name": "Завтрак", "slug": "breakfast"},
+        {"name": "Завтрак", "slug": "morning"},
+        {"name": "Супчики", "slug": "soup"},
+    ])
+
+    stats = import_file("tags", path, chunk_size=10)
+
+    assert stats["imported"] == 2 and stats["errors"] == 2
+    assert dict(session.execute(select(Tag.slug, Tag.name)).all()) == {
+        "soup": "Супчики", "breakfast": "Завтрак"}
+
+
+def test_integrity_error_rejects_chunk(session, tmp_path, monkeypatch):
+    def write(valid, errors):
+        raise IntegrityError("INSERT", {}, Exception("UNIQUE failed"))
+
+    monkeypatch.setitem(import_data.IMPORTERS, "tags",
+                        (import_data.validate_tag, write))
+    path = write_jsonl(tmp_path / "tags.jsonl", [
+        {"name": "Супы", "slug": "soup"}, {"name": "", "slug": "x"}])
+
+    stats = import_file("tags", path, chunk_size=10)
+
+    assert stats["imported"] == 0 and stats["errors"] == 2
@@ -0,0 +1,97 @@
+# tests/test_import_time.py
+"""
+Бюджет холодного старта: импорт модулей в чистом процессе (без
+TELEGRAM_BOT_TOKEN) укладывается в лимит и не тянет тяжёлые зависимости,
+которые нужны только позже (в main() или в отдельных командах).
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Лимиты (с): около двух замеров на одноядерной машине
+BUDGETS = {
+    "app": 1.5,
+    "tgbot.application": 0.8,
+}
+# Старт бота до run_polling(): то же, что делает tgbot.application.main()
+STARTUP = """
+from tgbot.application import build_application, load_config
+load_config()
+build_application()
+"""
+STARTUP_BUDGET = 0.8
+STARTUP_FORBIDDEN = ["flask", "flask_sqlalchemy", "sqlalchemy", "models"]
+# Модули, которых не должно быть после импорта
+FORBIDDEN = {
+    "bot": ["telegram", "telegram.ext", "aiohttp", "flask", "flask_admin"],
+    "app": ["flask_admin", "PIL", "telegram"],
+    "tgbot.application": ["flask", "flask_admin", "flask_sqlalchemy",
+                          "sqlalchemy", "aiohttp", "numpy", "scipy"],
+}
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{code}
+print(json.dumps({{"seconds": time.perf_counter() - started,
+                   "modules": sorted(sys.modules)}}))
+"""
+
+
+def cold_run(code: str, **extra_env) -> dict:
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("TELEGRAM_BOT_TOKEN", "SITE_API_BASE")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env.update(extra_env)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def cold_import(module: str) -> dict:
+    return cold_run(f"import {module}")
+
+
+@pytest.fixture(autouse=True)
+def _dependencies():
+    pytest.importorskip("flask_sqlalchemy")
+    pytest.importorskip("telegram")
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_import_budget(module):
+    # первый импорт прогревает кэш .pyc и файловой системы
+    cold_import(module)
+    seconds = min(cold_import(module)["seconds"] for _ in range(3))
+    assert seconds < BUDGETS[module], (
+        f"import {module}: {seconds:.2f} с, бюджет {BUDGETS[module]} с")
+
+
+@pytest.mark.parametrize("module", sorted(FORBIDDEN))
+def test_no_heavy_imports(module):
+    loaded = set(cold_import(module)["modules"])
+    heavy = [name for name in FORBIDDEN[module] if name in loaded]
+    assert not heavy, f"import {module} загружает {heavy}"
+
+
+def test_bot_startup_budget():
+    # настройки нужны load_config(); к Telegram и сайту сборка не обращается
+    env = {"TELEGRAM_BOT_TOKEN": "123:test",
+           "SITE_API_BASE": "http://site/api/"}
+    cold_run(STARTUP, **env)
+    runs = [cold_run(STARTUP, **env) for _ in range(3)]
+    seconds = min(run["seconds"] for run in runs)
+    assert seconds < STARTUP_BUDGET, (
+        f"старт бота: {seconds:.2f} с, бюджет {STARTUP_BUDGET} с")
+    heavy = [name for name in STARTUP_FORBIDDEN
+             if name in runs[0]["modules"]]
+    assert not heavy, f"старт бота загружает {heavy}"
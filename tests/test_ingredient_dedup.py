@@ -0,0 +1,56 @@
+# tests/test_ingredient_dedup.py
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ingredient_dedup import (find_duplicates, jaccard,  # noqa: E402
+                              minhash_signatures, shingles, run)
+
+# примеры из задачи: варианты картофеля и посторонние ингредиенты
+ROWS = [
+    (1, "Картофель", "г"),
+    (2, "картошка", "г"),
+    (3, "Картофель молодой", "г"),
+    (4, "Морковь", "г"),
+    (5, "Соль", "г"),
+    (6, "Картофель", "шт"),
+]
+
+
+def test_request_examples_are_proposed():
+    pairs = {(a, b) for a, b, _ in find_duplicates(ROWS, threshold=0.4)}
+
+    assert (1, 2) in pairs  # «Картофель» / «картошка»
+    assert (1, 3) in pairs  # «Картофель» / «Картофель молодой»
+    # разные единицы и посторонние ингредиенты не предлагаются
+    assert not {p for p in pairs if {4, 5, 6} & set(p)}
+
+
+def test_normalization_ignores_case_and_yo():
+    assert shingles("Свёкла, отварная") == shingles("свекла отварная")
+
+
+def test_minhash_estimates_jaccard():
+    a, b = shingles("картофель молодой"), shingles("картофель")
+    sig = minhash_signatures([a, b], num_perm=512)
+    estimate = float((sig[0] == sig[1]).mean())
+    assert estimate == pytest.approx(jaccard(a, b), abs=0.08)
+
+
+def test_run_keeps_dismissed_pairs(session):
+    from models import Ingredient, IngredientMergeCandidate
+
+    session.add_all(Ingredient(id=i, name=name, measurement_unit=unit)
+                    for i, name, unit in ROWS)
+    session.commit()
+    assert run(0.4)["candidates"] == 2
+
+    pair = session.query(IngredientMergeCandidate).filter_by(
+        ingredient_id=1, candidate_id=2).one()
+    pair.dismissed = True
+    session.commit()
+    run(0.4)
+
+    rows = session.query(IngredientMergeCandidate).all()
+    assert len(rows) == 2
+    assert [r.dismissed for r in rows if r.candidate_id == 2] == [True]
@@ -0,0 +1,120 @@
+# tests/test_profiling.py
+import asyncio
+import cProfile
+import json
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(profiling, "PROFILE_SLOW_MS", 0)
+    monkeypatch.setattr(profiling, "_unpruned", profiling.PRUNE_EVERY)
+    return tmp_path
+
+
+def record(update_id):
+    return {"handler": "show", "update_id": update_id, "calls": [],
+            "wall_ms": 1.0, "cpu_ms": 1.0, "api_ms": 0}
+
+
+def saved(directory):
+    return [json.loads(p.read_text(encoding="utf-8"))
+            for p in sorted(directory.glob("*.json"))]
+
+
+class Update:
+    update_id = 1
+
+
+def run(callback):
+    return asyncio.run(profiling.profiled(callback)(Update(), None))
+
+
+def test_directory_keeps_latest_records(profiles, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 2)
+    # записи прошлых запусков и других процессов
+    for stem in ("20200101-000000_show_1", "20200101-000001_show_2"):
+        (profiles / f"{stem}.json").write_text("{}", encoding="utf-8")
+        (profiles / f"{stem}.prof").write_bytes(b"")
+
+    profiling._save(record(3), cProfile.Profile())
+    # между чистками каталог может временно превышать лимит
+    profiling._save(record(4))
+    assert len(saved(profiles)) == 3
+
+    monkeypatch.setattr(profiling, "_unpruned", profiling.PRUNE_EVERY)
+    profiling._save(record(5))
+    assert sorted(r["update_id"] for r in saved(profiles)) == [4, 5]
+    assert not list(profiles.glob("*.prof"))
+
+
+def test_sampled_update_is_profiled(profiles, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1)
+
+    async def show(update, context):
+        profiling.record_call("api", "GET recipes/", 0.25)
+        profiling.record_call("telegram", "sendMessage", 0.1)
+        return "ok"
+
+    assert run(show) == "ok"
+
+    [data] = saved(profiles)
+    assert data["sampled"] is True and data["update_id"] == 1
+    assert data["api_ms"] == 250.0
+    assert (profiles / data["prof"]).exists()
+
+
+def test_only_slow_updates_are_saved(profiles, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SLOW_MS", 20)
+
+    async def fast(update, context):
+        return None
+
+    async def slow(update, context):
+        await asyncio.sleep(0.03)
+
+    run(fast)
+    run(slow)
+
+    [data] = saved(profiles)
+    assert data["handler"].endswith("slow") and data["sampled"] is False
+    assert data["wall_ms"] >= 20 and "prof" not in data
+
+
+def test_write_errors_do_not_replace_handler_result(profiles, monkeypatch):
+    blocker = profiles / "file"
+    blocker.write_text("", encoding="utf-8")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", blocker / "profiles")
+    monkeypatch.setattr(profiling, "PROFILE_SLOW_MS", 0.001)
+
+    async def ok(update, context):
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def fails(update, context):
+        await asyncio.sleep(0.01)
+        raise KeyError("handler")
+
+    assert run(ok) == "ok"
+    with pytest.raises(KeyError, match="handler"):
+        run(fails)
+
+
+def test_summarize(profiles, monkeypatch, capsys):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1)
+
+    async def show(update, context):
+        profiling.record_call("api", "GET recipes/", 0.05)
+
+    run(show)
+    profiling.summarize(profiles, top=5)
+    out = capsys.readouterr().out
+
+    assert "show" in out.splitlines()[1]
+    assert "GET recipes/" in out and "1 × p95 50.0 мс" in out
+    assert "=== " in out and "1 профилей" in out
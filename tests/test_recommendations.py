@@ -0,0 +1,78 @@
+# tests/test_recommendations.py
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from recommendations import (build_feature_matrix, top_k_neighbors,  # noqa: E402
+                             blend_user_scores, refresh, similar_recipes,
+                             recommendations_for)
+
+
+def test_top_k_orders_by_similarity_and_skips_self():
+    # 1 и 2 делят два ингредиента, 1 и 3 — один, 4 ни с кем не связан
+    recipe_ids = [1, 2, 3, 4]
+    ingredients = [(1, 10), (1, 11), (2, 10), (2, 11), (3, 10), (3, 12),
+                   (4, 13)]
+    features = build_feature_matrix(recipe_ids, ingredients, [])
+    idx, scores = top_k_neighbors(features, 3)
+
+    assert list(idx[0][:2]) == [1, 2]
+    assert scores[0][0] > scores[0][1] > 0
+    assert 0 not in idx[0]
+    # без общих признаков соседей нет
+    assert list(idx[3]) == [-1, -1, -1]
+
+
+def test_tags_add_weight():
+    features = build_feature_matrix([1, 2], [(1, 10), (2, 10)],
+                                    [(1, 5), (2, 5)])
+    _, scores = top_k_neighbors(features, 1)
+    assert scores[0][0] == pytest.approx(1.0, abs=1e-5)
+
+    features = build_feature_matrix([1, 2], [(1, 10), (2, 10)], [])
+    _, scores = top_k_neighbors(features, 1)
+    assert scores[0][0] == pytest.approx(0.7, abs=1e-5)
+
+
+def test_blend_excludes_favorites_and_sums_neighbors():
+    recipe_ids = [1, 2, 3]
+    features = build_feature_matrix(
+        recipe_ids, [(1, 10), (2, 10), (3, 10)], [])
+    idx, scores = top_k_neighbors(features, 2)
+    index = {rid: i for i, rid in enumerate(recipe_ids)}
+    result = blend_user_scores([(7, 1), (7, 2)], [7], index, idx, scores,
+                               top_n=5)
+
+    # 1 и 2 уже в избранном, 3 — сосед обоих
+    assert [pos for pos, _ in result[7]] == [2]
+    assert result[7][0][1] == pytest.approx(1.4, abs=1e-5)
+
+
+def test_refresh_writes_tables(session):
+    from models import (User, Recipe, Ingredient, RecipeIngredient,
+                        Favorite, SiteRecipe)
+
+    user = User(telegram_id=100)
+    ingredients = [Ingredient(name=n, measurement_unit="г")
+                   for n in ("соль", "мука", "сахар")]
+    recipes = [Recipe(name=f"r{i}", description="-", cooking_time=10)
+               for i in range(3)]
+    session.add_all([user, *ingredients, *recipes])
+    session.flush()
+    for recipe, ings in zip(recipes, ([0, 1], [0, 1], [1, 2])):
+        for i in ings:
+            session.add(RecipeIngredient(recipe_id=recipe.id,
+                                         ingredient_id=ingredients[i].id,
+                                         amount=1))
+    session.add(Favorite(user_id=user.id, recipe_id=recipes[0].id))
+    # бот видит рецепты по id на сайте
+    session.add_all(SiteRecipe(site_id=100 + i, local_id=r.id)
+                    for i, r in enumerate(recipes))
+    session.commit()
+
+    stats = refresh(top_k=2)
+
+    assert stats["recipes"] == 3 and stats["users"] == 1
+    assert [r.id for r in similar_recipes(100)] == [101, 102]
+    assert {r.id for r in recommendations_for(100)} == {101, 102}
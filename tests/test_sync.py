@@ -0,0 +1,179 @@
+# tests/test_sync.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from sqlalchemy import select  # noqa: E402
+
+from local_reads import local_get  # noqa: E402
+from models import (Ingredient, Recipe, RecipeIngredient, SiteIngredient,  # noqa: E402
+                    SiteRecipe, SyncState, Tag)
+from sync import STATE_NAME, apply_recipes, sync_cycle, _utcnow  # noqa: E402
+
+BASE = "http://site/api/"
+CONFIG = {"SITE_API_BASE": BASE, "SYNC_PAGE_SIZE": 2}
+
+
+class _Response:
+    status = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.data
+
+
+class FakeSite:
+    """aiohttp.ClientSession.get для DRF-пагинации по словарю путей."""
+
+    def __init__(self, **paths):
+        self.paths = paths
+
+    def get(self, url, params, timeout):
+        items = self.paths[url[len(BASE):]]
+        page, limit = params["page"], params["limit"]
+        return _Response({
+            "results": items[(page - 1) * limit:page * limit],
+            "next": "more" if page * limit < len(items) else None,
+        })
+
+
+def site_recipe(site_id, updated, name=None, ingredients=(), tags=(),
+                cooking_time=10):
+    return {"id": site_id, "name": name or f"site {site_id}", "text": "-",
+            "cooking_time": cooking_time, "updated_at": updated,
+            "ingredients": list(ingredients), "tags": list(tags)}
+
+
+SALT = {"id": 30, "name": "соль", "measurement_unit": "г", "amount": 5}
+SOUP = {"id": 50, "name": "Супы", "slug": "soup"}
+
+
+def run_cycle(site, full):
+    return asyncio.run(sync_cycle(site, CONFIG, full))
+
+
+def test_admin_rows_are_adopted_not_overwritten(session):
+    # строки из админки: ингредиент с тем же именем и рецепт с тем же id
+    salt = Ingredient(name="соль", measurement_unit="г")
+    local = Recipe(id=1, name="мой рецепт", description="-", cooking_time=5)
+    session.add_all([salt, local])
+    session.commit()
+
+    apply_recipes([site_recipe(1, "2024-01-01T00:00:00", ingredients=[SALT],
+                               tags=[SOUP])], _utcnow())
+    session.commit()
+
+    assert session.get(Recipe, 1).name == "мой рецепт"
+    mirrored = session.scalar(select(SiteRecipe.local_id)
+                              .where(SiteRecipe.site_id == 1))
+    assert mirrored != 1
+    assert session.get(SiteIngredient, 30).local_id == salt.id
+    assert session.scalar(select(RecipeIngredient.ingredient_id).where(
+        RecipeIngredient.recipe_id == mirrored)) == salt.id
+    assert session.scalar(select(Tag.slug)) == "soup"
+
+
+def test_rename_into_taken_name_keeps_local_name(session):
+    session.add(Ingredient(name="перец", measurement_unit="г"))
+    session.commit()
+    apply_recipes([site_recipe(1, "2024-01-01T00:00:00",
+                               ingredients=[SALT])], _utcnow())
+    session.commit()
+
+    renamed = dict(SALT, name="перец")
+    apply_recipes([site_recipe(1, "2024-01-02T00:00:00",
+                               ingredients=[renamed])], _utcnow())
+    session.commit()
+
+    names = set(session.scalars(select(Ingredient.name)))
+    assert names == {"соль", "перец"}
+
+
+def test_full_sync_deletes_only_mirrored_recipes(session):
+    session.add(Recipe(name="из импорта", description="-", cooking_time=5))
+    session.commit()
+    site = FakeSite(**{
+        "tags/": [SOUP],
+        "ingredients/": [SALT],
+        "recipes/": [site_recipe(i, f"2024-01-0{i}T00:00:00",
+                                 ingredients=[SALT]) for i in (1, 2, 3)],
+    })
+    stats = run_cycle(site, full=True)
+    assert stats["items"] == 3 and stats["deleted"] == 0
+
+    site.paths["recipes/"] = site.paths["recipes/"][:2]
+    stats = run_cycle(site, full=True)
+
+    assert stats["deleted"] == 1
+    assert set(session.scalars(select(Recipe.name))) == {
+        "из импорта", "site 1", "site 2"}
+
+
+def test_incremental_cursor_skips_applied_recipes(session):
+    site = FakeSite(**{"recipes/": [
+        site_recipe(1, "2024-01-01T00:00:00"),
+        site_recipe(2, "2024-01-02T00:00:00"),
+    ]})
+    run_cycle(site, full=False)
+    assert session.get(SyncState, STATE_NAME).cursor == "2024-01-02T00:00:00"
+
+    site.paths["recipes/"].append(
+        site_recipe(3, "2024-01-03T00:00:00", name="новый"))
+    stats = run_cycle(site, full=False)
+
+    assert stats["items"] == 1
+    assert session.get(SyncState, STATE_NAME).cursor == "2024-01-03T00:00:00"
+
+
+def test_bad_page_is_skipped(session):
+    site = FakeSite(**{"recipes/": [
+        site_recipe(1, "2024-01-01T00:00:00", cooking_time=None),
+        site_recipe(2, "2024-01-02T00:00:00"),
+        site_recipe(3, "2024-01-03T00:00:00"),
+    ]})
+    stats = run_cycle(site, full=False)
+
+    # первая страница (1, 2) нарушает NOT NULL и откатывается целиком
+    assert stats["failed"] == 2 and stats["items"] == 1
+    assert set(session.scalars(select(SiteRecipe.site_id))) == {3}
+
+
+def test_local_reads_expose_site_ids_only(session):
+    session.add(Ingredient(name="сахар", measurement_unit="г"))
+    session.commit()
+    apply_recipes([site_recipe(7, "2024-01-01T00:00:00",
+                               ingredients=[SALT])], _utcnow())
+    session.commit()
+
+    status, data = local_get("ingredients/", {})
+    assert status == 200
+    assert [(i["id"], i["name"]) for i in data["results"]] == [(30, "соль")]
+
+    status, recipe = local_get("recipes/7/", {})
+    assert status == 200
+    assert recipe["id"] == 7 and recipe["ingredients"][0]["id"] == 30
+
+
+def test_legacy_mirror_is_linked_once(session):
+    # зеркало до таблиц site_*: рецепт сайта лежит под своим id
+    session.add_all([
+        SyncState(name=STATE_NAME, last_run_at=_utcnow()),
+        Recipe(id=5, name="site 5", description="-", cooking_time=5),
+    ])
+    session.commit()
+    site = FakeSite(**{"recipes/": [site_recipe(5, "2024-01-05T00:00:00",
+                                                name="обновлён")]})
+    run_cycle(site, full=False)
+
+    assert session.get(SiteRecipe, 5).local_id == 5
+    assert session.get(Recipe, 5).name == "обновлён"
@@ -0,0 +1,64 @@
+# tests/test_thumbnails.py
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+
+import thumbnails  # noqa: E402
+from models import Recipe  # noqa: E402
+
+
+@pytest.fixture
+def client(app, session, tmp_path, monkeypatch):
+    from PIL import Image
+
+    media = tmp_path / "media"
+    media.mkdir()
+    Image.new("RGB", (800, 600), "red").save(media / "soup.png")
+    app.config.update(THUMBNAIL_DIR=str(tmp_path / "thumbs"),
+                      THUMBNAIL_MEDIA_ROOT=str(media),
+                      THUMBNAIL_TIMEOUT=30)
+    app.register_blueprint(thumbnails.thumbs_bp)
+    store = thumbnails.ThumbnailStore()
+    monkeypatch.setattr(thumbnails, "store", store)
+    session.add(Recipe(id=1, name="суп", description="-", cooking_time=5,
+                       image_path="soup.png"))
+    session.commit()
+    yield app.test_client()
+    if store._pool is not None:
+        store._pool.shutdown()
+
+
+def thumb_url(client):
+    response = client.get("/thumbs/recipe/1/small")
+    assert response.status_code == 302
+    return response.headers["Location"]
+
+
+def test_redirect_to_immutable_thumbnail(client):
+    url = thumb_url(client)
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_evicted_thumbnail_is_rebuilt(client, app):
+    url = thumb_url(client)
+    # как после evict(): файлы удалены, хэш в памяти остался
+    for path in Path(app.config["THUMBNAIL_DIR"]).glob("*/*.jpg"):
+        path.unlink()
+    assert client.get(url).status_code == 404
+
+    assert thumb_url(client) == url
+    assert client.get(url).status_code == 200
+
+
+def test_digest_survives_restart(client, app, tmp_path, monkeypatch):
+    url = thumb_url(client)
+    # «перезапуск»: пустой кэш в памяти, исходник недоступен
+    monkeypatch.setattr(thumbnails, "store", thumbnails.ThumbnailStore())
+    (tmp_path / "media" / "soup.png").unlink()
+
+    assert thumb_url(client) == url
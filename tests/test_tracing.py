@@ -0,0 +1,150 @@
+# tests/test_tracing.py
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import tracing
+from tracing import current_trace_id, span, traced
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    exported = []
+    monkeypatch.setattr(tracing, "_export", exported.append)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1)
+    return exported
+
+
+def update(update_id, user_id=7):
+    return SimpleNamespace(update_id=update_id,
+                           effective_user=SimpleNamespace(id=user_id))
+
+
+def test_spans_are_parented_within_a_trace(spans):
+    @traced
+    async def handler(update, context):
+        with span("inner", "api") as attrs:
+            attrs["status"] = 200
+        return current_trace_id()
+
+    trace_id = asyncio.run(handler(update(1), None))
+
+    inner, outer = spans
+    assert inner["trace_id"] == outer["trace_id"] == trace_id
+    assert inner["parent_id"] == outer["span_id"]
+    assert outer["parent_id"] is None
+    assert (outer["kind"], outer["update_id"], outer["user_id"]) == (
+        "handler", 1, 7)
+    assert inner["status"] == 200
+
+
+def test_each_update_gets_its_own_trace(spans):
+    @traced
+    async def handler(update, context):
+        return current_trace_id()
+
+    async def fetcher():
+        # обновления обрабатываются по очереди в одной задаче
+        first = await handler(update(1), None)
+        again = await handler(update(1), None)
+        leaked = current_trace_id()
+        second = await handler(update(2), None)
+        return first, again, leaked, second
+
+    first, again, leaked, second = asyncio.run(fetcher())
+
+    assert leaked is None
+    assert len({first, again, second}) == 3
+    assert all(s["parent_id"] is None for s in spans)
+
+
+def test_unsampled_updates_write_nothing(spans, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0)
+
+    @traced
+    async def handler(update, context):
+        with span("inner"):
+            return current_trace_id()
+
+    assert asyncio.run(handler(update(1), None)) is None
+    assert spans == []
+
+
+def test_api_request_sends_trace_header(spans, monkeypatch):
+    aiohttp = pytest.importorskip("aiohttp")
+    from tgbot import api, config
+
+    sent = {}
+
+    class Response:
+        status = 200
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def text(self):
+            return "{}"
+
+        async def json(self):
+            return {"ok": True}
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def get(self, url, headers, **kwargs):
+            sent.update(url=url, headers=headers)
+            return Response()
+
+    monkeypatch.setattr(aiohttp, "ClientSession", Session)
+    monkeypatch.setattr(config, "_config", config.BotConfig(
+        {"SITE_API_BASE": "http://site/api"}))
+
+    @traced
+    async def handler(update, context):
+        return await api.api_get("recipes/")
+
+    assert asyncio.run(handler(update(1), None)) == (200, {"ok": True})
+
+    api_span, handler_span = spans
+    assert sent["url"] == "http://site/api/recipes/"
+    assert sent["headers"][tracing.TRACE_HEADER] == handler_span["trace_id"]
+    assert (api_span["name"], api_span["status"]) == ("GET recipes/", 200)
+    assert api_span["parent_id"] == handler_span["span_id"]
+
+
+def test_report_own_time_and_slow_shares(tmp_path, capsys):
+    def record(trace, span_id, parent, kind, ms):
+        return {"trace_id": trace, "span_id": span_id, "parent_id": parent,
+                "name": kind, "kind": kind, "start": 0, "duration_ms": ms}
+
+    path = tmp_path / "traces.jsonl"
+    path.write_text("\n".join(json.dumps(s) for s in [
+        record("a", "a1", None, "handler", 100),
+        record("a", "a2", "a1", "api", 60),
+        record("b", "b1", None, "handler", 10),
+    ]) + "\nне json\n", encoding="utf-8")
+
+    tracing.report(path, top=5)
+    lines = capsys.readouterr().out.splitlines()
+
+    def row(prefix):
+        return next(line.split() for line in lines
+                    if line.strip().startswith(prefix))
+
+    assert lines[0] == "Трасс: 2, спанов: 3"
+    # собственное время хендлера трассы a — 40 мс из 100
+    assert row("handler")[1:] == ["40.0", "40.0", "40.0"]
+    assert row("api")[1:] == ["60.0", "60.0", "60.0"]
+    assert row("total")[1:] == ["100.0", "100.0", "100.0"]
+    # медленнейшая трасса (a): 60% api, 40% хендлер
+    shares = [line.split() for line in lines if line.endswith("%")]
+    assert shares == [["api", "60%"], ["handler", "40%"]]
@@ -0,0 +1,15 @@
+# tgbot/__init__.py
+"""
+Telegram-бот: хендлеры и сборка Application.
+
+    config       — настройки из окружения (читаются в main);
+    api          — клиент API сайта;
+    storage      — токены пользователей и доступ к локальной БД;
+    conversation — состояния диалогов и общая отмена;
+    auth, recipe_form, catalog — хендлеры;
+    application  — сборка Application и запуск.
+
+Тяжёлые зависимости (telegram.ext, aiohttp, Flask, numpy) импортируются
+только модулями, которым они нужны, и по возможности при первом
+использовании — импорт пакета и bot.py почти ничего не стоит.
+"""
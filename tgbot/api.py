@@ -0,0 +1,85 @@
+# tgbot/api.py
+"""
+Маленький клиент API сайта (aiohttp импортируется при первом запросе).
+"""
+import time
+from typing import Optional
+
+import profiling
+import tracing
+from tgbot.config import get_config
+from tgbot.storage import with_local_db
+
+
+async def api_request(method: str, path: str, token: Optional[str] = None,
+                      params: dict = None, json_data: dict = None, timeout=20):
+    import aiohttp
+
+    url = get_config().site_api_base.rstrip("/") + "/" + path.lstrip("/")
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Token {token}"
+    trace_id = tracing.current_trace_id()
+    if trace_id:
+        headers[tracing.TRACE_HEADER] = trace_id
+    started = time.perf_counter()
+    try:
+        with tracing.span(f"{method.upper()} {path}", "api") as span:
+            async with aiohttp.ClientSession() as sess:
+                func = getattr(sess, method.lower())
+                async with func(url, params=params, json=json_data, headers=headers, timeout=timeout) as resp:
+                    span["status"] = resp.status
+                    text = await resp.text()
+                    try:
+                        data = await resp.json()
+                    except Exception:
+                        data = None
+                    return resp.status, data or text
+    finally:
+        profiling.record_call("api", f"{method.upper()} {path}", time.perf_counter() - started)
+
+
+async def api_get(path: str, params: dict = None, token: Optional[str] = None):
+    return await api_request("get", path, token=token, params=params)
+
+
+async def read_get(path: str, params: dict = None):
+    """
+    Чтение каталога: из локального зеркала, если включено READ_FROM_LOCAL_DB,
+    иначе (или для путей, которые зеркало не обслуживает) — с сайта.
+    """
+    config = get_config()
+    if config.read_from_local_db:
+        from local_reads import local_get
+
+        result = with_local_db(local_get, path, params or {}, config.api_page_size)
+        if result is not None:
+            return result
+    return await api_get(path, params=params)
+
+
+async def api_post(path: str, json_data: dict = None, token: Optional[str] = None):
+    return await api_request("post", path, token=token, json_data=json_data)
+
+
+# --------------------------
+# Helpers
+# --------------------------
+def format_api_errors(err_obj) -> str:
+    """
+    Ожидаем JSON ошибок от DRF: {field: [msg, ...], non_field_errors: [...]}
+    Выводим человеческое сообщение.
+    """
+    if not err_obj:
+        return "Неизвестная ошибка на сервере."
+    if isinstance(err_obj, dict):
+        parts = []
+        for k, v in err_obj.items():
+            if isinstance(v, (list, tuple)):
+                parts.append(f"{k}: {', '.join(str(x) for x in v)}")
+            else:
+                parts.append(f"{k}: {v}")
+        return "\n".join(parts) if parts else "Ошибка валидации."
+    if isinstance(err_obj, list):
+        return "\n".join(str(x) for x in err_obj)
+    return str(err_obj)
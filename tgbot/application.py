@@ -0,0 +1,66 @@
+# tgbot/application.py
+"""
+Сборка Application со всеми хендлерами и запуск бота.
+"""
+from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler
+
+import profiling
+import tracing
+from tgbot.auth import build_auth_conv, start_handler
+from tgbot.catalog import (
+    recipe_card_handler,
+    similar_handler,
+    recommend_handler,
+    subscribe_handler,
+    unsubscribe_handler,
+    view_list_cb,
+)
+from tgbot.config import get_config, load_config
+from tgbot.recipe_form import build_conv_handler, start_add_recipe
+
+
+def build_application(updater: bool = True):
+    """
+    Application со всеми хендлерами. updater=False — без собственного
+    получения обновлений: их подаёт dispatcher.py (воркер шарда).
+    """
+    builder = ApplicationBuilder().token(get_config().token)
+    if tracing.enabled():
+        # спаны исходящих запросов к Bot API
+        builder = builder.request(tracing.request())
+    if not updater:
+        builder = builder.updater(None)
+    app = builder.build()
+    # auth/start conversation
+    auth_conv = build_auth_conv()
+    add_conv = build_conv_handler()
+
+    app.add_handler(auth_conv)
+    app.add_handler(add_conv)
+    # Menu and list handlers - simple
+    app.add_handler(CommandHandler("start", start_handler))
+    app.add_handler(CallbackQueryHandler(start_handler, pattern="^start$"))
+    # View list (recipes)
+    app.add_handler(CallbackQueryHandler(view_list_cb, pattern="^view_list$"))
+
+    # Shortcut to start add recipe from menu: we'll add a simple command
+    app.add_handler(CommandHandler("addrecipe", start_add_recipe))
+    app.add_handler(CommandHandler("recipe", recipe_card_handler))
+    # Рекомендации
+    app.add_handler(CommandHandler("similar", similar_handler))
+    app.add_handler(CommandHandler("recommend", recommend_handler))
+    # Подписки на новые рецепты
+    app.add_handler(CommandHandler("subscribe", subscribe_handler))
+    app.add_handler(CommandHandler("unsubscribe", unsubscribe_handler))
+    # Профилирование хендлеров (PROFILE_SAMPLE_RATE / PROFILE_SLOW_MS)
+    profiling.install(app)
+    # Трассировка обновлений (TRACE_EXPORT)
+    tracing.install(app)
+    return app
+
+
+def main():
+    load_config()
+    app = build_application()
+    print("Bot started")
+    app.run_polling()
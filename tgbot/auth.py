@@ -0,0 +1,167 @@
+# tgbot/auth.py
+"""
+Старт и авторизация на сайте: вход, регистрация, анонимный режим.
+"""
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import (
+    CommandHandler,
+    CallbackQueryHandler,
+    ConversationHandler,
+    MessageHandler,
+    filters,
+    ContextTypes,
+)
+
+from tgbot.api import api_post, format_api_errors
+from tgbot.conversation import (
+    AUTH_CHOICE,
+    AUTH_LOGIN_EMAIL,
+    AUTH_LOGIN_PASS,
+    AUTH_REGISTER_EMAIL,
+    AUTH_REGISTER_USERNAME,
+    AUTH_REGISTER_FIRST,
+    AUTH_REGISTER_LAST,
+    AUTH_REGISTER_PASS,
+    cancel_handler,
+)
+from tgbot.storage import save_token_local, del_token_local
+
+
+async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Приветственное сообщение и выбор: Войти / Зарегистрироваться / Аноним
+    """
+    user = update.effective_user
+    text = (
+        f"Привет, {user.first_name or user.username or 'друг'}!\n\n"
+        "Я — бот для создания рецептов на сайте. Выберите, как вы хотите продолжить:\n\n"
+        "• Войти (email + пароль)\n"
+        "• Зарегистрироваться\n"
+        "• Продолжить как аноним (только просмотр / добавление в корзину без создания рецептов от имени пользователя)\n\n"
+        "Если войдёте — рецепты будут создаваться под вашим аккаунтом на сайте."
+    )
+    kb = [
+        [InlineKeyboardButton("Войти", callback_data="auth:login")],
+        [InlineKeyboardButton("Регистрация", callback_data="auth:register")],
+        [InlineKeyboardButton("Аноним", callback_data="auth:anon")],
+    ]
+    await update.effective_message.reply_text(text, reply_markup=InlineKeyboardMarkup(kb))
+    return AUTH_CHOICE
+
+
+async def auth_choice_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    action = q.data.split(":", 1)[1]
+    if action == "login":
+        await q.message.reply_text("Введите email для входа:")
+        return AUTH_LOGIN_EMAIL
+    if action == "register":
+        await q.message.reply_text("Регистрация — введите email:")
+        return AUTH_REGISTER_EMAIL
+    if action == "anon":
+        # убираем токен, если был
+        del_token_local(q.from_user.id)
+        await q.message.reply_text("Вы продолжаете как аноним. Некоторые операции (создание рецептов от вашего аккаунта) будут недоступны.")
+        return ConversationHandler.END
+    await q.message.reply_text("Неизвестный выбор.")
+    return ConversationHandler.END
+
+
+# Login flow
+async def auth_login_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["auth_email"] = update.effective_message.text.strip()
+    await update.effective_message.reply_text("Введите пароль:")
+    return AUTH_LOGIN_PASS
+
+
+async def auth_login_pass(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    email = context.user_data.pop("auth_email", None)
+    password = update.effective_message.text.strip()
+    # Djoser token login endpoint: POST /api/auth/token/login/ {email, password}
+    payload = {"email": email, "password": password}
+    status, data = await api_post("auth/token/login/", json_data=payload)
+    if status in (200, 201) and isinstance(data, dict) and data.get("auth_token"):
+        token = data["auth_token"]
+        save_token_local(update.effective_user.id, token)
+        await update.effective_message.reply_text("Успешно выполнен вход. Токен сохранён локально.")
+        return ConversationHandler.END
+    # error
+    msg = format_api_errors(data)
+    await update.effective_message.reply_text(f"Ошибка входа: {msg}")
+    return AUTH_LOGIN_EMAIL
+
+
+# Register flow (collect fields)
+async def auth_register_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["reg_email"] = update.effective_message.text.strip()
+    await update.effective_message.reply_text("Введите желаемый username:")
+    return AUTH_REGISTER_USERNAME
+
+
+async def auth_register_username(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["reg_username"] = update.effective_message.text.strip()
+    await update.effective_message.reply_text("Имя (first_name):")
+    return AUTH_REGISTER_FIRST
+
+
+async def auth_register_first(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["reg_first"] = update.effective_message.text.strip()
+    await update.effective_message.reply_text("Фамилия (last_name):")
+    return AUTH_REGISTER_LAST
+
+
+async def auth_register_last(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["reg_last"] = update.effective_message.text.strip()
+    await update.effective_message.reply_text("Пароль:")
+    return AUTH_REGISTER_PASS
+
+
+async def auth_register_pass(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Submitting registration to /api/auth/users/
+    email = context.user_data.pop("reg_email", None)
+    username = context.user_data.pop("reg_username", None)
+    first = context.user_data.pop("reg_first", "")
+    last = context.user_data.pop("reg_last", "")
+    password = update.effective_message.text.strip()
+    payload = {
+        "email": email,
+        "username": username,
+        "first_name": first,
+        "last_name": last,
+        "password": password,
+    }
+    status, data = await api_post("auth/users/", json_data=payload)
+    if status in (200, 201):
+        # user created; Djoser commonly returns user data. Now auto-login (token)
+        # token login:
+        status2, data2 = await api_post("auth/token/login/", json_data={"email": email, "password": password})
+        if status2 in (200, 201) and isinstance(data2, dict) and data2.get("auth_token"):
+            save_token_local(update.effective_user.id, data2["auth_token"])
+            await update.effective_message.reply_text("Регистрация и вход успешно выполнены.")
+            return ConversationHandler.END
+        await update.effective_message.reply_text("Регистрация выполнена, но автологин не удался. Попробуйте войти вручную.")
+        return ConversationHandler.END
+    # errors
+    await update.effective_message.reply_text("Ошибка регистрации: " + format_api_errors(data))
+    return AUTH_REGISTER_EMAIL
+
+
+def build_auth_conv():
+    conv = ConversationHandler(
+        entry_points=[CommandHandler("start", start_handler), CallbackQueryHandler(auth_choice_handler, pattern="^auth:")],
+        states={
+            AUTH_CHOICE: [CallbackQueryHandler(auth_choice_handler, pattern="^auth:")],
+            AUTH_LOGIN_EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, auth_login_email)],
+            AUTH_LOGIN_PASS: [MessageHandler(filters.TEXT & ~filters.COMMAND, auth_login_pass)],
+            AUTH_REGISTER_EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, auth_register_email)],
+            AUTH_REGISTER_USERNAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, auth_register_username)],
+            AUTH_REGISTER_FIRST: [MessageHandler(filters.TEXT & ~filters.COMMAND, auth_register_first)],
+            AUTH_REGISTER_LAST: [MessageHandler(filters.TEXT & ~filters.COMMAND, auth_register_last)],
+            AUTH_REGISTER_PASS: [MessageHandler(filters.TEXT & ~filters.COMMAND, auth_register_pass)],
+        },
+        fallbacks=[CommandHandler("cancel", cancel_handler)],
+        per_user=True,
+        per_chat=True,
+    )
+    return conv
@@ -0,0 +1,179 @@
+# tgbot/catalog.py
+"""
+Просмотр каталога: карточки рецептов, список, рекомендации и подписки
+на новые рецепты.
+"""
+from telegram import Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from tgbot.api import read_get, format_api_errors
+from tgbot.config import get_config
+from tgbot.storage import telegram_profile, with_local_db
+
+
+# --------------------------
+# Карточка рецепта (картинка по закэшированному file_id, см. file_cache.py)
+# --------------------------
+CAPTION_LIMIT = 1024
+
+
+def format_recipe_caption(recipe: dict) -> str:
+    ingredients = "\n".join(
+        f"• {i.get('name')} — {i.get('amount')} {i.get('measurement_unit', '')}"
+        for i in recipe.get("ingredients", [])
+    )
+    caption = (
+        f"{recipe.get('name')}\n"
+        f"Время: {recipe.get('cooking_time')} мин\n\n"
+        f"{ingredients}"
+    )
+    return caption[:CAPTION_LIMIT]
+
+
+async def send_recipe_card(message, recipe: dict):
+    """
+    Отправляет карточку рецепта. Картинка уходит по file_id из кэша, при
+    промахе — по URL (Telegram скачивает её сам), и полученный file_id
+    запоминается.
+    """
+    caption = format_recipe_caption(recipe)
+    image = recipe.get("image")
+    if not image:
+        await message.reply_text(caption)
+        return
+    # модели БД (Flask-SQLAlchemy) не нужны боту при старте — импорт
+    # при первом вызове
+    from file_cache import image_key, get_file_id, remember, forget
+
+    key = image_key(image)
+    file_id = with_local_db(get_file_id, recipe["id"], key)
+    if file_id:
+        try:
+            await message.reply_photo(file_id, caption=caption)
+            return
+        except BadRequest:
+            # file_id больше не принимается — отправим заново
+            with_local_db(forget, recipe["id"], key)
+    try:
+        sent = await message.reply_photo(image, caption=caption)
+    except BadRequest:
+        await message.reply_text(caption)
+        return
+    photo = sent.photo[-1]
+    with_local_db(remember, recipe["id"], key, photo.file_id, photo.file_unique_id)
+
+
+async def recipe_card_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /recipe <id> — карточка рецепта с фото.
+    """
+    if not context.args or not context.args[0].isdigit():
+        await update.effective_message.reply_text("Использование: /recipe <id рецепта>")
+        return
+    status, data = await read_get(f"recipes/{context.args[0]}/")
+    if status != 200 or not isinstance(data, dict):
+        await update.effective_message.reply_text("Рецепт не найден: " + format_api_errors(data))
+        return
+    await send_recipe_card(update.effective_message, data)
+
+
+# --------------------------
+# Рекомендации (предвычисленные таблицы, см. recommendations.py)
+# --------------------------
+def format_recipe_rows(rows) -> str:
+    return "\n".join(f"{rid}: {name}" for rid, name, _ in rows)
+
+
+async def similar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /similar <id рецепта> — похожие рецепты.
+    """
+    if not context.args or not context.args[0].isdigit():
+        await update.effective_message.reply_text("Использование: /similar <id рецепта>")
+        return
+    # numpy/scipy не нужны боту при старте — импорт при первом вызове
+    from recommendations import similar_recipes
+
+    rows = with_local_db(similar_recipes, int(context.args[0]), get_config().recommendations_shown)
+    if not rows:
+        await update.effective_message.reply_text("Похожих рецептов пока нет.")
+        return
+    await update.effective_message.reply_text("Похожие рецепты:\n" + format_recipe_rows(rows))
+
+
+async def recommend_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /recommend — рекомендации на основе избранного пользователя.
+    """
+    from recommendations import recommendations_for
+
+    rows = with_local_db(recommendations_for, update.effective_user.id, get_config().recommendations_shown)
+    if not rows:
+        await update.effective_message.reply_text(
+            "Пока нечего порекомендовать — добавьте рецепты в избранное."
+        )
+        return
+    await update.effective_message.reply_text("Рекомендуем попробовать:\n" + format_recipe_rows(rows))
+
+
+# --------------------------
+# Подписки на новые рецепты (рассылки, см. broadcast.py)
+# --------------------------
+async def subscribe_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /subscribe <id тега> — уведомлять о новых рецептах с тегом.
+    Без аргумента — список подписок.
+    """
+    from broadcast import subscribe, subscriptions
+
+    user = update.effective_user
+    if not context.args:
+        rows = with_local_db(subscriptions, user.id)
+        if rows:
+            text = "Ваши подписки:\n" + "\n".join(f"{tid}: {name}" for tid, name in rows)
+        else:
+            text = "Подписок нет. Использование: /subscribe <id тега>"
+        await update.effective_message.reply_text(text)
+        return
+    if not context.args[0].isdigit():
+        await update.effective_message.reply_text("Использование: /subscribe <id тега>")
+        return
+    created = with_local_db(subscribe, telegram_profile(user), int(context.args[0]))
+    if created is None:
+        await update.effective_message.reply_text("Тег не найден.")
+    elif created:
+        await update.effective_message.reply_text("Подписка оформлена: пришлём новые рецепты с этим тегом.")
+    else:
+        await update.effective_message.reply_text("Вы уже подписаны на этот тег.")
+
+
+async def unsubscribe_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /unsubscribe <id тега> — отменить подписку.
+    """
+    if not context.args or not context.args[0].isdigit():
+        await update.effective_message.reply_text("Использование: /unsubscribe <id тега>")
+        return
+    from broadcast import unsubscribe
+
+    if with_local_db(unsubscribe, update.effective_user.id, int(context.args[0])):
+        await update.effective_message.reply_text("Подписка отменена.")
+    else:
+        await update.effective_message.reply_text("Подписки на этот тег не было.")
+
+
+# View list (recipes)
+async def view_list_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    status, data = await read_get("recipes/", params={"page": 1})
+    if status != 200:
+        await q.message.reply_text("Ошибка получения списка: " + format_api_errors(data))
+        return
+    results = data.get("results", data) if isinstance(data, dict) else data
+    if not results:
+        await q.message.reply_text("Рецептов пока нет.")
+        return
+    for r in results:
+        await q.message.reply_text(f"{r.get('id')}: {r.get('name')} — {r.get('cooking_time')} мин")
@@ -0,0 +1,51 @@
+# tgbot/config.py
+"""
+Настройки бота из окружения. Читаются и проверяются в main()
+(load_config), а не при импорте: модули бота можно импортировать без
+TELEGRAM_BOT_TOKEN.
+"""
+import os
+from pathlib import Path
+
+TOKENS_FILE = Path("bot_user_tokens.json")
+TOKENS_LOCK_FILE = Path("bot_user_tokens.lock")
+
+
+class BotConfig:
+    def __init__(self, env=None):
+        env = os.environ if env is None else env
+        self.token = env.get("TELEGRAM_BOT_TOKEN")
+        self.site_api_base = (env.get("SITE_API_BASE") or "").rstrip("/") + "/"
+        self.api_page_size = int(env.get("API_PAGE_SIZE") or 10)
+        self.recommendations_shown = int(env.get("RECOMMENDATIONS_SHOWN") or 5)
+        # Читать каталог (ингредиенты, теги, рецепты) из локального зеркала (sync.py)
+        self.read_from_local_db = (env.get("READ_FROM_LOCAL_DB") or "False").lower() == "true"
+
+    def validate(self):
+        if not self.token:
+            raise RuntimeError("TELEGRAM_BOT_TOKEN не задан в окружении")
+        if self.site_api_base == "/":
+            raise RuntimeError("SITE_API_BASE не задан в окружении, пример: https://example.com/api/")
+
+
+_config = None
+
+
+def load_config() -> BotConfig:
+    """Читает .env и окружение, проверяет обязательные настройки."""
+    global _config
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    config = BotConfig()
+    config.validate()
+    _config = config
+    return config
+
+
+def get_config() -> BotConfig:
+    """Текущие настройки (без load_config — из окружения, без проверки)."""
+    global _config
+    if _config is None:
+        _config = BotConfig()
+    return _config
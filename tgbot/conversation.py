@@ -0,0 +1,40 @@
+# tgbot/conversation.py
+"""
+Состояния диалогов (ConversationHandler) и общий хендлер отмены.
+"""
+from telegram import Update
+from telegram.ext import ConversationHandler, ContextTypes
+
+# FSM states
+(
+    AUTH_CHOICE,        # выбор: login / register / anonymous (в start)
+    AUTH_LOGIN_EMAIL,
+    AUTH_LOGIN_PASS,
+    AUTH_REGISTER_EMAIL,
+    AUTH_REGISTER_USERNAME,
+    AUTH_REGISTER_FIRST,
+    AUTH_REGISTER_LAST,
+    AUTH_REGISTER_PASS,
+    RECIPE_NAME,
+    RECIPE_DESC,
+    COOK_TIME,
+    ING_LETTER,         # выбрать букву
+    ING_PAGE,           # навигация страниц ингредиентов
+    ING_SELECT,         # выбрать конкретный ингредиент
+    ING_QTY,
+    ING_CONFIRM_CHOOSE,  # добавить ещё или готово
+    TAGS_CHOOSE,        # выбрать теги (пагинация)
+    IMAGE_STEP,
+    URL_STEP,
+    CONFIRM_STEP,
+) = range(20)
+
+
+# cancel handler (shared)
+async def cancel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.callback_query:
+        await update.callback_query.answer()
+        await update.callback_query.message.reply_text("Операция отменена.")
+    else:
+        await update.effective_message.reply_text("Операция отменена.")
+    return ConversationHandler.END
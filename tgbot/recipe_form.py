@@ -0,0 +1,444 @@
+# tgbot/recipe_form.py
+"""
+Создание рецепта: выбор ингредиентов по букве с пагинацией, выбор
+существующих тегов, фото, ссылка и отправка на сайт.
+"""
+import base64
+import time
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import (
+    CommandHandler,
+    CallbackQueryHandler,
+    ConversationHandler,
+    MessageHandler,
+    filters,
+    ContextTypes,
+)
+
+import profiling
+import tracing
+from tgbot.api import api_post, read_get, format_api_errors
+from tgbot.conversation import (
+    RECIPE_NAME,
+    RECIPE_DESC,
+    COOK_TIME,
+    ING_LETTER,
+    ING_PAGE,
+    ING_SELECT,
+    ING_QTY,
+    ING_CONFIRM_CHOOSE,
+    TAGS_CHOOSE,
+    IMAGE_STEP,
+    URL_STEP,
+    CONFIRM_STEP,
+    cancel_handler,
+)
+from tgbot.storage import load_token_local, telegram_profile, with_local_db
+
+# placeholder 1x1 transparent png (data-uri)
+PLACEHOLDER_PNG_DATAURI = (
+    "data:image/png;base64,"
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAAWgmWQ0AAAAASUVORK5CYII="
+)
+
+
+async def download_photo_as_datauri(file_id: str, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """
+    Скачивает файл Telegram по file_id и возвращает data-uri для загрузки в DRF Base64ImageField.
+    """
+    try:
+        started = time.perf_counter()
+        with tracing.span("download photo", "photo"):
+            f = await context.bot.get_file(file_id)
+            b = await f.download_as_bytearray()
+        profiling.record_call("telegram", "download photo", time.perf_counter() - started)
+        # Попробуем угадать расширение:
+        ext = "jpeg"
+        if f.file_path and "." in f.file_path:
+            ext = f.file_path.rsplit(".", 1)[1]
+        b64 = base64.b64encode(bytes(b)).decode("ascii")
+        return f"data:image/{ext};base64,{b64}"
+    except Exception:
+        # Если не удалось — вернуть placeholder
+        return PLACEHOLDER_PNG_DATAURI
+
+
+# --------------------------
+# Рецепт: создание с выбором ингредиентов по букве + пагинация, выбор тегов (существующих)
+# --------------------------
+
+async def start_add_recipe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Запуск создания рецепта (entry point). Проверим, есть ли токен у пользователя.
+    """
+    q = update.callback_query
+    if q:
+        await q.answer()
+        # allow anonymous to create? We'll allow but server will reject if token required to create
+    context.user_data.clear()
+    await (q.message if q else update.effective_message).reply_text(
+        "Создание рецепта — введите название:"
+    )
+    return RECIPE_NAME
+
+
+async def recipe_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["name"] = update.effective_message.text.strip()
+    await update.effective_message.reply_text("Введите короткое описание (text) рецепта:")
+    return RECIPE_DESC
+
+
+async def recipe_desc(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["description"] = update.effective_message.text.strip()
+    await update.effective_message.reply_text("Укажите время приготовления в минутах (целое число):")
+    return COOK_TIME
+
+
+async def recipe_cook_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    txt = update.effective_message.text.strip()
+    if not txt.isdigit() or int(txt) < 1:
+        await update.effective_message.reply_text("Время должно быть целым числом ≥ 1. Введите ещё раз:")
+        return COOK_TIME
+    context.user_data["cooking_time"] = int(txt)
+    context.user_data["ingredients"] = []
+    # предложим выбрать первую букву
+    kb = []
+    # А–Я + A–Z (упрощённо): создадим буквы латинские и кириллические
+    # Для компактности дадим «А-Я» кнопки: будем отправлять английский алфавит + цифры 0-9
+    letters = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + list("АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ")
+    row = []
+    for i, ch in enumerate(letters):
+        row.append(InlineKeyboardButton(ch, callback_data=f"ing_letter:{ch}"))
+        if (i + 1) % 6 == 0:
+            kb.append(row); row = []
+    if row:
+        kb.append(row)
+    kb.append([InlineKeyboardButton("Готово (перейти к тегам)", callback_data="ing_done")])
+    await update.effective_message.reply_text(
+        "Выберите первую букву ингредиента (покажем ингредиенты, начинающиеся на неё).",
+        reply_markup=InlineKeyboardMarkup(kb),
+    )
+    return ING_LETTER
+
+
+async def ing_letter_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    letter = q.data.split(":", 1)[1]
+    context.user_data.setdefault("ing_browser", {})["letter"] = letter
+    # получаем первую страницу
+    status, data = await read_get("ingredients/", params={"name": letter, "page": 1})
+    if status != 200:
+        await q.message.reply_text("Ошибка получения ингредиентов: " + format_api_errors(data))
+        return ING_LETTER
+    context.user_data["ing_browser"]["page"] = 1
+    await show_ingredient_page(q.message, data, letter, 1)
+    return ING_PAGE
+
+
+async def show_ingredient_page(message, resp_json, letter, page):
+    """
+    Ожидаем стандартную DRF pagination: {'count', 'next', 'previous', 'results': [...]}
+    Если нет пагинации — resp_json может быть list.
+    """
+    results = resp_json.get("results") if isinstance(resp_json, dict) else resp_json
+    buttons = []
+    for item in results:
+        # item expected: {'id', 'name', 'measurement_unit'}
+        buttons.append([InlineKeyboardButton(f"{item['name']} ({item.get('measurement_unit','')})", callback_data=f"ing_select:{item['id']}")])
+    # navigation
+    nav = []
+    if isinstance(resp_json, dict) and resp_json.get("previous"):
+        nav.append(InlineKeyboardButton("‹ Prev", callback_data=f"ing_page:{letter}:{page-1}"))
+    if isinstance(resp_json, dict) and resp_json.get("next"):
+        nav.append(InlineKeyboardButton("Next ›", callback_data=f"ing_page:{letter}:{page+1}"))
+    if nav:
+        buttons.append(nav)
+    buttons.append([InlineKeyboardButton("Назад к буквам", callback_data="ing_back_letters")])
+    await message.reply_text("Выберите ингредиент:", reply_markup=InlineKeyboardMarkup(buttons))
+
+
+async def ing_page_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    _, letter, page_s = q.data.split(":", 2)
+    page = int(page_s)
+    status, data = await read_get("ingredients/", params={"name": letter, "page": page})
+    if status != 200:
+        await q.message.reply_text("Ошибка получения ингредиентов: " + format_api_errors(data))
+        return ING_LETTER
+    context.user_data["ing_browser"]["page"] = page
+    await show_ingredient_page(q.message, data, letter, page)
+    return ING_PAGE
+
+
+async def ing_select_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    _, ing_id = q.data.split(":", 1)
+    context.user_data["selected_ing"] = int(ing_id)
+    await q.message.reply_text("Введите количество (целое ≥ 1):")
+    return ING_QTY
+
+
+async def ing_qty_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    txt = update.effective_message.text.strip()
+    if not txt.isdigit() or int(txt) < 1:
+        await update.effective_message.reply_text("Количество должно быть целым числом ≥ 1. Введите ещё раз:")
+        return ING_QTY
+    ing_id = context.user_data.pop("selected_ing")
+    context.user_data.setdefault("ingredients", []).append({"id": ing_id, "amount": int(txt)})
+    kb = [
+        [InlineKeyboardButton("Добавить ещё (выбрать букву)", callback_data="ing_back_letters")],
+        [InlineKeyboardButton("Готово — перейти к тегам", callback_data="ing_done")],
+    ]
+    await update.effective_message.reply_text("Ингредиент добавлен.", reply_markup=InlineKeyboardMarkup(kb))
+    return ING_CONFIRM_CHOOSE
+
+
+async def ing_confirm_choose_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    if q.data == "ing_back_letters":
+        # показать буквы заново
+        # reuse recipe_cook_time's letters UI generation
+        letters = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + list("АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ")
+        kb = []
+        row = []
+        for i, ch in enumerate(letters):
+            row.append(InlineKeyboardButton(ch, callback_data=f"ing_letter:{ch}"))
+            if (i + 1) % 6 == 0:
+                kb.append(row); row = []
+        if row:
+            kb.append(row)
+        kb.append([InlineKeyboardButton("Готово (перейти к тегам)", callback_data="ing_done")])
+        await q.message.reply_text("Выберите букву:", reply_markup=InlineKeyboardMarkup(kb))
+        return ING_LETTER
+    if q.data == "ing_done":
+        # proceed to tags selection
+        return await tags_start(q.message, context)
+
+
+# Tags selection: we'll fetch tags from API and present (pagination if necessary)
+async def tags_start(message, context: ContextTypes.DEFAULT_TYPE):
+    status, data = await read_get("tags/", params={"page": 1})
+    if status != 200:
+        await message.reply_text("Ошибка получения тегов: " + format_api_errors(data))
+        return TAGS_CHOOSE
+    context.user_data["tags_browser"] = {"page": 1}
+    await show_tags_page(message, data, 1)
+    return TAGS_CHOOSE
+
+
+async def show_tags_page(message, resp_json, page):
+    results = resp_json.get("results") if isinstance(resp_json, dict) else resp_json
+    buttons = []
+    for t in results:
+        buttons.append([InlineKeyboardButton(t["name"], callback_data=f"tag_select:{t['id']}")])
+    nav = []
+    if isinstance(resp_json, dict) and resp_json.get("previous"):
+        nav.append(InlineKeyboardButton("‹ Prev", callback_data=f"tag_page:{page-1}"))
+    if isinstance(resp_json, dict) and resp_json.get("next"):
+        nav.append(InlineKeyboardButton("Next ›", callback_data=f"tag_page:{page+1}"))
+    if nav:
+        buttons.append(nav)
+    buttons.append([InlineKeyboardButton("Готово (далее фото)", callback_data="tags_done")])
+    await message.reply_text("Выберите теги (можно несколько):", reply_markup=InlineKeyboardMarkup(buttons))
+
+
+async def tag_page_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    _, page_s = q.data.split(":", 1)
+    page = int(page_s)
+    status, data = await read_get("tags/", params={"page": page})
+    if status != 200:
+        await q.message.reply_text("Ошибка получения тегов: " + format_api_errors(data))
+        return TAGS_CHOOSE
+    context.user_data["tags_browser"]["page"] = page
+    await show_tags_page(q.message, data, page)
+    return TAGS_CHOOSE
+
+
+async def tag_select_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    _, tag_id_s = q.data.split(":", 1)
+    tag_id = int(tag_id_s)
+    sel = context.user_data.setdefault("selected_tags", set())
+    if tag_id in sel:
+        sel.remove(tag_id)
+        await q.message.reply_text("Тег убран из выбора.")
+    else:
+        sel.add(tag_id)
+        await q.message.reply_text("Тег добавлен.")
+    # stay on TAGS_CHOOSE (user can finish with tags_done)
+    return TAGS_CHOOSE
+
+
+async def tags_done_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    # Ensure at least one tag (site requires it)
+    tags = list(context.user_data.get("selected_tags", []))
+    if not tags:
+        await q.message.reply_text("Нужно выбрать хотя бы один тег. Пожалуйста, выберите тег.")
+        return TAGS_CHOOSE
+    context.user_data["tags"] = tags
+    await q.message.reply_text("Пришлите фото рецепта (или нажмите Пропустить):",
+                               reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="skip_image")]]))
+    return IMAGE_STEP
+
+
+# IMAGE step: receive photo or skip
+async def image_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.callback_query:
+        await update.callback_query.answer()
+        if update.callback_query.data == "skip_image":
+            context.user_data["image_datauri"] = None
+        else:
+            context.user_data["image_datauri"] = None
+    else:
+        # user sent a photo
+        photo = update.effective_message.photo
+        if not photo:
+            await update.effective_message.reply_text("Ожидалось фото. Повторите или нажмите Пропустить.")
+            return IMAGE_STEP
+        # модели БД (Flask-SQLAlchemy) не нужны боту при старте — импорт
+        # при первом вызове
+        from file_cache import remember
+
+        file_id = photo[-1].file_id
+        # сохраним file_id для обработки позже
+        context.user_data["image_file_id"] = file_id
+        context.user_data["image_file_unique_id"] = photo[-1].file_unique_id
+        with_local_db(remember, None, photo[-1].file_unique_id, file_id, photo[-1].file_unique_id)
+    await update.effective_message.reply_text("Добавьте ссылку на источник (или нажмите Пропустить):",
+                                              reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="skip_url")]]))
+    return URL_STEP
+
+
+async def url_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.callback_query:
+        await update.callback_query.answer()
+        if update.callback_query.data == "skip_url":
+            context.user_data["source_url"] = None
+        else:
+            context.user_data["source_url"] = None
+    else:
+        context.user_data["source_url"] = update.effective_message.text.strip()
+
+    # подготовим сводку и кнопки подтверждения / редактирования
+    data = context.user_data
+    ing_text = "\n".join(f"- id:{i['id']} × {i['amount']}" for i in data.get("ingredients", []))
+    tags_text = ", ".join(str(t) for t in data.get("tags", []))
+    summary = (
+        f"Проверьте рецепт:\n\n"
+        f"Название: {data.get('name')}\n"
+        f"Описание: {data.get('description')}\n"
+        f"Время: {data.get('cooking_time')} мин\n"
+        f"Ингредиенты:\n{ing_text or '-'}\n"
+        f"Теги (id): {tags_text}\n"
+        f"Фото: {'есть' if data.get('image_file_id') else 'нет'}\n"
+        f"Ссылка: {data.get('source_url') or '-'}\n\n"
+        "Нажмите Подтвердить чтобы отправить рецепт на сайт, либо Отмена."
+    )
+    kb = [
+        [InlineKeyboardButton("✅ Подтвердить", callback_data="confirm_send")],
+        [InlineKeyboardButton("❌ Отмена", callback_data="cancel")],
+    ]
+    await (update.callback_query.message if update.callback_query else update.effective_message).reply_text(
+        summary, reply_markup=InlineKeyboardMarkup(kb)
+    )
+    return CONFIRM_STEP
+
+
+# FINAL: send to site
+async def confirm_send_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    token = load_token_local(q.from_user.id)
+    if not token:
+        await q.message.reply_text("Вы не вошли в систему. Для создания рецепта под аккаунтом нужно войти (команда /start → Войти). Вы можете зарегистрироваться.")
+        return ConversationHandler.END
+
+    data = context.user_data
+    # image
+    if data.get("image_file_id"):
+        image_datauri = await download_photo_as_datauri(data["image_file_id"], context)
+    else:
+        image_datauri = PLACEHOLDER_PNG_DATAURI
+
+    # combine description + source
+    text = data.get("description", "")
+    if data.get("source_url"):
+        text = text + "\n\nСсылка на источник: " + data["source_url"]
+
+    payload = {
+        "name": data.get("name"),
+        "text": text,
+        "cooking_time": int(data.get("cooking_time")),
+        "ingredients": [{"id": i["id"], "amount": i["amount"]} for i in data.get("ingredients", [])],
+        "tags": data.get("tags", []),
+        "image": image_datauri,
+    }
+    # POST /api/recipes/
+    status, resp = await api_post("recipes/", json_data=payload, token=token)
+    if status in (200, 201) and isinstance(resp, dict):
+        from broadcast import enqueue_recipe
+        from file_cache import image_key, remember
+
+        if data.get("image_file_id") and resp.get("id") and resp.get("image"):
+            # карточка нового рецепта будет отправляться по file_id загруженного фото
+            with_local_db(remember, resp["id"], image_key(resp["image"]),
+                          data["image_file_id"], data.get("image_file_unique_id"))
+        if resp.get("id"):
+            # уведомление подписчиков отправит воркер рассылок (broadcast.py)
+            with_local_db(enqueue_recipe, resp["id"], payload["name"],
+                          payload["tags"], telegram_profile(q.from_user))
+        await q.message.reply_text("Рецепт успешно создан на сайте ✅")
+        return ConversationHandler.END
+    # validation errors
+    await q.message.reply_text("Ошибка при создании на сайте: " + format_api_errors(resp))
+    return ConversationHandler.END
+
+
+# --------------------------
+# Регистрация диалога
+# --------------------------
+def build_conv_handler():
+    conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(start_add_recipe, pattern="^add_recipe$"),
+                      CommandHandler("add", start_add_recipe),
+                      ],
+        states={
+            RECIPE_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, recipe_name)],
+            RECIPE_DESC: [MessageHandler(filters.TEXT & ~filters.COMMAND, recipe_desc)],
+            COOK_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, recipe_cook_time)],
+            ING_LETTER: [CallbackQueryHandler(ing_letter_handler, pattern="^ing_letter:")],
+            ING_PAGE: [CallbackQueryHandler(ing_page_handler, pattern="^ing_page:" )],
+            ING_SELECT: [CallbackQueryHandler(ing_select_handler, pattern="^ing_select:")],
+            ING_QTY: [MessageHandler(filters.TEXT & ~filters.COMMAND, ing_qty_handler)],
+            ING_CONFIRM_CHOOSE: [CallbackQueryHandler(ing_confirm_choose_handler, pattern="^(ing_back_letters|ing_done)$")],
+            TAGS_CHOOSE: [
+                CallbackQueryHandler(tag_page_handler, pattern="^tag_page:"),
+                CallbackQueryHandler(tag_select_handler, pattern="^tag_select:"),
+                CallbackQueryHandler(tags_done_handler, pattern="^tags_done$"),
+            ],
+            IMAGE_STEP: [
+                MessageHandler(filters.PHOTO, image_handler),
+                CallbackQueryHandler(image_handler, pattern="^skip_image$"),
+            ],
+            URL_STEP: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, url_handler),
+                CallbackQueryHandler(url_handler, pattern="^skip_url$"),
+            ],
+            CONFIRM_STEP: [CallbackQueryHandler(confirm_send_handler, pattern="^confirm_send$"),
+                           CallbackQueryHandler(cancel_handler, pattern="^cancel$")],
+        },
+        fallbacks=[CallbackQueryHandler(cancel_handler, pattern="^cancel$"), CommandHandler("cancel", cancel_handler)],
+        per_user=True,
+        per_chat=True,
+    )
+    return conv
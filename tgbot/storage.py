@@ -0,0 +1,100 @@
+# tgbot/storage.py
+"""
+Локальное состояние бота: токены пользователей сайта (JSON-файл) и
+доступ к общей с админкой БД.
+"""
+import json
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: без межпроцессной блокировки
+    fcntl = None
+
+from tgbot.config import TOKENS_FILE, TOKENS_LOCK_FILE
+
+
+# --------------------------
+# Токены пользователей (локальное хранилище)
+# --------------------------
+@contextmanager
+def _tokens_locked():
+    """
+    Эксклюзивная блокировка файла токенов: с dispatcher.py его читают и
+    пишут несколько процессов-воркеров.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(TOKENS_LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_tokens() -> dict:
+    if not TOKENS_FILE.exists():
+        return {}
+    try:
+        return json.loads(TOKENS_FILE.read_text(encoding="utf-8") or "{}")
+    except Exception:
+        return {}
+
+
+def _write_tokens(data: dict):
+    # файл пишется на месте (в docker он смонтирован отдельным томом)
+    TOKENS_FILE.write_text(json.dumps(data), encoding="utf-8")
+
+
+def save_token_local(telegram_id: int, token: str):
+    with _tokens_locked():
+        data = _read_tokens()
+        data[str(telegram_id)] = token
+        _write_tokens(data)
+
+
+def load_token_local(telegram_id: int) -> Optional[str]:
+    with _tokens_locked():
+        return _read_tokens().get(str(telegram_id))
+
+
+def del_token_local(telegram_id: int):
+    with _tokens_locked():
+        data = _read_tokens()
+        if data.pop(str(telegram_id), None) is not None:
+            _write_tokens(data)
+
+
+# --------------------------
+# Локальная БД (общая с админкой)
+# --------------------------
+# Flask-приложение создаётся при первом обращении к БД: Flask,
+# SQLAlchemy и модели не нужны боту при старте
+flask_app = None
+
+
+def with_local_db(func, *args, **kwargs):
+    """
+    Выполняет func в контексте Flask-приложения: сессия db.session
+    открывается на время вызова и закрывается после него.
+    """
+    global flask_app
+    if flask_app is None:
+        from app import create_app
+
+        flask_app = create_app(admin=False)
+    with flask_app.app_context():
+        return func(*args, **kwargs)
+
+
+def telegram_profile(user) -> dict:
+    """Профиль пользователя Telegram для локальной таблицы user."""
+    return {
+        "telegram_id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+    }
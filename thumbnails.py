@@ -0,0 +1,254 @@
+# thumbnails.py
+"""
+Миниатюры картинок рецептов (Recipe.image_path / resource_url).
+
+Миниатюры фиксированных размеров генерируются один раз и хранятся на
+диске по хэшу содержимого исходника: <dir>/ab/<sha256>_<size>.jpg.
+Одинаковые картинки разных рецептов делят файлы, а URL
+/thumbs/<sha256>/<size>.jpg неизменяем и отдаётся с долгим
+Cache-Control. Скачивание, хэширование и ресайз выполняются в пуле
+процессов — поток запроса только ждёт результат (с таймаутом).
+Общий размер хранилища ограничен THUMBNAIL_MAX_BYTES: давно не
+запрошенные файлы (по atime, он обновляется при отдаче) удаляются;
+вытесненная миниатюра при следующем запросе строится заново.
+Соответствие «исходник -> хэш» хранится в таблице thumbnail_source,
+так что после перезапуска оригиналы заново не скачиваются.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from flask import Blueprint, abort, current_app, redirect, send_file, url_for
+
+from db_utils import upsert
+from models import db, Recipe, ThumbnailSource
+
+SIZES = {
+    'small': (160, 160),
+    'medium': (480, 480),
+}
+JPEG_QUALITY = 85
+# Сколько соответствий «исходник -> хэш» держать в памяти (все — в БД)
+DIGEST_CACHE_SIZE = 10_000
+# Через сколько (с) перепроверять хэш исходника из БД
+DIGEST_MAX_AGE = 7 * 24 * 3600
+# Как часто (с) проверять размер хранилища
+EVICT_EVERY = 30
+# После вытеснения оставляем эту долю от лимита
+EVICT_TARGET = 0.9
+DOWNLOAD_TIMEOUT = 15
+ONE_YEAR = 365 * 24 * 3600
+
+thumbs_bp = Blueprint('thumbs', __name__, url_prefix='/thumbs')
+
+
+# --------------------------
+# Работа в процессах пула (функции должны быть picklable)
+# --------------------------
+def thumb_path(store_dir: str, digest: str, size: str) -> Path:
+    return Path(store_dir) / digest[:2] / f'{digest}_{size}.jpg'
+
+
+def _read_source(source: str, media_root: str) -> bytes:
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source, timeout=DOWNLOAD_TIMEOUT) as r:
+            return r.read()
+    path = (Path(media_root) / source.lstrip('/')).resolve()
+    if Path(media_root).resolve() not in path.parents:
+        raise ValueError(f'Путь вне каталога медиа: {source}')
+    return path.read_bytes()
+
+
+def build_thumbnails(source: str, store_dir: str, media_root: str) -> str:
+    """Создаёт все размеры (если их ещё нет) и возвращает sha256 исходника."""
+    from PIL import Image
+
+    data = _read_source(source, media_root)
+    digest = hashlib.sha256(data).hexdigest()
+    missing = [s for s in SIZES
+               if not thumb_path(store_dir, digest, s).exists()]
+    if not missing:
+        return digest
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        for size in missing:
+            thumb = image.copy()
+            thumb.thumbnail(SIZES[size])
+            path = thumb_path(store_dir, digest, size)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            thumb.save(tmp, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+            os.replace(tmp, path)
+    return digest
+
+
+def evict(store_dir: str, max_bytes: int) -> int:
+    """Удаляет давно не отдававшиеся файлы, пока хранилище больше лимита."""
+    files = []
+    total = 0
+    for path in Path(store_dir).glob('*/*.jpg'):
+        stat = path.stat()
+        files.append((stat.st_atime, stat.st_size, path))
+        total += stat.st_size
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes * EVICT_TARGET:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+# --------------------------
+# Хранилище в процессе веб-приложения
+# --------------------------
+class ThumbnailStore:
+    """Пул процессов (создаётся лениво) и кэш «исходник -> хэш»."""
+
+    def __init__(self):
+        self._pool = None
+        self._digests = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+
+    def _get_pool(self, workers: int):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+            return self._pool
+
+    def digest_for(self, source: str, config, size: str) -> str:
+        """
+        Хэш исходника, для которого миниатюра size есть на диске. Если
+        хэш неизвестен (нет ни в памяти, ни в БД), устарел или файл
+        вытеснен, миниатюры строятся в пуле. Бросает
+        concurrent.futures.TimeoutError, если не успели.
+        """
+        store_dir = config['THUMBNAIL_DIR']
+        with self._lock:
+            digest = self._digests.get(source)
+        if digest is None:
+            digest = _load_digest(source)
+        if digest and thumb_path(store_dir, digest, size).exists():
+            self._remember(source, digest)
+            return digest
+
+        pool = self._get_pool(config['THUMBNAIL_WORKERS'])
+        with self._lock:
+            # повторные запросы ждут ту же задачу, а не ставят новую
+            future = self._pending.get(source)
+            if future is None:
+                future = pool.submit(build_thumbnails, source, store_dir,
+                                     config['THUMBNAIL_MEDIA_ROOT'])
+                self._pending[source] = future
+        try:
+            digest = future.result(timeout=config['THUMBNAIL_TIMEOUT'])
+        except TimeoutError:
+            raise
+        except Exception:
+            with self._lock:
+                self._pending.pop(source, None)
+            raise
+        with self._lock:
+            self._pending.pop(source, None)
+            evict_due = time.monotonic() - self._last_evict > EVICT_EVERY
+            if evict_due:
+                self._last_evict = time.monotonic()
+        self._remember(source, digest)
+        _save_digest(source, digest)
+        if evict_due:
+            pool.submit(evict, store_dir, config['THUMBNAIL_MAX_BYTES'])
+        return digest
+
+    def _remember(self, source: str, digest: str):
+        with self._lock:
+            self._digests[source] = digest
+            self._digests.move_to_end(source)
+            while len(self._digests) > DIGEST_CACHE_SIZE:
+                self._digests.popitem(last=False)
+
+
+def _utcnow():
+    # SQLite хранит DateTime без зоны — храним наивное UTC-время
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _source_key(source: str) -> str:
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def _load_digest(source: str):
+    """Хэш исходника из БД, если он проверялся не раньше DIGEST_MAX_AGE."""
+    entry = db.session.get(ThumbnailSource, _source_key(source))
+    if entry is None or entry.checked_at is None:
+        return None
+    if _utcnow() - entry.checked_at > timedelta(
+            seconds=DIGEST_MAX_AGE):
+        # картинка по тому же URL могла смениться
+        return None
+    return entry.digest
+
+
+def _save_digest(source: str, digest: str):
+    upsert(ThumbnailSource.__table__, [{
+        'source_hash': _source_key(source), 'digest': digest,
+        'checked_at': _utcnow(),
+    }], ['source_hash'], ['digest', 'checked_at'])
+    db.session.commit()
+
+
+store = ThumbnailStore()
+
+
+@thumbs_bp.route('/recipe/<int:recipe_id>/<size>')
+def recipe_thumb(recipe_id, size):
+    """Перенаправляет на неизменяемый URL миниатюры картинки рецепта."""
+    if size not in SIZES:
+        abort(404)
+    recipe = db.session.get(Recipe, recipe_id)
+    source = recipe and (recipe.image_path or recipe.resource_url)
+    if not source:
+        abort(404)
+    try:
+        digest = store.digest_for(source, current_app.config, size)
+    except TimeoutError:
+        # ещё генерируется — пока отдаём оригинал, без кэширования
+        if source.startswith(('http://', 'https://')):
+            response = redirect(source)
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        abort(503)
+    except (OSError, ValueError) as e:
+        current_app.logger.warning('Миниатюра для %s: %s', source, e)
+        abort(404)
+    response = redirect(url_for('.thumb', digest=digest, size=size))
+    # картинка рецепта может смениться — короткий кэш для редиректа
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@thumbs_bp.route('/<digest>/<size>.jpg')
+def thumb(digest, size):
+    if size not in SIZES or len(digest) != 64 or not digest.isalnum():
+        abort(404)
+    path = thumb_path(current_app.config['THUMBNAIL_DIR'], digest, size)
+    if not path.exists():
+        abort(404)
+    # отметка использования для LRU; mtime (и ETag) не трогаем
+    os.utime(path, (time.time(), path.stat().st_mtime))
+    response = send_file(path, mimetype='image/jpeg', max_age=ONE_YEAR,
+                         conditional=True, etag=True)
+    response.headers['Cache-Control'] = (
+        f'public, max-age={ONE_YEAR}, immutable')
+    return response
@@ -0,0 +1,337 @@
+# tracing.py
+"""
+Трассировка бота: от обновления Telegram до запросов к сайту.
+
+Каждое обновление получает trace id (при первом хендлере, который его
+обрабатывает). Внутри трассы пишутся спаны:
+    handler   — выполнение хендлера;
+    api       — api_get / api_post (trace id уходит на сайт в
+                заголовке X-Trace-Id);
+    photo     — скачивание фото пользователя;
+    telegram  — исходящие запросы к Bot API (TracingRequest).
+Спаны копятся в очереди и выгружаются фоновым потоком: в JSONL-файл
+(TRACE_EXPORT=file) или POST'ом в локальный сборщик (TRACE_EXPORT=http),
+который запускается этим же модулем. Хендлеры не ждут выгрузки; при
+переполнении очереди спаны отбрасываются.
+
+Запуск:
+    python tracing.py collect [--port 4318]   # локальный сборщик
+    python tracing.py report [--file ...]     # p50/p95/p99 по этапам
+"""
+import argparse
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+from profiling import wrap_callbacks
+
+# «or»: в docker-compose незаданная переменная приходит пустой строкой
+TRACE_EXPORT = (os.getenv("TRACE_EXPORT") or "").lower()  # file / http
+TRACE_FILE = Path(os.getenv("TRACE_FILE") or "instance/traces.jsonl")
+TRACE_COLLECTOR_URL = (os.getenv("TRACE_COLLECTOR_URL")
+                       or "http://127.0.0.1:4318/v1/spans")
+# Доля трассируемых обновлений
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE") or 1)
+TRACE_HEADER = "X-Trace-Id"
+
+EXPORT_QUEUE_SIZE = 10_000
+EXPORT_BATCH = 500
+EXPORT_INTERVAL = 1.0
+
+# (trace id или None, если обновление не попало в выборку; update_id)
+_trace = contextvars.ContextVar("trace", default=None)
+_parent = contextvars.ContextVar("span_id", default=None)
+
+
+def enabled() -> bool:
+    return TRACE_EXPORT in ("file", "http")
+
+
+def current_trace_id():
+    trace = _trace.get()
+    return trace[0] if trace else None
+
+
+# --------------------------
+# Выгрузка
+# --------------------------
+class _Exporter(threading.Thread):
+    def __init__(self):
+        super().__init__(name="trace-exporter", daemon=True)
+        self.spans = queue.Queue(EXPORT_QUEUE_SIZE)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def put(self, span: dict):
+        try:
+            self.spans.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first=None):
+        batch = [] if first is None else [first]
+        while len(batch) < EXPORT_BATCH:
+            try:
+                batch.append(self.spans.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            if TRACE_EXPORT == "http":
+                request = urllib.request.Request(
+                    TRACE_COLLECTOR_URL,
+                    data=json.dumps(batch).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                )
+                urllib.request.urlopen(request, timeout=2).close()
+            else:
+                TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                with TRACE_FILE.open("a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(s, ensure_ascii=False) + "\n"
+                                 for s in batch)
+        except OSError:
+            # сборщик недоступен — трассы не должны мешать боту
+            self.dropped += len(batch)
+
+    def run(self):
+        while True:
+            try:
+                first = self.spans.get(timeout=EXPORT_INTERVAL)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._write(self._drain(first))
+
+    def flush(self):
+        with self._lock:
+            while not self.spans.empty():
+                self._write(self._drain())
+
+
+_exporter = None
+
+
+def _export(span: dict):
+    global _exporter
+    if _exporter is None:
+        _exporter = _Exporter()
+        _exporter.start()
+        atexit.register(_exporter.flush)
+    _exporter.put(span)
+
+
+# --------------------------
+# Спаны
+# --------------------------
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs):
+    """
+    Спан внутри текущей трассы (вне трассы ничего не пишет). Отдаёт
+    словарь атрибутов — в него можно дописывать, например, статус.
+    """
+    trace_id = current_trace_id()
+    if trace_id is None:
+        yield attrs
+        return
+    span_id = os.urandom(8).hex()
+    parent_id = _parent.get()
+    token = _parent.set(span_id)
+    start = time.time()
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _parent.reset(token)
+        _export({
+            "trace_id": trace_id, "span_id": span_id,
+            "parent_id": parent_id, "name": name, "kind": kind,
+            "start": start,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            **attrs,
+        })
+
+
+def traced(callback):
+    """Оборачивает callback хендлера спаном; начинает трассу обновления."""
+    name = getattr(callback, "__qualname__", None) or repr(callback)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        update_id = getattr(update, "update_id", None)
+        trace = _trace.get()
+        tokens = None
+        # PTB вызывает хендлеры в одной задаче получения обновлений:
+        # новое update_id — новая трасса, даже если старая не сброшена
+        if trace is None or trace[1] != update_id:
+            sampled = random.random() < TRACE_SAMPLE_RATE
+            tokens = (_trace.set((os.urandom(16).hex() if sampled else None,
+                                  update_id)),
+                      _parent.set(None))
+        user = getattr(update, "effective_user", None)
+        try:
+            with span(name, "handler", update_id=update_id,
+                      user_id=user.id if user else None):
+                return await callback(update, context)
+        finally:
+            # как в span(): трасса не протекает в дальнейший код задачи
+            # (задачи, созданные хендлером, унаследовали её копию)
+            if tokens is not None:
+                _trace.reset(tokens[0])
+                _parent.reset(tokens[1])
+
+    return wrapper
+
+
+def install(app) -> bool:
+    """Включает трассировку хендлеров app (вызывать после add_handler)."""
+    if not enabled():
+        return False
+    wrap_callbacks(app, traced)
+    return True
+
+
+def request(**kwargs):
+    """HTTPXRequest для ApplicationBuilder().request() со спанами."""
+    from telegram.request import HTTPXRequest
+
+    class TracingRequest(HTTPXRequest):
+        async def do_request(self, url, method, *args, **kw):
+            if "/file/bot" in url:
+                name = "download file"
+            else:
+                name = url.rsplit("/", 1)[-1]
+            with span(name, "telegram") as attrs:
+                status, payload = await super().do_request(
+                    url, method, *args, **kw)
+                attrs["status"] = status
+                return status, payload
+
+    kwargs.setdefault("connection_pool_size", 256)
+    return TracingRequest(**kwargs)
+
+
+# --------------------------
+# Сборщик и отчёт
+# --------------------------
+def collect(port: int, path: Path):
+    from aiohttp import web
+
+    async def receive(req):
+        spans = await req.json()
+        with path.open("a", encoding="utf-8") as f:
+            f.writelines(json.dumps(s, ensure_ascii=False) + "\n"
+                         for s in spans)
+        return web.json_response({"accepted": len(spans)})
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/v1/spans", receive)
+    print(f"Сборщик трасс: http://127.0.0.1:{port}/v1/spans -> {path}")
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+
+def _percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(path: Path, top: int):
+    spans = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    if not spans:
+        print(f"В {path} нет спанов.")
+        return
+
+    # собственное время спана = длительность минус дочерние спаны
+    children = {}
+    for s in spans:
+        if s["parent_id"]:
+            children[s["parent_id"]] = (children.get(s["parent_id"], 0)
+                                        + s["duration_ms"])
+    traces = {}
+    for s in spans:
+        own = max(s["duration_ms"] - children.get(s["span_id"], 0), 0)
+        stages = traces.setdefault(s["trace_id"], {})
+        stages[s["kind"]] = stages.get(s["kind"], 0) + own
+        if s["parent_id"] is None:
+            stages["total"] = stages.get("total", 0) + s["duration_ms"]
+
+    print(f"Трасс: {len(traces)}, спанов: {len(spans)}\n")
+    print(f"{'этап (на трассу)':<24}{'p50 мс':>10}{'p95 мс':>10}"
+          f"{'p99 мс':>10}")
+    kinds = sorted({k for stages in traces.values() for k in stages},
+                   key=lambda k: (k == "total", k))
+    for kind in kinds:
+        values = [stages.get(kind, 0) for stages in traces.values()]
+        print(f"{kind:<24}{_percentile(values, 0.5):>10.1f}"
+              f"{_percentile(values, 0.95):>10.1f}"
+              f"{_percentile(values, 0.99):>10.1f}")
+
+    totals = [stages.get("total", 0) for stages in traces.values()]
+    p99 = _percentile(totals, 0.99)
+    slow = [stages for stages in traces.values()
+            if stages.get("total", 0) >= p99]
+    slow_total = sum(stages.get("total", 0) for stages in slow) or 1
+    print(f"\nСамые медленные трассы (>= p99, {p99:.1f} мс), доля этапов:")
+    for kind in kinds:
+        if kind == "total":
+            continue
+        share = sum(stages.get(kind, 0) for stages in slow) / slow_total
+        print(f"  {kind:<22}{share * 100:>6.0f}%")
+
+    by_name = {}
+    for s in spans:
+        by_name.setdefault((s["kind"], s["name"]), []).append(
+            s["duration_ms"])
+    print(f"\n{'спан':<40}{'n':>7}{'p50 мс':>10}{'p95 мс':>10}"
+          f"{'p99 мс':>10}")
+    ranking = sorted(by_name.items(), key=lambda item: -sum(item[1]))
+    for (kind, name), values in ranking[:top]:
+        label = f"{kind}: {name}"
+        print(f"{label[:39]:<40}{len(values):>7}"
+              f"{_percentile(values, 0.5):>10.1f}"
+              f"{_percentile(values, 0.95):>10.1f}"
+              f"{_percentile(values, 0.99):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Трассы бота")
+    commands = parser.add_subparsers(dest="command", required=True)
+    collector = commands.add_parser("collect", help="локальный сборщик")
+    collector.add_argument("--port", type=int, default=4318)
+    collector.add_argument("--file", type=Path, default=TRACE_FILE,
+                           help="куда дописывать спаны")
+    summary = commands.add_parser("report", help="задержки по этапам")
+    summary.add_argument("--file", type=Path, default=TRACE_FILE)
+    summary.add_argument("--top", type=int, default=20,
+                         help="сколько спанов показать")
+    args = parser.parse_args()
+    if args.command == "collect":
+        collect(args.port, args.file)
+    else:
+        report(args.file, args.top)
+
+
+if __name__ == "__main__":
+    main()